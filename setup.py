@@ -44,7 +44,7 @@ setup(
     description="A CLI utility for interacting with Basecamp 4 API",
     entry_points={
         "console_scripts": [
-            "tenzing=tenzing.cli:main",
+            "tenzing=tenzing.launcher:main",
         ],
     },
     install_requires=requirements,
@@ -0,0 +1,91 @@
+"""
+This module implements `tenzing agenda`: a person's open todos grouped by
+due date into overdue, today, this week (through Sunday) and later.
+
+The todos come from persist.iter_agenda_from_db, which reads them with
+range scans over todo_assignees and the (due_on, completed, status) index;
+`--summary` only counts them per due date. Both forms can be answered by the
+query server, so status bar refreshes don't start the full CLI; this module
+therefore only imports the standard library at the top level.
+"""
+
+import json
+from datetime import date, timedelta
+from typing import Iterable
+
+OVERDUE = "overdue"
+TODAY = "today"
+THIS_WEEK = "this_week"
+LATER = "later"
+BUCKETS = (OVERDUE, TODAY, THIS_WEEK, LATER)
+BUCKET_TITLES = {
+    OVERDUE: "Overdue",
+    TODAY: "Today",
+    THIS_WEEK: "This week",
+    LATER: "Later",
+}
+
+
+def end_of_week(today: date) -> date:
+    """The Sunday ending the week of `today`."""
+    return today + timedelta(days=6 - today.weekday())
+
+
+def bucket_for(due_on: date, today: date) -> str:
+    if due_on < today:
+        return OVERDUE
+    if due_on == today:
+        return TODAY
+    if due_on <= end_of_week(today):
+        return THIS_WEEK
+    return LATER
+
+
+def count_by_bucket(counts: Iterable[tuple[date, int]], today: date) -> dict[str, int]:
+    """
+    Add up (due date, number of todos) pairs into per-bucket totals.
+    """
+    totals = dict.fromkeys(BUCKETS, 0)
+    for due_on, count in counts:
+        totals[bucket_for(due_on, today)] += count
+    return totals
+
+
+def load_agenda(person_id: int, summary: bool = False, today: date | None = None) -> dict:
+    """
+    Build the agenda of `person_id` as JSON-ready data: {"counts": {...}} for
+    a summary, {"agenda": {bucket: [todo, ...]}} otherwise.
+    """
+    from tenzing.persist import count_agenda_from_db, iter_agenda_from_db
+
+    today = today or date.today()
+    if summary:
+        return {"counts": count_by_bucket(count_agenda_from_db(person_id), today)}
+
+    agenda = {bucket: [] for bucket in BUCKETS}
+    for todo in iter_agenda_from_db(person_id):
+        agenda[bucket_for(todo.due_on, today)].append(todo.model_dump(mode="json"))
+    return {"agenda": agenda}
+
+
+def format_summary(counts: dict[str, int]) -> str:
+    """
+    One short line for status bars, e.g. "2 overdue · 1 today · 4 this week".
+    """
+    parts = [
+        f"{counts[bucket]} {BUCKET_TITLES[bucket].lower()}"
+        for bucket in BUCKETS
+        if counts.get(bucket)
+    ]
+    return " · ".join(parts) if parts else "Nothing due"
+
+
+def format_agenda(result: dict, output_json: bool) -> str:
+    """
+    The text printed for a load_agenda result in JSON or summary form; the
+    table form is rendered by the CLI.
+    """
+    data = result["counts"] if "counts" in result else result["agenda"]
+    if output_json:
+        return json.dumps(data, indent=2, ensure_ascii=False)
+    return format_summary(data)
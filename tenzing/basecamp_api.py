@@ -1,4 +1,11 @@
+import threading
+import time
+from typing import Iterator, NamedTuple
+
+import requests
 from basecampy3 import Basecamp3
+from basecampy3.exc import Basecamp3Error
+from basecampy3.transport_adapter import Basecamp3TransportAdapter
 from basecampy3.endpoints.projects import Project as RawProject
 from basecampy3.endpoints.todolists import TodoList as RawTodoList
 from basecampy3.endpoints.people import Person as RawPerson
@@ -10,32 +17,233 @@ from tenzing.models import (
     TodoItemView,
 )
 from tenzing.config import read_config
+from tenzing.metrics import METRICS
+from tenzing.pagination import fetch_pages, install_prefetch
+from tenzing.trace import record_http_response, span, traced
+
+
+class TodoNotCreated(Exception):
+    """Basecamp did not create the todo; sending it again is safe."""
+
+
+class TodoCreationUnknown(Exception):
+    """The todo may have been created; sending it again could duplicate it."""
+
+
+def creation_error(e: Exception) -> Exception:
+    """
+    Classify a failed POST: only answers Basecamp gave without creating
+    anything, and connections that were never made, are safe to send again.
+    """
+    if isinstance(e, Basecamp3Error) and e.response is not None:
+        status = e.response.status_code
+        if status < 500 or status == 503:
+            return TodoNotCreated(f"Error creating todo: {e}")
+    if isinstance(e, requests.ConnectTimeout):
+        return TodoNotCreated(f"Error creating todo: {e}")
+    return TodoCreationUnknown(f"Basecamp may have created the todo: {e}")
+
+
+class ConnectionStats(NamedTuple):
+    requests: int
+    connections: int
+
+    @property
+    def reused(self) -> int:
+        """Requests sent over an already open connection."""
+        return max(self.requests - self.connections, 0)
+
+
+class InstrumentedTransportAdapter(Basecamp3TransportAdapter):
+    """
+    Basecamp3's caching and rate-limiting adapter, plus the HTTP counters in
+    tenzing.metrics: requests sent, bytes downloaded, 304 cache hits and the
+    time spent blocked on the rate limiter.
+
+    Connections are kept alive in a pool of `pool_size` per host, shared by
+    every thread using the session, and requests without an explicit timeout
+    get `timeout` (connect, read) so a hung request fails instead of stalling.
+    """
+
+    def __init__(
+        self, *args, pool_size: int = 10, timeout: tuple[float, float] = (5, 30), **kwargs
+    ) -> None:
+        super().__init__(*args, pool_maxsize=pool_size, **kwargs)
+        self._local = threading.local()
+        self.timeout = timeout
+
+    def connection_stats(self) -> ConnectionStats:
+        requests = connections = 0
+        for key in self.poolmanager.pools.keys():
+            pool = self.poolmanager.pools[key]
+            requests += pool.num_requests
+            connections += pool.num_connections
+        return ConnectionStats(requests, connections)
+
+    def send(self, request, *args, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        self._local.queued_at = time.perf_counter()
+        self._local.cache_hit = False
+        response = super().send(request, *args, **kwargs)
+        METRICS.incr("http_requests")
+        if self._local.cache_hit:
+            METRICS.incr("cache_hits")
+        else:
+            METRICS.incr("bytes_downloaded", len(response.content or b""))
+        return response
+
+    def get_connection_with_tls_context(self, *args, **kwargs):
+        # Called by HTTPAdapter.send once the rate limiter has let us through
+        queued_at = getattr(self._local, "queued_at", None)
+        if queued_at is not None:
+            METRICS.incr("throttled_seconds", time.perf_counter() - queued_at)
+        return super().get_connection_with_tls_context(*args, **kwargs)
+
+    def build_response(self, req, resp):
+        response = super().build_response(req, resp)
+        if response.status_code == 304:
+            self._local.cache_hit = True
+        return response
 
 
 class BasecampAPI:
-    def __init__(self) -> None:
+    def __init__(self, concurrency: int = 1) -> None:
+        """
+        `concurrency` is the number of threads that will call the API at
+        once; the connection pool is sized so none of them waits for, or
+        throws away, a connection.
+        """
+        config = read_config()
+        # One more connection for the page prefetching thread
+        pool_size = max(int(config.http["pool_size"]), concurrency + 1)
         # self.bc3 = Basecamp3.from_environment()
         self.bc3 = Basecamp3()
+        self.adapter = InstrumentedTransportAdapter(
+            pool_size=pool_size,
+            timeout=(config.http["connect_timeout"], config.http["read_timeout"]),
+        )
+        self.bc3.session.mount("https://", self.adapter)
+        self.bc3.session.headers["Accept-Encoding"] = "gzip"
+        self.bc3.session.hooks["response"].append(record_http_response)
+        depth = config.prefetch_depth
+        for endpoint in (
+            self.bc3.projects,
+            self.bc3.people,
+            self.bc3.todolists,
+            self.bc3.todos,
+        ):
+            install_prefetch(endpoint, depth)
+
+    def connection_stats(self) -> ConnectionStats:
+        """How many requests were sent and over how many TCP/TLS connections."""
+        return self.adapter.connection_stats()
 
+    @traced("api.get_raw_projects")
     def get_raw_projects(self) -> list[RawProject]:
         return list(self.bc3.projects.list())
 
+    @traced("api.get_raw_project")
     def get_raw_project(self, id: str) -> RawProject | None:
         return self.bc3.projects.get(id)
 
+    @traced("api.get_raw_users")
     def get_raw_users(self) -> list[RawPerson]:
         return list(self.bc3.people.list())
 
+    @traced("api.get_raw_todos_for_todolist")
     def get_raw_todos_for_todolist(self, todolist: RawTodoList) -> list[dict]:
-        incomplete_todos = list(self.bc3.todos.list(todolist=todolist, completed=False))
-        completed_todos = list(self.bc3.todos.list(todolist=todolist, completed=True))
-        archived_todos = list(self.bc3.todos.list(todolist=todolist, status="archived"))
-        trashed_todos = list(self.bc3.todos.list(todolist=todolist, status="trashed"))
-        return incomplete_todos + completed_todos + archived_todos + trashed_todos
+        return list(self.iter_raw_todos_for_todolist(todolist))
+
+    def iter_raw_todos_for_todolist(self, todolist: RawTodoList) -> Iterator[dict]:
+        """
+        Yield the incomplete, completed, archived and trashed todos of a
+        todolist, fetching each page only when the previous one is consumed.
+        """
+        yield from self.bc3.todos.list(todolist=todolist, completed=False)
+        yield from self.bc3.todos.list(todolist=todolist, completed=True)
+        yield from self.bc3.todos.list(todolist=todolist, status="archived")
+        yield from self.bc3.todos.list(todolist=todolist, status="trashed")
 
+    @traced("api.get_raw_todolists_for_project")
     def get_raw_todolists_for_project(self, project: RawProject) -> list[RawTodoList]:
         return list(self.bc3.todolists.list(project=project))
 
+    @traced("api.get_raw_todolist")
+    def get_raw_todolist(self, project_id: str, todolist_id: str) -> RawTodoList | None:
+        """
+        Fetch one todolist by ID, or return None if Basecamp doesn't have it.
+        """
+        try:
+            return self.bc3.todolists.get(int(todolist_id), int(project_id))
+        except Basecamp3Error as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+
+    @traced("api.get_raw_recording")
+    def get_raw_recording(self, url: str, type: str):
+        """
+        Fetch a todo ("Todo") or todolist ("Todolist") from its API URL, as
+        given in webhook payloads. Returns None if Basecamp doesn't have it.
+        """
+        endpoint = self.bc3.todos if type == "Todo" else self.bc3.todolists
+        try:
+            return endpoint._get(url)
+        except Basecamp3Error as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+
+    def get_raw_todo(self, project_id: int, todo_id: int):
+        return self.bc3.todos.get(int(todo_id), int(project_id))
+
+    @traced("api.get_assigned_todos")
+    def get_assigned_todos(self, person_id: str) -> list[TodoItemView]:
+        """
+        The active todos assigned to `person_id` in every project, from
+        Basecamp's assigned todos report: one request rather than a crawl of
+        every todolist.
+        """
+        request_args = {
+            "url": f"{self.bc3.todos.url}/reports/todos/assigned/{person_id}.json",
+            "method": "GET",
+        }
+        return [
+            TodoItemView.from_api_data(todo)
+            for page in fetch_pages(self.bc3.session, request_args)
+            for todo in page.get("todos", [])
+        ]
+
+    def iter_raw_comments(self, comments_url: str) -> Iterator[dict]:
+        """
+        Yield the comments at a todo's `comments_url`, oldest first.
+        """
+        request_args = {"url": comments_url, "method": "GET"}
+        for page in fetch_pages(self.bc3.session, request_args):
+            yield from page
+
+    def iter_raw_recordings(
+        self, type: str, project_ids: list[str] | None = None, status: str = "active"
+    ) -> Iterator:
+        """
+        Yield the todos ("Todo") or todolists ("Todolist") of `project_ids`
+        (every project if None) with the given status, most recently updated
+        first, from Basecamp's account-wide recordings feed. Each page is only
+        fetched once the previous one is consumed, so a caller can stop early.
+        """
+        endpoint = self.bc3.todos if type == "Todo" else self.bc3.todolists
+        params = {
+            "type": type,
+            "status": status,
+            "sort": "updated_at",
+            "direction": "desc",
+        }
+        if project_ids:
+            params["bucket"] = ",".join(str(id) for id in project_ids)
+        yield from endpoint._get_list(f"{endpoint.url}/projects/recordings.json", params)
+
+    @traced("api.get_raw_todo_lists")
     def get_raw_todo_lists(self) -> list[RawTodoList]:
         raw_projects = self.get_raw_projects()
         all_todolists = []
@@ -44,26 +252,60 @@ class BasecampAPI:
             all_todolists.extend(project_todolists)
         return all_todolists
 
+    @traced("api.get_projects")
     def get_projects(self) -> list[ProjectView]:
         raw_projects = self.get_raw_projects()
-        return [ProjectView.from_api_data(project) for project in raw_projects]
+        with span("convert.ProjectView", "convert", count=len(raw_projects)):
+            return [ProjectView.from_api_data(project) for project in raw_projects]
 
+    @traced("api.get_users")
     def get_users(self) -> list[UserView]:
         raw_users = self.get_raw_users()
-        return [UserView.from_api_data(user) for user in raw_users]
+        with span("convert.UserView", "convert", count=len(raw_users)):
+            return [UserView.from_api_data(user) for user in raw_users]
 
+    @traced("api.get_users_for_projects")
+    def get_users_for_projects(self, project_ids: list[str]) -> list[UserView]:
+        """
+        The people on any of `project_ids`, each once.
+        """
+        raw_users = {
+            user.id: user
+            for project_id in project_ids
+            for user in self.bc3.people.list(project=int(project_id))
+        }
+        with span("convert.UserView", "convert", count=len(raw_users)):
+            return [UserView.from_api_data(user) for user in raw_users.values()]
+
+    @traced("api.get_todolists_for_project")
     def get_todolists_for_project(self, project: RawProject) -> list[TodoListView]:
         raw_todolists = self.get_raw_todolists_for_project(project)
-        return [TodoListView.from_api_data(todolist) for todolist in raw_todolists]
+        with span("convert.TodoListView", "convert", count=len(raw_todolists)):
+            return [TodoListView.from_api_data(todolist) for todolist in raw_todolists]
+
+    def iter_todolists_for_project(self, project: RawProject) -> Iterator[TodoListView]:
+        for todolist in self.bc3.todolists.list(project=project):
+            yield TodoListView.from_api_data(todolist)
 
+    @traced("api.get_todolists")
     def get_todolists(self) -> list[TodoListView]:
         raw_todolists = self.get_raw_todo_lists()
-        return [TodoListView.from_api_data(todolist) for todolist in raw_todolists]
+        with span("convert.TodoListView", "convert", count=len(raw_todolists)):
+            return [TodoListView.from_api_data(todolist) for todolist in raw_todolists]
 
+    @traced("api.get_todo_items_for_todo_list")
     def get_todo_items_for_todo_list(self, todolist: RawTodoList) -> list[TodoItemView]:
         raw_todos = self.get_raw_todos_for_todolist(todolist)
-        return [TodoItemView.from_api_data(todo) for todo in raw_todos]
+        with span("convert.TodoItemView", "convert", count=len(raw_todos)):
+            return [TodoItemView.from_api_data(todo) for todo in raw_todos]
 
+    def iter_todo_items_for_todo_list(
+        self, todolist: RawTodoList
+    ) -> Iterator[TodoItemView]:
+        for todo in self.iter_raw_todos_for_todolist(todolist):
+            yield TodoItemView.from_api_data(todo)
+
+    @traced("api.get_todo_items")
     def get_todo_items(
         self, project_ids: list[str] | None = None
     ) -> list[TodoItemView]:
@@ -87,34 +329,40 @@ class BasecampAPI:
         print(f"Total number of todo items found: {len(all_todo_items)}")
         return all_todo_items
 
+    @traced("api.process_todolists")
     def _process_todolists(self, todolists: list[RawTodoList]) -> list[TodoItemView]:
         todo_items = []
         for todolist in todolists:
             todo_items.extend(self.get_todo_items_for_todo_list(todolist))
         return todo_items
 
+    @traced("api.get_todos_for_user")
     def get_todos_for_user(self, user_id: str) -> list[TodoItemView]:
         """
         Get all todos assigned to the specified user across projects listed in the config.
         """
+        return list(self.iter_todos_for_user(user_id))
+
+    def iter_todos_for_user(self, user_id: str) -> Iterator[TodoItemView]:
+        """
+        Yield the todos assigned to the specified user across projects listed
+        in the config, as each page of todos arrives.
+        """
         config = read_config()
-        todos = []
 
         for project_id in config.project_ids:
             project = self.get_raw_project(project_id)
             if project:
                 todolists = self.get_raw_todolists_for_project(project)
                 for todolist in todolists:
-                    todo_items = self.get_raw_todos_for_todolist(todolist)
-                    for todo in todo_items:
+                    for todo in self.iter_raw_todos_for_todolist(todolist):
                         todo_item = TodoItemView.from_api_data(todo)
                         if user_id in todo_item.assignee_ids:
-                            todos.append(todo_item)
+                            yield todo_item
             else:
                 print(f"Warning: Project with ID {project_id} not found.")
 
-        return todos
-
+    @traced("api.get_raw_todo_item")
     def get_raw_todo_item(self, project_id: str, todo_id: str) -> dict | None:
         """
         Retrieve a specific raw to-do item based on its ID and project ID.
@@ -135,39 +383,132 @@ class BasecampAPI:
             )
             return None
 
+    @traced("api.complete_todo")
+    def complete_todo(self, project_id: int, todo_id: int) -> None:
+        self.bc3.todos.complete(int(todo_id), int(project_id))
+
+    @traced("api.uncomplete_todo")
+    def uncomplete_todo(self, project_id: int, todo_id: int) -> None:
+        self.bc3.todos.uncomplete(int(todo_id), int(project_id))
+
+    @traced("api.update_todo")
+    def update_todo(self, todo: TodoItemView, **changes):
+        """
+        Update a todo and return Basecamp's new copy of it.
+
+        Basecamp clears any field left out of an update, so every field is sent
+        with its current value from `todo` unless it appears in `changes`
+        (title, description, assignee_ids, due_on, starts_on).
+        """
+        fields = {
+            "title": todo.title,
+            "description": todo.description,
+            "assignee_ids": todo.assignee_ids,
+            "due_on": todo.due_on,
+            "starts_on": todo.starts_on,
+            **changes,
+        }
+        data = {
+            "content": fields["title"],
+            "description": fields["description"],
+            "assignee_ids": [int(id) for id in fields["assignee_ids"]],
+            "completion_subscriber_ids": [
+                subscriber["id"] for subscriber in todo.completion_subscribers
+            ],
+            "notify": False,
+            "due_on": fields["due_on"].isoformat() if fields["due_on"] else None,
+            "starts_on": fields["starts_on"].isoformat() if fields["starts_on"] else None,
+        }
+        url = self.bc3.todos.UPDATE_URL.format(
+            base_url=self.bc3.todos.url, project_id=todo.bucket["id"], todo_id=todo.id
+        )
+        return self.bc3.todos._update(url, data)
+
+    @traced("api.create_todo")
     def create_todo(
-        self, project_id: int, todolist_id: int, title: str, body: str, assignee_id: int
-    ) -> dict | None:
+        self,
+        project_id: int,
+        todolist_id: int,
+        title: str,
+        body: str,
+        assignee_id: int,
+        todos_url: str | None = None,
+    ) -> dict:
         """
         Create a new todo in Basecamp.
 
+        The todo is created with a single POST to the todolist's todos_url
+        (taken from the local database when the caller has it, otherwise built
+        from the IDs). The project and todolist are only fetched if that POST
+        returns 404.
+
         Args:
             project_id (int): The ID of the project where the todo will be created.
             todolist_id (int): The ID of the todolist where the todo will be added.
             title (str): The title of the todo.
             body (str): The detailed description of the todo.
             assignee_id (int): The ID of the user to whom the todo will be assigned.
+            todos_url (str | None): The todolist's cached todos_url, if known.
 
         Returns:
-            dict | None: The created todo data as returned by the Basecamp API, or None if an error occurs.
+            dict: The created todo data as returned by the Basecamp API.
+
+        Raises:
+            TodoNotCreated: Basecamp certainly did not create the todo.
+            TodoCreationUnknown: The POST may have created the todo (e.g. it
+                timed out waiting for the answer), so sending it again could
+                create a duplicate.
         """
+        if todos_url is None:
+            todos_url = self.bc3.todos.CREATE_URL.format(
+                base_url=self.bc3.todos.url,
+                project_id=int(project_id),
+                todolist_id=int(todolist_id),
+            )
+        try:
+            return self.create_todo_at_url(todos_url, title, body, assignee_id)
+        except Basecamp3Error as e:
+            if e.response is None or e.response.status_code != 404:
+                raise creation_error(e) from e
+        except requests.RequestException as e:
+            raise creation_error(e) from e
+
+        print(f"{todos_url} not found, looking up the todolist.")
+        return self._create_todo_with_lookups(
+            project_id, todolist_id, title, body, assignee_id
+        )
+
+    @traced("api.create_todo_at_url")
+    def create_todo_at_url(
+        self, todos_url: str, title: str, body: str, assignee_id: int | None
+    ) -> dict:
+        """
+        Create a todo with one POST to a todolist's todos_url. Raises
+        Basecamp3Error if Basecamp rejects the request.
+        """
+        data = {"content": title, "description": body, "notify": False}
+        if assignee_id:
+            data["assignee_ids"] = [int(assignee_id)]
+        return self.bc3.todos._create(todos_url, data=data)
+
+    @traced("api.create_todo_with_lookups")
+    def _create_todo_with_lookups(
+        self, project_id: int, todolist_id: int, title: str, body: str, assignee_id: int
+    ) -> dict:
         try:
             project = self.get_raw_project(str(project_id))
-            print(f"Project: {project}")
-            if not project:
-                print(f"Project with ID {project_id} not found.")
-                return None
+            todolist = self.bc3.todolists.get(todolist_id, project) if project else None
+        except (Basecamp3Error, requests.RequestException) as e:
+            raise TodoNotCreated(f"Could not look up todolist {todolist_id}: {e}") from e
+        if not project:
+            raise TodoNotCreated(f"Project with ID {project_id} not found.")
 
-            # todolist = self.bc3.todolists.get(project, todolist_id)
-            todolist = self.bc3.todolists.get(todolist_id, project)
-            new_todo = self.bc3.todos.create(
+        try:
+            return self.bc3.todos.create(
                 content=title,
                 todolist=todolist,
                 description=body,
                 assignee_ids=[assignee_id],
             )
-
-            return new_todo
-        except Exception as e:
-            print(f"Error creating todo: {str(e)}")
-            return None
+        except (Basecamp3Error, requests.RequestException) as e:
+            raise creation_error(e) from e
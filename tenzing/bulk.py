@@ -0,0 +1,258 @@
+"""
+This module implements bulk operations on existing todos.
+
+`tenzing bulk` reads one operation per line, either as JSON (NDJSON):
+
+    {"id": 1001, "action": "complete"}
+    {"id": 1002, "action": "reassign", "assignee_ids": [7, 8]}
+    {"id": 1003, "action": "reschedule", "due_on": "2024-06-01"}
+    {"id": 1004, "action": "update", "title": "New title"}
+
+or as plain text, `ACTION TODO_ID [VALUE]`:
+
+    complete 1001
+    reassign 1002 7,8
+    reschedule 1003 2024-06-01
+
+Bare todo IDs are accepted when a default action is given. Blank lines and
+lines starting with # are skipped.
+
+Todos are looked up in the local database (Basecamp needs the project ID and,
+for updates, every current field value), the operations are sent to
+Basecamp from a bounded thread pool with retries, and the updated todos are
+saved back in a single transaction.
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Callable, Iterable, NamedTuple
+
+import requests
+from basecampy3.exc import Basecamp3Error
+
+from tenzing.basecamp_api import BasecampAPI
+from tenzing.models import TodoItemView
+from tenzing.persist import get_todos_from_db, save_to_db
+
+ACTIONS = ("complete", "uncomplete", "reassign", "reschedule", "update")
+UPDATE_FIELDS = ("title", "description", "assignee_ids", "due_on", "starts_on")
+
+
+class BulkOperation(NamedTuple):
+    line_number: int
+    todo_id: int
+    action: str
+    changes: dict
+
+
+class BulkResult(NamedTuple):
+    line_number: int
+    todo_id: int | None
+    action: str | None
+    error: str | None
+    todo: TodoItemView | None = None
+
+
+def _parse_date(value) -> date | None:
+    if value in (None, "", "none"):
+        return None
+    return date.fromisoformat(value)
+
+
+def _parse_ids(value) -> list[str]:
+    if isinstance(value, str):
+        value = [part for part in value.split(",") if part]
+    return [str(int(id)) for id in value]
+
+
+def normalize_changes(action: str, changes: dict) -> dict:
+    """
+    Validate the fields an action needs and convert them to the types
+    BasecampAPI.update_todo expects. Raises ValueError on bad input.
+    """
+    if action in ("complete", "uncomplete"):
+        return {}
+    if action == "reassign":
+        if "assignee_ids" not in changes:
+            raise ValueError("reassign needs assignee_ids")
+        changes = {"assignee_ids": changes["assignee_ids"]}
+    elif action == "reschedule":
+        if "due_on" not in changes:
+            raise ValueError("reschedule needs due_on")
+        changes = {
+            field: changes[field] for field in ("due_on", "starts_on") if field in changes
+        }
+    else:
+        unknown = set(changes) - set(UPDATE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        if not changes:
+            raise ValueError("update needs at least one field to change")
+
+    normalized = dict(changes)
+    if "assignee_ids" in normalized:
+        normalized["assignee_ids"] = _parse_ids(normalized["assignee_ids"])
+    for field in ("due_on", "starts_on"):
+        if field in normalized:
+            normalized[field] = _parse_date(normalized[field])
+    return normalized
+
+
+def parse_operation(
+    line: str, line_number: int, default_action: str | None = None
+) -> BulkOperation | None:
+    """
+    Parse one input line. Returns None for blank and comment lines; raises
+    ValueError if the line isn't a valid operation.
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+
+    if line.startswith("{"):
+        changes = json.loads(line)
+        if "id" not in changes:
+            raise ValueError("Missing todo id")
+        todo_id = changes.pop("id")
+        action = changes.pop("action", default_action)
+    else:
+        parts = line.split(maxsplit=2)
+        if parts[0] in ACTIONS:
+            action, parts = parts[0], parts[1:]
+        else:
+            action = default_action
+        if not parts:
+            raise ValueError("Missing todo id")
+        todo_id, values = parts[0], parts[1:]
+        changes = {}
+        if action == "reassign" and values:
+            changes["assignee_ids"] = values[0]
+        elif action == "reschedule" and values:
+            changes["due_on"] = values[0]
+        elif values:
+            raise ValueError(f"Unexpected value for {action}: {values[0]}")
+
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown action: {action}")
+    return BulkOperation(line_number, int(todo_id), action, normalize_changes(action, changes))
+
+
+def parse_operations(
+    lines: Iterable[str], default_action: str | None = None
+) -> tuple[list[BulkOperation], list[BulkResult]]:
+    """
+    Parse every line up front. Returns the operations and a failed result
+    for each line that couldn't be parsed.
+    """
+    operations, errors = [], []
+    for line_number, line in enumerate(lines, start=1):
+        try:
+            operation = parse_operation(line, line_number, default_action)
+        except (ValueError, TypeError) as e:
+            errors.append(BulkResult(line_number, None, None, f"Invalid line: {str(e)}"))
+            continue
+        if operation is not None:
+            operations.append(operation)
+    return operations, errors
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Rate limiting, server errors and network failures are worth retrying.
+    Anything else is a bug or a rejected request and would fail again.
+    """
+    if isinstance(error, requests.RequestException):
+        return True
+    if isinstance(error, Basecamp3Error) and error.response is not None:
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return False
+
+
+def with_retries(call: Callable, attempts: int = 3, backoff: float = 1.0):
+    """
+    Run `call`, retrying retryable failures with exponential backoff.
+    """
+    for attempt in range(attempts):
+        try:
+            return call()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_retryable(e):
+                raise
+            time.sleep(backoff * 2**attempt)
+
+
+def apply_operation(
+    api: BasecampAPI, todo: TodoItemView, operation: BulkOperation
+) -> TodoItemView:
+    """
+    Send one operation to Basecamp and return the todo as it is afterwards.
+    """
+    project_id = todo.bucket["id"]
+    if operation.action == "complete":
+        api.complete_todo(project_id, todo.id)
+        return todo.model_copy(update={"completed": True})
+    if operation.action == "uncomplete":
+        api.uncomplete_todo(project_id, todo.id)
+        return todo.model_copy(update={"completed": False})
+    return TodoItemView.from_api_data(api.update_todo(todo, **operation.changes))
+
+
+def run_bulk(
+    api: BasecampAPI,
+    operations: list[BulkOperation],
+    max_workers: int = 8,
+    attempts: int = 3,
+    backoff: float = 1.0,
+) -> list[BulkResult]:
+    """
+    Run `operations` against Basecamp, `max_workers` at a time, and save the
+    changed todos in one transaction. Returns one result per operation, in
+    input order.
+    """
+    todos = get_todos_from_db([operation.todo_id for operation in operations])
+
+    # Operations on the same todo run in order in one worker, each starting
+    # from the previous one's result, so updates don't overwrite each other
+    groups: dict[int, list[BulkOperation]] = {}
+    for operation in operations:
+        groups.setdefault(operation.todo_id, []).append(operation)
+
+    def run_group(group: list[BulkOperation]) -> list[BulkResult]:
+        todo = todos.get(group[0].todo_id)
+        results = []
+        for operation in group:
+            if todo is None:
+                error = "Todo not found in the local database"
+            else:
+                try:
+                    todo = with_retries(
+                        lambda: apply_operation(api, todo, operation), attempts, backoff
+                    )
+                    error = None
+                except Exception as e:
+                    error = str(e)
+            results.append(
+                BulkResult(
+                    operation.line_number,
+                    operation.todo_id,
+                    operation.action,
+                    error,
+                    None if error else todo,
+                )
+            )
+        return results
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = [
+            result
+            for group_results in pool.map(run_group, groups.values())
+            for result in group_results
+        ]
+
+    # Results of a group are in input order, so the last successful one wins
+    updated_todos = {result.todo_id: result.todo for result in results if result.todo}
+    save_to_db(list(updated_todos.values()))
+    return sorted(results, key=lambda result: result.line_number)
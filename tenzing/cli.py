@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
 
 """Console script for tenzing."""
+import os
+import signal
 import sys
+import threading
 import click
+from click.shell_completion import CompletionItem
 from rich import print as rprint
 from rich.table import Table
 import json
@@ -13,9 +17,30 @@ from tenzing.config import read_config
 from tenzing.models import ProjectView, TodoListView, UserView, TodoItemView
 from tenzing.persist import (
     save_to_db,
-    get_todos_for_user_from_db,
+    iter_todos_for_user_from_db,
     fully_refresh_db,
-    sqlalchemy_to_pydantic,
+    tracked_sync_run,
+    get_sync_runs,
+    get_sync_state,
+    save_sync_state,
+    get_last_synced_at,
+    get_synced_at,
+    get_todos_for_user_synced_at,
+    get_projects_from_db,
+    get_users_from_db,
+    get_project_from_db,
+    iter_todolists_for_project_from_db,
+    get_todo_from_db,
+    get_todolist_from_db,
+    iter_todo_items_for_todolist_from_db,
+    get_outbox_entries,
+    retry_outbox_entries,
+    discard_outbox_entries,
+    iter_query_results,
+    explain_query,
+    get_comments_from_db,
+    get_comments_synced_at,
+    iter_changes_from_db,
 )
 from tenzing.db import (
     get_current_todo as get_current_todo_id,
@@ -25,19 +50,106 @@ from tenzing.db import (
     TodoItem,
 )
 from tenzing.models import TodoItemView
-from tenzing.edit import create_todo_from_editor
+from tenzing.edit import create_todo_from_editor, create_todos_from_file
+from tenzing.trace import TRACER
+from tenzing.metrics import cache_hit_ratio, percentile
+from tenzing.render import Column, paginate, stream_json, stream_table
+from tenzing import sync as background_sync
+from tenzing.server import query_server, serve as run_query_server
+from tenzing import bulk, freshness, outbox, webhooks
+from tenzing.completion import complete_ids, refresh_completion_index
+from tenzing.snapshot import refresh_snapshot
+from tenzing.query import FilterSyntaxError, compile_query, parse_filter, resolve_date
+from tenzing.history import FIELD_TITLES, format_value
+from tenzing.comments import html_to_text
+from tenzing.agenda import BUCKETS, BUCKET_TITLES, format_agenda, load_agenda
 
 
 @click.group()
-def main():
-    pass
+@click.option(
+    "--profile",
+    "profile_path",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write a Chrome/Perfetto trace of this command to the given file.",
+)
+@click.pass_context
+def main(ctx, profile_path):
+    if profile_path:
+        TRACER.enable()
+        ctx.call_on_close(lambda: write_profile(profile_path))
+
+
+def write_profile(profile_path: str) -> None:
+    """Write the collected trace and print a summary of the top time sinks."""
+    TRACER.write_chrome_trace(profile_path)
+
+    table = Table(title=f"Top Time Sinks (trace written to {profile_path})")
+    table.add_column("Span", style="cyan")
+    table.add_column("Category", style="magenta")
+    table.add_column("Count", style="green", justify="right")
+    table.add_column("Total (ms)", style="yellow", justify="right")
+    table.add_column("Max (ms)", style="blue", justify="right")
+
+    for summary in TRACER.summarize():
+        table.add_row(
+            summary.name,
+            summary.category,
+            str(summary.count),
+            f"{summary.total * 1000:.1f}",
+            f"{summary.max * 1000:.1f}",
+        )
+
+    rprint(table, file=sys.stderr)
+
+
+def freshness_options(func):
+    """Add the --cached and --fresh options to a read command."""
+    func = click.option(
+        "--fresh", is_flag=True, help="Always fetch from Basecamp"
+    )(func)
+    func = click.option(
+        "--cached",
+        is_flag=True,
+        help="Always answer from the local database, however old",
+    )(func)
+    return func
+
+
+def plan_cached_read(
+    entity: str, synced_at: datetime | None, cached: bool, fresh: bool
+) -> freshness.ReadPlan:
+    """Apply the configured max age for `entity` (see tenzing.freshness)."""
+    if cached and fresh:
+        raise click.UsageError("--cached and --fresh can't be used together.")
+    return freshness.plan_read(synced_at, read_config().max_age[entity], cached, fresh)
+
+
+def revalidate_in_background(*args: str) -> None:
+    """
+    Re-run a read command with --fresh in a detached process, unless the same
+    read is already being revalidated.
+    """
+    background_sync.spawn_background_command(
+        *args, "--fresh", lock_name="revalidate-" + "-".join(args)
+    )
 
 
 @main.command()
-def list_projects():
+@freshness_options
+def list_projects(cached, fresh):
     """List all projects in the user's Basecamp instance."""
-    api = BasecampAPI()
-    projects: list[ProjectView] = api.get_projects()
+    synced_at = get_synced_at(freshness.PROJECTS_KEYS)
+    plan = plan_cached_read("projects", synced_at, cached, fresh)
+    if plan.from_cache:
+        projects: list[ProjectView] = get_projects_from_db()
+        if plan.revalidate:
+            revalidate_in_background("list-projects")
+    else:
+        projects = BasecampAPI().get_projects()
+        save_to_db(projects)
+        synced_at = datetime.now()
+        save_sync_state("projects", synced_at)
 
     table = Table(title="Basecamp Projects")
     table.add_column("ID", style="cyan")
@@ -54,13 +166,24 @@ def list_projects():
         )
 
     rprint(table)
+    print_staleness(synced_at, plan.revalidate)
 
 
 @main.command()
-def list_users():
+@freshness_options
+def list_users(cached, fresh):
     """List all users in the user's Basecamp instance."""
-    api = BasecampAPI()
-    users: list[UserView] = api.get_users()
+    synced_at = get_synced_at(freshness.USERS_KEYS)
+    plan = plan_cached_read("users", synced_at, cached, fresh)
+    if plan.from_cache:
+        users: list[UserView] = get_users_from_db()
+        if plan.revalidate:
+            revalidate_in_background("list-users")
+    else:
+        users = BasecampAPI().get_users()
+        save_to_db(users)
+        synced_at = datetime.now()
+        save_sync_state("users", synced_at)
 
     table = Table(title="Basecamp Users")
     table.add_column("ID", style="cyan")
@@ -79,6 +202,52 @@ def list_users():
         )
 
     rprint(table)
+    print_staleness(synced_at, plan.revalidate)
+
+
+def complete_project_id(ctx, param, incomplete):
+    return [
+        CompletionItem(entry.id, help=entry.label)
+        for entry in complete_ids("project", incomplete)
+    ]
+
+
+def complete_todolist_id(ctx, param, incomplete):
+    project_id = ctx.params.get("project_id")
+    return [
+        CompletionItem(entry.id, help=entry.label)
+        for entry in complete_ids(
+            "todolist", incomplete, str(project_id) if project_id else None
+        )
+    ]
+
+
+def complete_todo_id(ctx, param, incomplete):
+    return [
+        CompletionItem(entry.id, help=entry.label)
+        for entry in complete_ids("todo", incomplete)
+    ]
+
+
+def paging_options(func):
+    """Add the --limit, --offset, --page-size and --pager options to a command."""
+    func = click.option(
+        "--pager", is_flag=True, help="Send the output through the system pager"
+    )(func)
+    func = click.option(
+        "--page-size",
+        type=click.IntRange(min=1),
+        default=50,
+        show_default=True,
+        help="Number of rows rendered at a time",
+    )(func)
+    func = click.option(
+        "--offset", type=click.IntRange(min=0), default=0, help="Skip the first N rows"
+    )(func)
+    func = click.option(
+        "--limit", type=click.IntRange(min=0), default=None, help="Show at most N rows"
+    )(func)
+    return func
 
 
 @main.command()
@@ -86,54 +255,87 @@ def list_users():
     "--project-id",
     type=str,
     default=None,
+    shell_complete=complete_project_id,
     help="Project ID. If not provided, lists todos for all configured projects.",
 )
 @click.option(
     "--json", "output_json", is_flag=True, help="Output todo lists in JSON format"
 )
-def list_todolists(project_id, output_json):
+@freshness_options
+@paging_options
+def list_todolists(
+    project_id, output_json, cached, fresh, limit, offset, page_size, pager
+):
     """List all todo lists for a specified project ID, or for all configured projects if not specified."""
-    api = BasecampAPI()
     config = read_config()
+    project_ids = [project_id] if project_id else config.project_ids
+    synced_at = freshness.oldest(
+        get_synced_at(freshness.todolists_keys(pid)) for pid in project_ids
+    )
+    plan = plan_cached_read("todolists", synced_at, cached, fresh)
 
-    if project_id:
-        target_project = api.get_raw_project(project_id)
-        if not target_project:
-            rprint(f"[red]Error:[/red] Project with ID '{project_id}' not found.")
-            return
+    if plan.from_cache:
+        if project_id:
+            cached_project = get_project_from_db(int(project_id))
+            project_name = cached_project.name if cached_project else ""
+            table_title = f"Todo Lists for Project: {project_name} (ID: {project_id})"
+        else:
+            table_title = "Todo Lists for All Configured Projects"
 
-        project_ids = [target_project.id]
-        table_title = (
-            f"Todo Lists for Project: {target_project.name} (ID: {target_project.id})"
-        )
-    else:
-        project_ids = config.project_ids
-        table_title = "Todo Lists for All Configured Projects"
+        def iter_todolists():
+            for pid in project_ids:
+                yield from iter_todolists_for_project_from_db(int(pid))
 
-    todolists = []
-    for pid in project_ids:
-        try:
-            project_todolists = api.get_todolists_for_project(api.get_raw_project(pid))
-            todolists.extend(project_todolists)
-        except Exception as e:
-            rprint(
-                f"[red]Error:[/red] Failed to fetch todo lists for project ID {pid}. {str(e)}"
+        if plan.revalidate:
+            revalidate_in_background(
+                "list-todolists", *(["--project-id", project_id] if project_id else [])
             )
+    else:
+        api = BasecampAPI()
+        if project_id:
+            target_project = api.get_raw_project(project_id)
+            if not target_project:
+                rprint(f"[red]Error:[/red] Project with ID '{project_id}' not found.")
+                return
+
+            table_title = f"Todo Lists for Project: {target_project.name} (ID: {target_project.id})"
+        else:
+            table_title = "Todo Lists for All Configured Projects"
+        synced_at = datetime.now()
+
+        def iter_todolists():
+            for pid in project_ids:
+                fetched_todolists = []
+                try:
+                    project = (
+                        target_project if project_id else api.get_raw_project(pid)
+                    )
+                    if not project:
+                        rprint(
+                            f"[red]Error:[/red] Project with ID '{pid}' not found.",
+                            file=sys.stderr,
+                        )
+                        continue
+                    for todolist in api.iter_todolists_for_project(project):
+                        fetched_todolists.append(todolist)
+                        yield todolist
+                except Exception as e:
+                    rprint(
+                        f"[red]Error:[/red] Failed to fetch todo lists for project ID {pid}. {str(e)}",
+                        file=sys.stderr,
+                    )
+                    continue
+                # Only a project whose lists were all read counts as synced
+                save_to_db(fetched_todolists)
+                save_sync_state(f"todolists:{pid}", datetime.now())
+
+    todolists = paginate(iter_todolists(), limit=limit, offset=offset)
 
     if output_json:
-        todolists_json = [todolist.model_dump(mode="json") for todolist in todolists]
-        click.echo(json.dumps(todolists_json, indent=2))
+        stream_json(todolist.model_dump(mode="json") for todolist in todolists)
     else:
-        table = Table(title=table_title)
-        table.add_column("ID", style="cyan")
-        table.add_column("Name", style="magenta")
-        table.add_column("Description", style="green")
-        table.add_column("Completed", style="yellow")
-        table.add_column("Completed Ratio", style="blue")
-        table.add_column("Project ID", style="cyan")
-
-        for todolist in todolists:
-            table.add_row(
+        rows = (
+            (
                 str(todolist.id),
                 todolist.name,
                 todolist.description or "",
@@ -141,139 +343,382 @@ def list_todolists(project_id, output_json):
                 todolist.completed_ratio,
                 str(todolist.parent_id),
             )
-
-        rprint(table)
+            for todolist in todolists
+        )
+        stream_table(
+            table_title,
+            [
+                Column("ID", "cyan", width=10),
+                Column("Name", "magenta"),
+                Column("Description", "green"),
+                Column("Completed", "yellow", width=9),
+                Column("Completed Ratio", "blue", width=15),
+                Column("Project ID", "cyan", width=10),
+            ],
+            rows,
+            page_size=page_size,
+            pager=pager,
+        )
+        print_staleness(synced_at, plan.revalidate)
 
 
 @main.command()
-@click.argument("project_id", type=str)
-@click.argument("todo_list_id", type=str)
-def list_todo_items(project_id, todo_list_id):
+@click.argument("project_id", type=str, shell_complete=complete_project_id)
+@click.argument("todo_list_id", type=str, shell_complete=complete_todolist_id)
+@freshness_options
+@paging_options
+def list_todo_items(
+    project_id, todo_list_id, cached, fresh, limit, offset, page_size, pager
+):
     """List all todo items for a specified project ID and todo list ID."""
-    api = BasecampAPI()
+    synced_at = get_synced_at(freshness.todo_items_keys(project_id, todo_list_id))
+    plan = plan_cached_read("todos", synced_at, cached, fresh)
+    target_todolist = get_todolist_from_db(int(todo_list_id)) if plan.from_cache else None
 
-    # Find the project
-    target_project = api.get_raw_project(project_id)
-    if not target_project:
-        rprint(f"[red]Error:[/red] Project with ID '{project_id}' not found.")
-        return
-
-    # Find the todo list within the project
-    todolists = api.get_raw_todolists_for_project(target_project)
-    target_todolist = next((tl for tl in todolists if str(tl.id) == todo_list_id), None)
-
-    if not target_todolist:
+    if target_todolist:
+        todo_items = iter_todo_items_for_todolist_from_db(
+            target_todolist.id, limit=limit, offset=offset
+        )
+        fetched_todo_items = None
+        if plan.revalidate:
+            revalidate_in_background("list-todo-items", project_id, todo_list_id)
+    elif cached:
         rprint(
-            f"[red]Error:[/red] Todo list with ID '{todo_list_id}' not found in project '{target_project.name}'."
+            f"[red]Error:[/red] Todo list with ID '{todo_list_id}' not found in the database."
         )
         return
+    else:
+        plan = plan._replace(from_cache=False, revalidate=False)
+        synced_at = datetime.now()
+        api = BasecampAPI()
+        # Fetch the todo list directly instead of scanning the project's lists
+        try:
+            raw_todolist = api.get_raw_todolist(project_id, todo_list_id)
+        except Exception as e:
+            rprint(
+                f"[red]Error:[/red] Failed to fetch todo list '{todo_list_id}' in project '{project_id}'. {str(e)}"
+            )
+            return
+        if not raw_todolist:
+            rprint(
+                f"[red]Error:[/red] Todo list with ID '{todo_list_id}' not found in project '{project_id}'."
+            )
+            return
+        target_todolist = TodoListView.from_api_data(raw_todolist)
+        fetched_todo_items = []
+
+        def fetch_todo_items():
+            for todo_item in api.iter_todo_items_for_todo_list(raw_todolist):
+                fetched_todo_items.append(todo_item)
+                yield todo_item
+
+        todo_items = paginate(fetch_todo_items(), limit=limit, offset=offset)
+
+    project_name = target_todolist.bucket.get("name", "")
+
+    def todo_item_rows():
+        for todo_item in todo_items:
+            assignees = ", ".join([assignee["name"] for assignee in todo_item.assignees])
+            due_date = (
+                todo_item.due_on.strftime("%Y-%m-%d") if todo_item.due_on else "N/A"
+            )
+            description = todo_item.description or ""
+            # Truncate description if it's too long
+            if len(description) > 50:
+                description = description[:47] + "..."
+            yield (
+                str(todo_item.id),
+                todo_item.title,
+                description,
+                assignees,
+                due_date,
+                "Yes" if todo_item.completed else "No",
+            )
 
     try:
-        todo_items: list[TodoItemView] = api.get_todo_items_for_todo_list(
-            target_todolist
+        stream_table(
+            f"Todo Items for Todo List: {target_todolist.title} (ID: {target_todolist.id}) in Project: {project_name} (ID: {project_id})",
+            [
+                Column("ID", "cyan", width=10),
+                Column("Title", "magenta"),
+                Column("Description", "green"),
+                Column("Assignees", "yellow"),
+                Column("Due Date", "blue", width=10),
+                Column("Completed", "red", width=9),
+            ],
+            todo_item_rows(),
+            page_size=page_size,
+            pager=pager,
         )
     except Exception as e:
         rprint(
-            f"[red]Error:[/red] Failed to fetch todo items for todo list '{todo_list_id}' in project '{target_project.name}'. {str(e)}"
+            f"[red]Error:[/red] Failed to fetch todo items for todo list '{todo_list_id}' in project '{project_name}'. {str(e)}"
         )
         return
 
-    table = Table(
-        title=f"Todo Items for Todo List: {target_todolist.title} (ID: {target_todolist.id}) in Project: {target_project.name} (ID: {target_project.id})"
-    )
-    table.add_column("ID", style="cyan")
-    table.add_column("Title", style="magenta")
-    table.add_column("Description", style="green")
-    table.add_column("Assignees", style="yellow")
-    table.add_column("Due Date", style="blue")
-    table.add_column("Completed", style="red")
-
-    for todo_item in todo_items:
-        assignees = ", ".join([assignee["name"] for assignee in todo_item.assignees])
-        due_date = todo_item.due_on.strftime("%Y-%m-%d") if todo_item.due_on else "N/A"
-        description = todo_item.description or ""
-        # Truncate description if it's too long
-        if len(description) > 50:
-            description = description[:47] + "..."
-        table.add_row(
-            str(todo_item.id),
-            todo_item.title,
-            description,
-            assignees,
-            due_date,
-            "Yes" if todo_item.completed else "No",
-        )
-
-    rprint(table)
+    if fetched_todo_items is not None:
+        save_to_db([target_todolist])
+        save_to_db(fetched_todo_items)
+        if limit is None and offset == 0:
+            save_sync_state(f"todolist:{target_todolist.id}", synced_at)
+    print_staleness(synced_at, plan.revalidate)
 
 
 @main.command()
-def refresh_db():
-    """Fetch all projects from Basecamp API and refresh the local database."""
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Continue an interrupted refresh, skipping the projects and lists it saved",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Processes that fetch and convert projects in parallel",
+)
+@click.option(
+    "--all",
+    "everything",
+    is_flag=True,
+    help="Also refresh the people, projects and todolists outside the sync scope",
+)
+def refresh_db(resume, workers, everything):
+    """Fetch the projects in scope from Basecamp API and refresh the local database."""
     api = BasecampAPI()
     try:
-        fully_refresh_db(api)
+        with tracked_sync_run("refresh-db"):
+            fully_refresh_db(api, resume=resume, workers=workers, everything=everything)
+        refresh_completion_index()
+        refresh_snapshot()
         rprint(
             "[green]Successfully refreshed the database with latest Basecamp data.[/green]"
         )
-    except Exception as e:
+        stats = api.connection_stats()
+        rprint(
+            f"[dim]{stats.requests} HTTP requests over {stats.connections} "
+            f"connections ({stats.reused} reused)[/dim]"
+        )
+    except (Exception, KeyboardInterrupt) as e:
         rprint(f"[red]Error:[/red] Failed to refresh the database. {str(e)}")
+        rprint("Run [bold]tenzing refresh-db --resume[/bold] to continue where it stopped.")
+        sys.exit(1)
 
 
 @main.command()
-@click.option("--cached", is_flag=True, help="Get todos from the local database")
 @click.option("--json", "output_json", is_flag=True, help="Output todos in JSON format")
 @click.option("--active-only", is_flag=True, help="Only show active todos")
-def get_todos_for_user(cached, output_json, active_only):
+@freshness_options
+@paging_options
+def get_todos_for_user(
+    output_json, active_only, cached, fresh, limit, offset, page_size, pager
+):
     """Get todos for the configured user from the projects specified in the config."""
+    config = read_config()
+    synced_at = get_todos_for_user_synced_at(config.project_ids)
+    plan = plan_cached_read("todos", synced_at, cached, fresh)
+    if plan.from_cache:
+        response = query_server(
+            {
+                "query": "todos_for_user",
+                "active_only": active_only,
+                "limit": limit,
+                "offset": offset,
+            }
+        )
+        if response is not None:
+            todos = (TodoItemView.model_validate(todo) for todo in response["todos"])
+            synced_at = parse_datetime(response["last_synced_at"])
+        else:
+            todos = iter_todos_for_user_from_db(
+                active_only=active_only, limit=limit, offset=offset
+            )
+        render_todos_for_user(todos, output_json, page_size, pager)
+        if response is None:
+            refresh_snapshot()
+        if not output_json:
+            print_staleness(synced_at, plan.revalidate)
+        if plan.revalidate:
+            revalidate_in_background("get-todos-for-user")
+        return
+
     api = BasecampAPI()
+    user_id = config.user_id
+    if user_id is None:
+        raise ValueError("User ID not found in configuration")
+
+    with tracked_sync_run("get-todos-for-user"):
+        # Sorted like the local database's copy, so --fresh and --cached agree
+        fetched_todos = sorted(
+            api.iter_todos_for_user(user_id),
+            key=lambda todo: (todo.get_todo_list_name(), todo.id),
+        )
+        todos = iter(fetched_todos)
+        if active_only:
+            todos = (
+                todo
+                for todo in todos
+                if not todo.completed and todo.status != "trashed"
+            )
+        render_todos_for_user(
+            paginate(todos, limit=limit, offset=offset), output_json, page_size, pager
+        )
+        if fetched_todos:
+            save_to_db(fetched_todos)
+        save_sync_state(freshness.TODOS_FOR_USER_KEY, datetime.now())
+    if not output_json:
+        print_staleness(datetime.now())
 
-    if cached:
-        todos = get_todos_for_user_from_db()
-    else:
-        config = read_config()
-        user_id = config.user_id
-        if user_id is None:
-            raise ValueError("User ID not found in configuration")
-        todos = api.get_todos_for_user(user_id)
-        save_to_db(todos)
 
-    if active_only:
-        todos = [
-            todo for todo in todos if not todo.completed and todo.status != "trashed"
-        ]
+def print_staleness(last_synced_at: datetime | None, revalidating: bool = False) -> None:
+    """Tell the user how old the displayed data is (on stderr)."""
+    message = background_sync.describe_staleness(last_synced_at)
+    if revalidating:
+        message += ", refreshing in the background"
+    rprint(f"[dim]{message}[/dim]", file=sys.stderr)
+
 
-    todos.sort(key=lambda todo: todo.get_todo_list_name())
+def parse_datetime(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
 
+
+def render_todos_for_user(todos, output_json, page_size, pager, title="Todos for User"):
     if output_json:
-        todos_as_list_of_dicts = [todo.model_dump(mode="json") for todo in todos]
-        json_data = json.dumps(todos_as_list_of_dicts, indent=2)
-        click.echo(json_data)
-    else:
-        table = Table(title="Todos for User")
-        table.add_column("ID", style="cyan")
-        table.add_column("Title", style="magenta")
-        table.add_column("Status", style="green")
-        table.add_column("List", style="blue")
+        stream_json(todo.model_dump(mode="json") for todo in todos)
+        return
 
+    def todo_rows():
         for todo in todos:
             parent_list_name = f"{todo.get_todo_list_name()[:30]} ({todo.parent_id})"
 
-            if todo.status == "trashed":
+            if todo.id < 0:
+                status = "Queued"
+            elif todo.status == "trashed":
                 status = "Deleted"
             elif todo.completed:
                 status = "Completed"
             else:
                 status = "Active"
 
-            table.add_row(
+            yield (
                 str(todo.id),
                 todo.title,
                 status,
                 parent_list_name,
             )
 
+    stream_table(
+        title,
+        [
+            Column("ID", "cyan", width=10),
+            Column("Title", "magenta"),
+            Column("Status", "green", width=9),
+            Column("List", "blue"),
+        ],
+        todo_rows(),
+        page_size=page_size,
+        pager=pager,
+    )
+
+
+@main.command()
+@click.argument("expression", default="")
+@click.option("--sort", default=None, help="Sort keys, e.g. -updated,title")
+@click.option("--json", "output_json", is_flag=True, help="Output todos in JSON format")
+@click.option(
+    "--explain", is_flag=True, help="Show the SQL and query plan instead of results"
+)
+@paging_options
+def query(expression, sort, output_json, explain, limit, offset, page_size, pager):
+    """Search the local database for todos matching a filter expression.
+
+    \b
+    Examples:
+      tenzing query "due<=+7d -status:trashed completed:no"
+      tenzing query "project:Website assignee:me sort:-updated"
+      tenzing query "list:42 creator:Jane updated<-30d"
+
+    See tenzing.query for the full filter language.
+    """
+    if sort:
+        expression = f"{expression} sort:{sort}"
+    try:
+        statement = compile_query(
+            parse_filter(expression),
+            user_id=read_config().user_id,
+            limit=limit,
+            offset=offset,
+        )
+    except FilterSyntaxError as e:
+        rprint(f"[red]Error:[/red] {str(e)}")
+        sys.exit(2)
+
+    if explain:
+        sql, params, plan = explain_query(statement)
+        rprint("[bold]SQL[/bold]")
+        click.echo(sql)
+        rprint("[bold]Parameters[/bold]")
+        click.echo(json.dumps(params, default=str))
+        rprint("[bold]Plan[/bold]")
+        click.echo("\n".join(plan))
+        return
+
+    render_todos_for_user(
+        iter_query_results(statement), output_json, page_size, pager, title="Todos"
+    )
+    if not output_json:
+        print_staleness(get_last_synced_at())
+
+
+@main.command()
+@click.option(
+    "--user-id",
+    type=int,
+    default=None,
+    help="Show this person's agenda instead of the configured user's",
+)
+@click.option(
+    "--summary", is_flag=True, help="Print one line of counts, e.g. for a status bar"
+)
+@click.option("--json", "output_json", is_flag=True, help="Output the agenda in JSON format")
+def agenda(user_id, summary, output_json):
+    """Show open todos by due date: overdue, today, this week and later."""
+    if user_id is None:
+        user_id = read_config().user_id
+    if user_id is None:
+        rprint("[red]Error:[/red] User ID not found in configuration")
+        sys.exit(1)
+
+    request = {"query": "agenda", "person_id": int(user_id), "summary": summary}
+    result = query_server(request) or load_agenda(int(user_id), summary=summary)
+    if summary or output_json:
+        click.echo(format_agenda(result, output_json))
+        return
+
+    shown = False
+    for bucket in BUCKETS:
+        todos = result["agenda"][bucket]
+        if not todos:
+            continue
+        shown = True
+        table = Table(title=BUCKET_TITLES[bucket])
+        table.add_column("ID", style="cyan", width=10)
+        table.add_column("Title", style="magenta")
+        table.add_column("Due", style="green", width=10)
+        table.add_column("Starts", style="green", width=10)
+        table.add_column("List", style="blue")
+        for todo in todos:
+            table.add_row(
+                str(todo["id"]),
+                todo["title"],
+                todo["due_on"],
+                todo["starts_on"] or "",
+                (todo["parent"] or {}).get("title", ""),
+            )
         rprint(table)
+    if not shown:
+        rprint("Nothing due.")
+    print_staleness(get_last_synced_at())
 
 
 @main.command()
@@ -282,7 +727,21 @@ def get_todos_for_user(cached, output_json, active_only):
 )
 def get_current_todo(output_json):
     """Get the current todo item."""
-    current_todo_id = get_current_todo_id()
+    response = query_server({"query": "current_todo"})
+    if response is not None:
+        current_todo_id = response["todo_id"]
+        todo_item_view = (
+            TodoItemView.model_validate(response["todo"]) if response["todo"] else None
+        )
+        last_synced_at = parse_datetime(response["last_synced_at"])
+    else:
+        current_todo_id = get_current_todo_id()
+        todo_item_view = (
+            get_todo_from_db(current_todo_id) if current_todo_id is not None else None
+        )
+        last_synced_at = None if output_json else get_last_synced_at()
+        refresh_snapshot()
+
     if current_todo_id is None:
         if output_json:
             click.echo(json.dumps({"error": "No current todo set"}))
@@ -290,52 +749,47 @@ def get_current_todo(output_json):
             rprint("[yellow]No current todo set.[/yellow]")
         return
 
-    with get_session() as session:
-        todo_sqlalchemy = (
-            session.query(TodoItem).filter(TodoItem.id == current_todo_id).first()
-        )
-        if todo_sqlalchemy:
-            todo_item_view = sqlalchemy_to_pydantic(todo_sqlalchemy)
-            if output_json:
-                click.echo(todo_item_view.model_dump_json(indent=2))
-            else:
-                table = Table(title="Current Todo")
-                table.add_column("ID", style="cyan")
-                table.add_column("Title", style="magenta")
-                table.add_column("Status", style="green")
-                table.add_column("Due Date", style="yellow")
-
-                table.add_row(
-                    str(todo_item_view.id),
-                    todo_item_view.title,
-                    "Completed" if todo_item_view.completed else "Not Completed",
-                    str(todo_item_view.due_on) if todo_item_view.due_on else "Not set",
-                )
-
-                rprint(table)
+    if todo_item_view:
+        if output_json:
+            click.echo(todo_item_view.model_dump_json(indent=2))
         else:
-            if output_json:
-                click.echo(
-                    json.dumps(
-                        {
-                            "error": f"Todo with ID {current_todo_id} not found in the database"
-                        }
-                    )
-                )
-            else:
-                rprint(
-                    f"[red]Todo with ID {current_todo_id} not found in the database.[/red]"
+            table = Table(title="Current Todo")
+            table.add_column("ID", style="cyan")
+            table.add_column("Title", style="magenta")
+            table.add_column("Status", style="green")
+            table.add_column("Due Date", style="yellow")
+
+            table.add_row(
+                str(todo_item_view.id),
+                todo_item_view.title,
+                "Completed" if todo_item_view.completed else "Not Completed",
+                str(todo_item_view.due_on) if todo_item_view.due_on else "Not set",
+            )
+
+            rprint(table)
+            print_staleness(last_synced_at)
+    else:
+        if output_json:
+            click.echo(
+                json.dumps(
+                    {"error": f"Todo with ID {current_todo_id} not found in the database"}
                 )
+            )
+        else:
+            rprint(
+                f"[red]Todo with ID {current_todo_id} not found in the database.[/red]"
+            )
 
 
 @main.command()
-@click.argument("todo_id", type=int)
+@click.argument("todo_id", type=int, shell_complete=complete_todo_id)
 def set_current_todo(todo_id):
     """Set the current todo item."""
     with get_session() as session:
         todo = session.query(TodoItem).filter(TodoItem.id == todo_id).first()
         if todo:
             insert_current_todo(todo_id)
+            refresh_snapshot()
             rprint(
                 f"[green]Set todo '{todo.title}' (ID: {todo_id}) as the current todo.[/green]"
             )
@@ -343,6 +797,365 @@ def set_current_todo(todo_id):
             rprint(f"[red]Todo with ID {todo_id} not found in the database.[/red]")
 
 
+@main.command()
+@click.argument("todo_id", type=int, shell_complete=complete_todo_id)
+@click.option("--json", "output_json", is_flag=True, help="Output in JSON format")
+def show_todo(todo_id, output_json):
+    """Show a todo with its description and comments from the local database."""
+    todo = get_todo_from_db(todo_id)
+    if todo is None:
+        rprint(f"[red]Todo with ID {todo_id} not found in the database.[/red]")
+        sys.exit(1)
+    comments = get_comments_from_db(todo_id)
+    if output_json:
+        click.echo(
+            json.dumps(
+                {
+                    "todo": todo.model_dump(mode="json"),
+                    "comments": [comment.model_dump(mode="json") for comment in comments],
+                },
+                indent=2,
+                ensure_ascii=False,
+            )
+        )
+        return
+
+    table = Table(title=todo.title, show_header=False)
+    table.add_column("Field", style="cyan")
+    table.add_column("Value")
+    table.add_row("ID", str(todo.id))
+    table.add_row("List", f"{todo.get_todo_list_name()} ({todo.parent_id})")
+    table.add_row("Project", str(todo.bucket.get("name", todo.bucket.get("id"))))
+    table.add_row("Status", "Completed" if todo.completed else todo.status.capitalize())
+    table.add_row(
+        "Assignees",
+        ", ".join(
+            assignee.get("name") or str(assignee.get("id")) for assignee in todo.assignees
+        )
+        or "None",
+    )
+    table.add_row("Due Date", str(todo.due_on) if todo.due_on else "Not set")
+    rprint(table)
+
+    description = html_to_text(todo.description)
+    if description:
+        rprint(description)
+    for comment in comments:
+        rprint(
+            f"\n[bold]{comment.creator.get('name', 'Unknown')}[/bold] "
+            f"[dim]{comment.created_at:%Y-%m-%d %H:%M}[/dim]"
+        )
+        rprint(comment.text)
+
+    synced_at = get_comments_synced_at(todo_id)
+    if synced_at is None and todo.comments_count:
+        rprint(
+            f"\n[dim]{todo.comments_count} comments not synced yet; "
+            "they are fetched by refresh-db and sync[/dim]"
+        )
+    elif synced_at is not None:
+        rprint(f"\n[dim]Comments synced {background_sync.format_age(synced_at)}[/dim]")
+
+
+def parse_since(value: str, now: datetime) -> datetime:
+    """
+    Parse an ISO datetime, or a date as accepted by filters (e.g. yesterday,
+    -7d, 2024-05-01) meaning the start of that day.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.combine(resolve_date(value, now.date()), datetime.min.time())
+    except FilterSyntaxError as e:
+        raise click.BadParameter(str(e), param_hint="--since")
+
+
+@main.command()
+@click.option(
+    "--since",
+    default="yesterday",
+    show_default=True,
+    help="Show changes recorded from this local date or time on, e.g. -7d or 2024-05-01T09:00",
+)
+@click.option(
+    "--project-id",
+    type=int,
+    default=None,
+    shell_complete=complete_project_id,
+    help="Only show changes in this project",
+)
+@click.option(
+    "--todo-id",
+    type=int,
+    default=None,
+    shell_complete=complete_todo_id,
+    help="Only show changes to this todo or todolist",
+)
+@click.option("--json", "output_json", is_flag=True, help="Output in JSON format")
+@paging_options
+def changes(since, project_id, todo_id, output_json, limit, offset, page_size, pager):
+    """Show what changed in todos and todolists, from the local database."""
+    history = iter_changes_from_db(
+        parse_since(since, datetime.now()),
+        project_id=project_id,
+        record_id=todo_id,
+        limit=limit,
+        offset=offset,
+    )
+    if output_json:
+        stream_json(
+            {
+                "recorded_at": change.recorded_at.isoformat(),
+                # Basecamp's updated_at, which is in UTC
+                "changed_at": change.changed_at.isoformat() + "Z" if change.changed_at else None,
+                "record_type": change.record_type,
+                "record_id": change.record_id,
+                "project_id": change.project_id,
+                "title": change.title,
+                "field": change.field,
+                "old_value": change.old_value,
+                "new_value": change.new_value,
+            }
+            for change in history
+        )
+        return
+
+    stream_table(
+        f"Changes Since {since}",
+        [
+            Column("When", "cyan", width=16),
+            Column("ID", "cyan", width=10),
+            Column("Title", "magenta"),
+            Column("Field", "green", width=9),
+            Column("Change", "yellow"),
+        ],
+        (
+            (
+                change.recorded_at.strftime("%Y-%m-%d %H:%M"),
+                str(change.record_id),
+                change.title if change.record_type == "TodoItem" else f"{change.title} (list)",
+                FIELD_TITLES.get(change.field, change.field),
+                f"{format_value(change.old_value)} → {format_value(change.new_value)}",
+            )
+            for change in history
+        ),
+        page_size=page_size,
+        pager=pager,
+    )
+
+
+@main.command()
+@click.option(
+    "--watch",
+    is_flag=True,
+    help="Keep running, polling each project on an adaptive schedule",
+)
+@click.option(
+    "--status", is_flag=True, help="Show the sync daemon and per-project sync times"
+)
+@click.option(
+    "--strategy",
+    type=click.Choice(background_sync.STRATEGIES),
+    default=None,
+    help="Crawl each project, or read the recordings feed (default: sync_strategy in config.toml)",
+)
+def sync(watch, status, strategy):
+    """Sync the configured projects into the local database."""
+    config = read_config()
+    if strategy is not None:
+        config = config._replace(sync_strategy=strategy)
+
+    if status:
+        pid = background_sync.read_daemon_pid()
+        rprint(
+            f"Sync daemon: [green]running (PID {pid})[/green]"
+            if pid
+            else "Sync daemon: [yellow]not running[/yellow]"
+        )
+        table = Table(
+            title=background_sync.describe_staleness(get_last_synced_at())
+        )
+        table.add_column("Project ID", style="cyan")
+        table.add_column("Last Synced", style="green")
+        table.add_column("Next Sync", style="yellow")
+        table.add_column("Interval (s)", style="blue", justify="right")
+        for schedule in background_sync.load_schedules(config, datetime.now()):
+            state = get_sync_state(f"project:{schedule.project_id}")
+            table.add_row(
+                schedule.project_id,
+                background_sync.format_age(state.synced_at if state else None),
+                schedule.due_at.strftime("%Y-%m-%d %H:%M:%S"),
+                f"{schedule.interval_seconds:.0f}",
+            )
+        rprint(table)
+        if config.sync_strategy == "recordings":
+            for type in background_sync.FEED_VIEWS:
+                state = get_sync_state(background_sync.feed_key(type))
+                synced = background_sync.format_age(state.synced_at if state else None)
+                watermark = (
+                    state.watermark.strftime("%Y-%m-%d %H:%M:%S")
+                    if state and state.watermark
+                    else "none yet"
+                )
+                rprint(f"{type} feed: synced {synced}, changes up to {watermark}")
+        return
+
+    api = BasecampAPI()
+    try:
+        with background_sync.pid_lock():
+            if watch:
+                stop_event = threading.Event()
+                signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+                rprint(
+                    f"[green]Watching {len(background_sync.synced_project_ids(config))} projects (PID {os.getpid()}). Press Ctrl-C to stop.[/green]"
+                )
+                try:
+                    background_sync.watch(api, config, stop_event)
+                except KeyboardInterrupt:
+                    pass
+            elif config.sync_strategy == "recordings":
+                with tracked_sync_run("sync"):
+                    changed = background_sync.sync_feed(
+                        api, background_sync.synced_project_ids(config)
+                    )
+                refresh_completion_index()
+                refresh_snapshot()
+                rprint(f"[green]Sync complete, {changed} changed.[/green]")
+            else:
+                now = datetime.now()
+                schedules = [
+                    schedule._replace(due_at=now)
+                    for schedule in background_sync.load_schedules(config, now)
+                ]
+                with tracked_sync_run("sync"):
+                    background_sync.run_sync_cycle(api, schedules, config)
+                refresh_snapshot()
+                rprint("[green]Sync complete.[/green]")
+    except background_sync.SyncLockError as e:
+        rprint(f"[red]Error:[/red] {str(e)}")
+
+
+@main.command()
+@click.option("--limit", type=int, default=30, help="Number of recent runs to show")
+@click.option("--command", default=None, help="Only show runs of this command")
+def stats(limit, command):
+    """Show operational metrics recorded for recent syncs."""
+    runs = get_sync_runs(limit=limit, command=command)
+    if not runs:
+        rprint("[yellow]No sync runs recorded yet.[/yellow]")
+        return
+
+    table = Table(title="Recent Sync Runs")
+    table.add_column("Started At", style="cyan")
+    table.add_column("Command", style="magenta")
+    table.add_column("OK", style="green")
+    table.add_column("Duration (s)", style="yellow", justify="right")
+    table.add_column("Requests", style="blue", justify="right")
+    table.add_column("KB", style="blue", justify="right")
+    table.add_column("Cache Hits", style="green", justify="right")
+    table.add_column("Rows", style="magenta", justify="right")
+    table.add_column("Throttled (s)", style="red", justify="right")
+
+    for run in runs:
+        ratio = cache_hit_ratio(run.http_requests, run.cache_hits)
+        table.add_row(
+            run.started_at.strftime("%Y-%m-%d %H:%M:%S"),
+            run.command,
+            "Yes" if run.succeeded else "No",
+            f"{run.duration_seconds:.1f}",
+            str(run.http_requests),
+            f"{run.bytes_downloaded / 1024:.0f}",
+            f"{ratio:.0%}" if ratio is not None else "N/A",
+            str(run.rows_upserted),
+            f"{run.throttled_seconds:.1f}",
+        )
+
+    rprint(table)
+
+    percentiles = Table(title=f"Percentiles over {len(runs)} Runs")
+    percentiles.add_column("Metric", style="cyan")
+    for label in ("p50", "p90", "p99", "max"):
+        percentiles.add_column(label, style="yellow", justify="right")
+
+    for metric in (
+        "duration_seconds",
+        "http_requests",
+        "bytes_downloaded",
+        "cache_hits",
+        "rows_upserted",
+        "throttled_seconds",
+    ):
+        values = [getattr(run, metric) or 0 for run in runs]
+        percentiles.add_row(
+            metric,
+            *[f"{percentile(values, pct):,.1f}" for pct in (50, 90, 99, 100)],
+        )
+
+    rprint(percentiles)
+
+
+@main.command()
+def serve():
+    """Keep cached query results in memory and answer them over a Unix socket."""
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    rprint("[green]Serving cached queries. Press Ctrl-C to stop.[/green]")
+    try:
+        run_query_server()
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        rprint(f"[red]Error:[/red] {str(e)}")
+
+
+@main.command()
+@click.option("--host", default=webhooks.DEFAULT_HOST, show_default=True)
+@click.option("--port", type=int, default=webhooks.DEFAULT_PORT, show_default=True)
+@click.option(
+    "--path",
+    default="/",
+    show_default=True,
+    help="URL path deliveries are accepted on; use a hard-to-guess one if exposed",
+)
+def webhook_receiver(host, port, path):
+    """Apply Basecamp webhook deliveries to the local database as they arrive."""
+    apis = []
+
+    def fetch(url, type):
+        # Only needed for payloads that lack fields, so connect on first use
+        if not apis:
+            apis.append(BasecampAPI())
+        return apis[0].get_raw_recording(url, type)
+
+    def report(result):
+        style = "green" if result.applied else "dim"
+        rprint(f"[{style}]{result.kind}[/{style}] {result.recording_id}: {result.detail}")
+
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server = webhooks.WebhookServer(
+            host,
+            port,
+            path,
+            apply=lambda payload: webhooks.apply_webhook_event(payload, fetch),
+            on_result=report,
+        )
+    except OSError as e:
+        rprint(f"[red]Error:[/red] Can't listen on {host}:{port}. {str(e)}")
+        sys.exit(1)
+    rprint(
+        f"[green]Receiving Basecamp webhooks on http://{host}:{port}{path}. "
+        "Press Ctrl-C to stop.[/green]"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
 @main.command()
 def init_database():
     """Initialize the database and create all tables."""
@@ -353,53 +1166,70 @@ def init_database():
 @main.command()
 @click.option("--title", prompt=True, help="The title of the todo")
 @click.option("--body", prompt=True, help="The detailed description of the todo")
-@click.option("--todolist-id", type=int, prompt=True, help="The ID of the todolist")
-@click.option("--project-id", type=int, prompt=True, help="The ID of the project")
-def create_todo(title, body, todolist_id, project_id):
+@click.option(
+    "--todolist-id",
+    type=int,
+    prompt=True,
+    shell_complete=complete_todolist_id,
+    help="The ID of the todolist",
+)
+@click.option(
+    "--project-id",
+    type=int,
+    prompt=True,
+    shell_complete=complete_project_id,
+    help="The ID of the project",
+)
+@click.option(
+    "--wait",
+    is_flag=True,
+    help="Send the todo to Basecamp before exiting instead of in the background",
+)
+def create_todo(title, body, todolist_id, project_id, wait):
     """Create a new todo in Basecamp and save it to the local database."""
-    api = BasecampAPI()
     config = read_config()
 
     # Use the current user's ID from config.toml
     assignee_id = config.user_id
 
-    # Call the Basecamp API to create the todo
-    new_todo = api.create_todo(project_id, todolist_id, title, body, assignee_id)
-
-    if new_todo:
-        # Save the new todo to the local database
-        todo_view = TodoItemView.from_api_data(new_todo)
-        save_to_db([todo_view])
+    # Queue the todo; it gets a provisional local ID until Basecamp creates it
+    todo_view = outbox.queue_todo_creation(
+        project_id, todolist_id, title, body, assignee_id
+    )
 
-        # Display success message with the new todo's details
-        table = Table(title="New Todo Created")
-        table.add_column("Field", style="cyan")
-        table.add_column("Value", style="magenta")
+    # Display success message with the new todo's details
+    table = Table(title="New Todo Queued")
+    table.add_column("Field", style="cyan")
+    table.add_column("Value", style="magenta")
+
+    table.add_row("Local ID", str(todo_view.id))
+    table.add_row("Title", todo_view.title)
+    table.add_row(
+        "Body",
+        (
+            todo_view.description[:50] + "..."
+            if len(todo_view.description) > 50
+            else todo_view.description
+        ),
+    )
+    table.add_row("Project ID", str(project_id))
+    table.add_row("Todolist ID", str(todo_view.parent_id))
+    table.add_row("Assignee ID", str(assignee_id))
 
-        table.add_row("ID", str(todo_view.id))
-        table.add_row("Title", todo_view.title)
-        table.add_row(
-            "Body",
-            (
-                todo_view.description[:50] + "..."
-                if len(todo_view.description) > 50
-                else todo_view.description
-            ),
-        )
-        table.add_row("Project ID", str(project_id))
-        table.add_row("Todolist ID", str(todo_view.parent_id))
-        table.add_row("Assignee ID", str(assignee_id))
+    rprint("[green]Todo queued successfully![/green]")
+    rprint(table)
 
-        rprint("[green]Todo created successfully![/green]")
-        rprint(table)
+    if wait:
+        report_flush_results(outbox.flush_outbox(BasecampAPI()))
     else:
-        rprint("[red]Failed to create todo.[/red]")
+        outbox.spawn_background_flush()
 
 
 @main.command()
 @click.option(
     "--todolist-id",
     type=int,
+    shell_complete=complete_todolist_id,
     help="The ID of the todolist to create the todo in",
     default=None,
 )
@@ -407,12 +1237,234 @@ def create_todo_editor(todolist_id):
     """Create a new todo using the default editor."""
     new_todo = create_todo_from_editor(todolist_id)
     if new_todo:
+        outbox.spawn_background_flush()
         click.echo(
-            f"Todo '{new_todo.title}' created successfully in todolist {new_todo.parent_id}"
+            f"Todo '{new_todo.title}' queued for todolist {new_todo.parent_id} (local ID {new_todo.id})"
         )
     else:
         click.echo("Failed to create todo")
 
 
+@main.command()
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--todolist-id",
+    type=int,
+    default=None,
+    shell_complete=complete_todolist_id,
+    help="The todolist for todos that don't name one",
+)
+@click.option(
+    "--wait",
+    is_flag=True,
+    help="Send the todos to Basecamp before exiting instead of in the background",
+)
+def create_todos(path, todolist_id, wait):
+    """Create every todo described in a markdown file.
+
+    The file holds several frontmatter documents (project_id, todolist_id,
+    title), or one heading per todo under a shared frontmatter block.
+    Everything is validated before anything is queued.
+    """
+    try:
+        new_todos = create_todos_from_file(path, todolist_id)
+    except ValueError as e:
+        rprint(f"[red]Error:[/red] {str(e)}")
+        sys.exit(1)
+
+    table = Table(title=f"{len(new_todos)} Todos Queued")
+    table.add_column("Local ID", style="cyan")
+    table.add_column("Title", style="magenta")
+    table.add_column("Todolist ID", style="green")
+    for todo_view in new_todos:
+        table.add_row(str(todo_view.id), todo_view.title, str(todo_view.parent_id))
+    rprint(table)
+
+    if wait:
+        report_flush_results(outbox.flush_outbox(BasecampAPI()))
+    else:
+        outbox.spawn_background_flush()
+
+
+@main.command()
+@click.option("--quiet", is_flag=True, help="Don't print a report")
+def flush_outbox(quiet):
+    """Send queued todo creations to Basecamp."""
+    results = outbox.flush_outbox(BasecampAPI())
+    if not quiet:
+        report_flush_results(results)
+
+
+def report_flush_results(results: list[outbox.FlushResult]) -> None:
+    if not results:
+        rprint("[yellow]Outbox is empty.[/yellow]")
+        return
+
+    table = Table(title="Outbox Flush")
+    table.add_column("Local ID", style="cyan")
+    table.add_column("Basecamp ID", style="green")
+    table.add_column("Error", style="red")
+
+    for result in results:
+        table.add_row(
+            str(result.local_id),
+            str(result.remote_id) if result.remote_id else "",
+            result.error or "",
+        )
+
+    rprint(table)
+
+    failed = get_outbox_entries(["failed"])
+    if failed:
+        rprint(
+            f"[red]{len(failed)} queued todos were not sent again: they failed "
+            f"{outbox.MAX_ATTEMPTS} times, or Basecamp may have created them. "
+            "See `tenzing outbox list`.[/red]"
+        )
+
+
+@main.group(name="outbox")
+def outbox_commands():
+    """List, retry or discard queued todo creations."""
+
+
+@outbox_commands.command(name="list")
+@click.option(
+    "--all", "show_all", is_flag=True, help="Include entries that were sent or discarded"
+)
+def list_outbox(show_all):
+    """List queued todo creations that haven't reached Basecamp."""
+    statuses = None if show_all else ["pending", "in_flight", "created", "failed"]
+    entries = get_outbox_entries(statuses)
+    if not entries:
+        rprint("[yellow]Outbox is empty.[/yellow]")
+        return
+
+    table = Table(title="Outbox")
+    table.add_column("Entry ID", style="cyan")
+    table.add_column("Local ID", style="cyan")
+    table.add_column("Status", style="yellow")
+    table.add_column("Attempts", style="blue")
+    table.add_column("Title", style="magenta")
+    table.add_column("Todolist ID", style="green")
+    table.add_column("Error", style="red")
+
+    for entry in entries:
+        table.add_row(
+            str(entry.id),
+            str(entry.local_id),
+            entry.status,
+            str(entry.attempts),
+            entry.payload.get("title", ""),
+            str(entry.payload.get("todolist_id", "")),
+            entry.last_error or "",
+        )
+
+    rprint(table)
+
+
+@outbox_commands.command(name="retry")
+@click.argument("entry_ids", type=int, nargs=-1, required=True)
+@click.option(
+    "--wait",
+    is_flag=True,
+    help="Send the todos to Basecamp before exiting instead of in the background",
+)
+def retry_outbox(entry_ids, wait):
+    """Send failed entries again. Check Basecamp first: they may exist already."""
+    retried = retry_outbox_entries(list(entry_ids))
+    for entry_id in sorted(set(entry_ids) - set(retried)):
+        rprint(
+            f"[red]Error:[/red] Outbox entry {entry_id} is not failed.", file=sys.stderr
+        )
+    if not retried:
+        return
+
+    rprint(f"[green]Queued {len(retried)} entries again.[/green]")
+    if wait:
+        report_flush_results(outbox.flush_outbox(BasecampAPI()))
+    else:
+        outbox.spawn_background_flush()
+
+
+@outbox_commands.command(name="discard")
+@click.argument("entry_ids", type=int, nargs=-1, required=True)
+def discard_outbox(entry_ids):
+    """Drop failed entries and their provisional todos."""
+    discarded = discard_outbox_entries(list(entry_ids))
+    for entry_id in sorted(set(entry_ids) - set(discarded)):
+        rprint(
+            f"[red]Error:[/red] Outbox entry {entry_id} is not failed.", file=sys.stderr
+        )
+    if discarded:
+        rprint(f"[green]Discarded {len(discarded)} entries.[/green]")
+
+
+@main.command()
+@click.argument("input_file", type=click.File("r"), default="-")
+@click.option(
+    "--action",
+    "default_action",
+    type=click.Choice(bulk.ACTIONS),
+    default=None,
+    help="Action for lines that only contain a todo ID",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="Number of operations sent to Basecamp at once",
+)
+@click.option(
+    "--json", "output_json", is_flag=True, help="Print results as NDJSON"
+)
+def bulk_edit(input_file, default_action, workers, output_json):
+    """Complete, reassign, reschedule or update many todos, read from INPUT_FILE or stdin."""
+    operations, results = bulk.parse_operations(input_file, default_action)
+    if operations:
+        with tracked_sync_run("bulk-edit"):
+            results += bulk.run_bulk(
+                BasecampAPI(concurrency=workers), operations, max_workers=workers
+            )
+    results.sort(key=lambda result: result.line_number)
+
+    if output_json:
+        for result in results:
+            click.echo(
+                json.dumps(
+                    {
+                        "line": result.line_number,
+                        "id": result.todo_id,
+                        "action": result.action,
+                        "ok": result.error is None,
+                        "error": result.error,
+                    }
+                )
+            )
+    else:
+        table = Table(title="Bulk Edit")
+        table.add_column("Line", style="blue", justify="right")
+        table.add_column("Todo ID", style="cyan")
+        table.add_column("Action", style="magenta")
+        table.add_column("Result", style="green")
+        for result in results:
+            table.add_row(
+                str(result.line_number),
+                str(result.todo_id or ""),
+                result.action or "",
+                f"[red]{result.error}[/red]" if result.error else "OK",
+            )
+        rprint(table)
+
+    failed = sum(1 for result in results if result.error)
+    rprint(
+        f"[green]{len(results) - failed} succeeded[/green], [red]{failed} failed[/red]",
+        file=sys.stderr,
+    )
+    if failed:
+        sys.exit(1)
+
+
 if __name__ == "__main__":
     sys.exit(main())  # pragma: no cover
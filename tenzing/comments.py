@@ -0,0 +1,119 @@
+"""
+This module syncs the comments on todos.
+
+Fetching every todo's comments would cost a request per todo on each sync.
+Instead, the comment_syncs table remembers each todo's comments_count and
+updated_at as of its last comment fetch. Only todos where either value has
+changed since then are fetched again, with the values saved by the regular
+todo sync. A new or deleted comment changes comments_count, and changes to
+the todo itself change updated_at. A comment edited in place is picked up
+the next time either value changes.
+
+Comments are stored in the comments table. Their text is indexed by the
+comments_fts full-text table, which backs the `comment:` term of
+`tenzing query`. `tenzing show-todo` displays them.
+
+Only the standard library is imported at the top level, because
+models.CommentView uses html_to_text.
+"""
+
+from html.parser import HTMLParser
+
+BLOCK_TAGS = {
+    "blockquote",
+    "br",
+    "div",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "li",
+    "p",
+    "pre",
+    "tr",
+}
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self.in_pre = False
+
+    def handle_starttag(self, tag, attrs) -> None:
+        if tag in BLOCK_TAGS:
+            self.parts.append("\n")
+        self.in_pre = self.in_pre or tag == "pre"
+
+    def handle_endtag(self, tag) -> None:
+        if tag in BLOCK_TAGS:
+            self.parts.append("\n")
+        if tag == "pre":
+            self.in_pre = False
+
+    def handle_data(self, data) -> None:
+        # Outside <pre>, line breaks in the source are just whitespace
+        self.parts.append(data if self.in_pre else data.replace("\n", " "))
+
+
+def html_to_text(html: str) -> str:
+    """
+    The text of a Basecamp rich text body, one line per block.
+    """
+    extractor = _TextExtractor()
+    extractor.feed(html or "")
+    extractor.close()
+    lines = (" ".join(line.split()) for line in "".join(extractor.parts).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def fts_query(value: str) -> str:
+    """
+    Quote each word of `value` for an FTS5 MATCH, so punctuation is searched
+    for rather than parsed as query syntax. A trailing `*` keeps prefix
+    matching.
+    """
+    terms = []
+    for word in value.split():
+        prefix = word.endswith("*") and len(word) > 1
+        word = word.rstrip("*") if prefix else word
+        terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def sync_comments(api, project_ids: list[str] | None = None) -> int:
+    """
+    Fetch and save the comments of the todos (in `project_ids`, if given)
+    whose comments_count or updated_at changed since their comments were
+    last fetched. Returns the number of todos fetched.
+
+    A todo whose comments can't be fetched is skipped until the next sync, so
+    one todo can't hold up the rest. One that is gone from Basecamp (404) is
+    recorded as having no comments, so it isn't asked for again until the
+    regular todo sync sees it change.
+    """
+    from basecampy3.exc import Basecamp3Error
+
+    from tenzing.models import CommentView
+    from tenzing.persist import get_todos_needing_comment_sync, save_comments
+
+    synced = 0
+    for todo in get_todos_needing_comment_sync(project_ids):
+        comments = []
+        if todo.comments_count:
+            try:
+                comments = [
+                    CommentView.from_api_data(comment)
+                    for comment in api.iter_raw_comments(todo.comments_url)
+                ]
+            except Basecamp3Error as e:
+                if e.response is None or e.response.status_code != 404:
+                    print(f"Error syncing the comments of todo {todo.id}: {str(e)}")
+                    continue
+        save_comments(todo, comments)
+        synced += 1
+    if synced:
+        print(f"Synced the comments of {synced} todos")
+    return synced
@@ -0,0 +1,188 @@
+"""
+This module implements shell completion for project, todo list and todo IDs.
+
+Tab completion has to answer in a few milliseconds, which rules out calling
+Basecamp or even importing SQLAlchemy. Instead, syncing writes a compact
+completion index next to the database: one tab-separated line per ID,
+
+    kind<TAB>id<TAB>parent_id<TAB>label
+
+grouped by kind. Reading it only needs the standard library, so
+tenzing.launcher can answer completion requests without loading the CLI.
+
+A candidate matches when its ID starts with what was typed, or when the typed
+characters appear in order in its name or title ("wrdc" matches "Write docs"),
+so an ID can be found by typing part of a title.
+"""
+
+import os
+from typing import Iterable, NamedTuple
+
+# Kept next to tenzing.db.DB_PATH; importing tenzing.db would pull in SQLAlchemy
+COMPLETION_PATH = os.path.expanduser("~/.config/tenzing/completion.tsv")
+
+# For each command, the kinds of its positional arguments and of its ID options
+ID_PARAMETERS = {
+    "list-todolists": ([], {"--project-id": "project"}),
+    "list-todo-items": (["project", "todolist"], {}),
+    "set-current-todo": (["todo"], {}),
+    "create-todo": ([], {"--todolist-id": "todolist", "--project-id": "project"}),
+    "create-todo-editor": ([], {"--todolist-id": "todolist"}),
+    "create-todos": ([], {"--todolist-id": "todolist"}),
+}
+
+# Options of those commands (and of the main group) that consume the next word
+VALUE_OPTIONS = {
+    "--profile",
+    "--limit",
+    "--offset",
+    "--page-size",
+    "--title",
+    "--body",
+    "--todolist-id",
+    "--project-id",
+}
+
+
+class CompletionEntry(NamedTuple):
+    kind: str
+    id: str
+    parent_id: str
+    label: str
+
+
+def _clean(value) -> str:
+    return " ".join(str(value or "").split())
+
+
+def completion_target(args: list[str], incomplete: str) -> tuple[str, str | None] | None:
+    """
+    Work out which ID the word being completed is, given the words before it.
+    Returns (kind, parent_id), where parent_id narrows todo lists to a project
+    already given on the command line, or None if the word isn't an ID.
+    """
+    if incomplete.startswith("-"):
+        return None
+
+    words = iter(args)
+    command = None
+    for word in words:
+        if word in VALUE_OPTIONS:
+            next(words, None)
+        elif not word.startswith("-"):
+            command = word
+            break
+    if command not in ID_PARAMETERS:
+        return None
+
+    positional_kinds, option_kinds = ID_PARAMETERS[command]
+    positionals = []
+    options = {}
+    pending_option = None
+    for word in words:
+        if pending_option:
+            options[pending_option] = word
+            pending_option = None
+        elif word in VALUE_OPTIONS:
+            pending_option = word
+        elif not word.startswith("-"):
+            positionals.append(word)
+
+    if pending_option:
+        kind = option_kinds.get(pending_option)
+    elif len(positionals) < len(positional_kinds):
+        kind = positional_kinds[len(positionals)]
+    else:
+        kind = None
+    if kind is None:
+        return None
+
+    if kind == "todolist":
+        parent_id = positionals[0] if positionals else options.get("--project-id")
+    else:
+        parent_id = None
+    return kind, parent_id
+
+
+def write_completion_index(
+    entries: Iterable[CompletionEntry], path: str = COMPLETION_PATH
+) -> int:
+    """
+    Atomically replace the index at `path` with `entries`. Returns the number
+    of entries written.
+    """
+    lines = sorted(
+        "\t".join((entry.kind, str(entry.id), _clean(entry.parent_id), _clean(entry.label)))
+        for entry in entries
+    )
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n" if lines else "")
+    os.replace(tmp_path, path)
+    return len(lines)
+
+
+def refresh_completion_index(path: str = COMPLETION_PATH) -> int:
+    """
+    Rebuild the index from the local database.
+    """
+    from tenzing.persist import get_completion_rows
+
+    return write_completion_index(
+        (CompletionEntry(*row) for row in get_completion_rows()), path
+    )
+
+
+def read_completion_index(
+    kind: str, parent_id: str | None = None, path: str = COMPLETION_PATH
+) -> list[CompletionEntry]:
+    """
+    Return the entries of one kind, optionally only those under `parent_id`.
+    A missing index reads as empty.
+    """
+    prefix = kind + "\t"
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = [line for line in f if line.startswith(prefix)]
+    except FileNotFoundError:
+        return []
+
+    entries = []
+    for line in lines:
+        entry = CompletionEntry(*line.rstrip("\n").split("\t", 3))
+        if parent_id is None or entry.parent_id == parent_id:
+            entries.append(entry)
+    return entries
+
+
+def fuzzy_match(typed: str, label: str) -> bool:
+    """
+    True if the characters of `typed` appear in `label` in order, ignoring case.
+    """
+    remaining = iter(label.lower())
+    return all(char in remaining for char in typed.lower())
+
+
+def complete_ids(
+    kind: str,
+    incomplete: str,
+    parent_id: str | None = None,
+    path: str = COMPLETION_PATH,
+) -> list[CompletionEntry]:
+    """
+    Return the entries matching `incomplete`: ID prefix matches first, then
+    title substring matches, then fuzzy title matches.
+    """
+    ranked = []
+    for entry in read_completion_index(kind, parent_id, path):
+        if entry.id.startswith(incomplete):
+            rank = 0
+        elif incomplete.lower() in entry.label.lower():
+            rank = 1
+        elif fuzzy_match(incomplete, entry.label):
+            rank = 2
+        else:
+            continue
+        ranked.append((rank, entry.label.lower(), entry))
+    ranked.sort(key=lambda item: item[:2])
+    return [entry for _, _, entry in ranked]
@@ -17,16 +17,57 @@ project_ids = [
 # User ID for fetching todos
 user_id = "12345678"
 
+# Polling bounds, in seconds, for `tenzing sync --watch`
+sync_min_interval = 60
+sync_max_interval = 1800
+
+# How `tenzing sync` finds changes: "projects" crawls each project's todo
+# lists, "recordings" reads the account-wide feed of recently updated todos
+sync_strategy = "projects"
+
+# Pages of a Basecamp list fetched ahead while the current one is processed
+prefetch_depth = 2
+
+# Projects synced besides project_ids: IDs or globs on project names. Other
+# projects are only fetched on demand or by `tenzing refresh-db --all`
+[scope]
+include = ["Client: *"]
+exclude = ["* (archive)"]
+
+# Connections kept open to Basecamp, and request timeouts in seconds
+[http]
+pool_size = 10
+connect_timeout = 5
+read_timeout = 30
+
+# How long, in seconds, cached data is served without a background refresh
+[max_age]
+projects = 86400
+users = 86400
+todolists = 3600
+todos = 300
+
 """
 
 import tomllib
 from pathlib import Path
 from typing import NamedTuple
 
+DEFAULT_MAX_AGE = {"projects": 86400, "users": 86400, "todolists": 3600, "todos": 300}
+DEFAULT_HTTP = {"pool_size": 10, "connect_timeout": 5, "read_timeout": 30}
+DEFAULT_SCOPE = {"include": [], "exclude": []}
+
 
 class Config(NamedTuple):
     project_ids: list[str]
     user_id: str | None
+    sync_min_interval: float = 60
+    sync_max_interval: float = 1800
+    sync_strategy: str = "projects"
+    prefetch_depth: int = 2
+    max_age: dict[str, float] = DEFAULT_MAX_AGE
+    http: dict[str, float] = DEFAULT_HTTP
+    scope: dict[str, list[str]] = DEFAULT_SCOPE
 
 
 def read_config() -> Config:
@@ -44,4 +85,14 @@ def read_config() -> Config:
 
     project_ids = config_data.get("project_ids", [])
     user_id = config_data.get("user_id")
-    return Config(project_ids=project_ids, user_id=user_id)
+    return Config(
+        project_ids=project_ids,
+        user_id=user_id,
+        sync_min_interval=config_data.get("sync_min_interval", 60),
+        sync_max_interval=config_data.get("sync_max_interval", 1800),
+        sync_strategy=config_data.get("sync_strategy", "projects"),
+        prefetch_depth=config_data.get("prefetch_depth", 2),
+        max_age={**DEFAULT_MAX_AGE, **config_data.get("max_age", {})},
+        http={**DEFAULT_HTTP, **config_data.get("http", {})},
+        scope={**DEFAULT_SCOPE, **config_data.get("scope", {})},
+    )
@@ -7,8 +7,15 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     Date,
+    Float,
     ForeignKey,
+    Index,
+    func,
+    inspect,
+    literal_column,
+    text,
 )
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy.orm import sessionmaker, declarative_base, relationship
 from sqlalchemy.dialects.sqlite import JSON
 from datetime import datetime
@@ -27,6 +34,15 @@ engine = create_engine(f"sqlite:///{DB_PATH}")
 Session = sessionmaker(bind=engine)
 
 
+def json_field(column, path: str):
+    """
+    json_extract(column, path) with the path written into the SQL. SQLite only
+    uses an expression index when the expression matches it exactly, which a
+    bound `?` path never does.
+    """
+    return func.json_extract(column, literal_column(f"'{path}'"))
+
+
 class BaseCampEntity(Base):
     __abstract__ = True
 
@@ -74,6 +90,9 @@ class User(BaseCampEntity):
 
 class TodoList(BaseCampEntity):
     __tablename__ = "todolists"
+    __table_args__ = (
+        Index("ix_todolists_project_id", json_field(text("bucket"), "$.id")),
+    )
 
     parent_id = Column(Integer)
     parent_type = Column(String)
@@ -103,8 +122,16 @@ class TodoList(BaseCampEntity):
 
 class TodoItem(BaseCampEntity):
     __tablename__ = "todoitems"
+    __table_args__ = (
+        Index("ix_todoitems_status", "status"),
+        Index("ix_todoitems_completed", "completed"),
+        # Serves due date ranges, with the agenda's filters read from the index
+        Index("ix_todoitems_agenda", "due_on", "completed", "status"),
+        Index("ix_todoitems_updated_at", "updated_at"),
+        Index("ix_todoitems_project_id", json_field(text("bucket"), "$.id")),
+    )
 
-    parent_id = Column(Integer)
+    parent_id = Column(Integer, index=True)
     parent_type = Column(String)
     status = Column(String)
     visible_to_clients = Column(Boolean)
@@ -132,6 +159,123 @@ class TodoItem(BaseCampEntity):
     completion_url = Column(String)
 
 
+class TodoAssignee(Base):
+    """
+    One row per todo and assignee, mirroring TodoItem.assignee_ids, so a
+    person's todos are found through an index instead of matching JSON text.
+    """
+
+    __tablename__ = "todo_assignees"
+    __table_args__ = (Index("ix_todo_assignees_person_id", "person_id", "todo_id"),)
+
+    todo_id = Column(Integer, primary_key=True)
+    person_id = Column(Integer, primary_key=True)
+
+
+BACKFILL_TODO_ASSIGNEES = text(
+    """
+    INSERT OR IGNORE INTO todo_assignees (todo_id, person_id)
+    SELECT todoitems.id, CAST(assignee.value AS INTEGER)
+    FROM todoitems, json_each(todoitems.assignee_ids) AS assignee
+    WHERE json_valid(todoitems.assignee_ids)
+    """
+)
+
+
+class Comment(BaseCampEntity):
+    """
+    A comment on a todo. `text` is `content` without HTML, for the
+    comments_fts full-text index.
+    """
+
+    __tablename__ = "comments"
+    __table_args__ = (Index("ix_comments_parent_id", "parent_id", "created_at"),)
+
+    parent_id = Column(Integer)
+    parent_type = Column(String)
+    status = Column(String)
+    content = Column(String)
+    text = Column(String)
+    creator = Column(JSON)
+    url = Column(String)
+    app_url = Column(String)
+
+
+class CommentSync(Base):
+    """
+    A todo's comments_count and updated_at when its comments were last
+    fetched; the comments are fetched again only once either changes.
+    """
+
+    __tablename__ = "comment_syncs"
+
+    todo_id = Column(Integer, primary_key=True)
+    comments_count = Column(Integer)
+    updated_at = Column(DateTime)
+    synced_at = Column(DateTime)
+
+
+# An external-content FTS5 index over comments.text, kept up to date by
+# triggers so every write to comments is indexed in the same transaction
+CREATE_COMMENTS_FTS = [
+    text(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts
+        USING fts5(text, content='comments', content_rowid='id')
+        """
+    ),
+    text(
+        """
+        CREATE TRIGGER IF NOT EXISTS comments_fts_insert AFTER INSERT ON comments
+        BEGIN
+            INSERT INTO comments_fts (rowid, text) VALUES (new.id, new.text);
+        END
+        """
+    ),
+    text(
+        """
+        CREATE TRIGGER IF NOT EXISTS comments_fts_delete AFTER DELETE ON comments
+        BEGIN
+            INSERT INTO comments_fts (comments_fts, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END
+        """
+    ),
+    text(
+        """
+        CREATE TRIGGER IF NOT EXISTS comments_fts_update AFTER UPDATE ON comments
+        BEGIN
+            INSERT INTO comments_fts (comments_fts, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO comments_fts (rowid, text) VALUES (new.id, new.text);
+        END
+        """
+    ),
+]
+
+
+class ChangeHistory(Base):
+    """
+    One changed field of a todo or todolist, appended by save_to_db (see
+    tenzing.history). `changed_at` is the record's updated_at on Basecamp
+    (UTC); `recorded_at` is the local time tenzing saved the change.
+    """
+
+    __tablename__ = "change_history"
+    __table_args__ = (Index("ix_change_history_recorded_at", "recorded_at"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    changed_at = Column(DateTime)
+    recorded_at = Column(DateTime, default=datetime.now)
+    record_type = Column(String)
+    record_id = Column(Integer)
+    project_id = Column(Integer)
+    title = Column(String)
+    field = Column(String)
+    old_value = Column(JSON)
+    new_value = Column(JSON)
+
+
 class CurrentTodoHistory(Base):
     __tablename__ = "current_todo_history"
 
@@ -139,8 +283,81 @@ class CurrentTodoHistory(Base):
     made_current_todo_at = Column(DateTime, default=datetime.now)
 
 
+class SyncRun(Base):
+    __tablename__ = "sync_runs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    command = Column(String)
+    started_at = Column(DateTime, default=datetime.now, index=True)
+    duration_seconds = Column(Float)
+    succeeded = Column(Boolean)
+    http_requests = Column(Integer)
+    bytes_downloaded = Column(Integer)
+    cache_hits = Column(Integer)
+    rows_upserted = Column(Integer)
+    throttled_seconds = Column(Float)
+
+
+class SyncState(Base):
+    __tablename__ = "sync_state"
+
+    key = Column(String, primary_key=True)
+    synced_at = Column(DateTime)
+    watermark = Column(DateTime)
+    interval_seconds = Column(Float)
+
+
+class RefreshCheckpoint(Base):
+    """
+    Progress of `refresh-db`: the "run" row records when the current refresh
+    started and finished, and each other row a container (users, projects,
+    project:<id>, todolist:<id>) that run has saved.
+    """
+
+    __tablename__ = "refresh_checkpoints"
+
+    container = Column(String, primary_key=True)
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
+
+
+class OutboxEntry(Base):
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    local_id = Column(Integer, index=True)
+    action = Column(String)
+    payload = Column(JSON)
+    status = Column(String, default="pending", index=True)
+    attempts = Column(Integer, default=0)
+    last_error = Column(String)
+    remote_id = Column(Integer)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now)
+
+
+_indexes_checked = False
+
+
 def init_db():
+    global _indexes_checked
+    if _indexes_checked:
+        Base.metadata.create_all(engine)
+        return
+    had_assignees = inspect(engine).has_table(TodoAssignee.__tablename__)
     Base.metadata.create_all(engine)
+    # create_all only creates indexes along with a new table, so add any that
+    # were declared after an existing database was created
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+        if not had_assignees:
+            # Fill the mapping from todos saved before it existed
+            connection.execute(BACKFILL_TODO_ASSIGNEES)
+        for statement in CREATE_COMMENTS_FTS:
+            connection.execute(statement)
+    _indexes_checked = True
 
 
 # Update these functions to use get_session()
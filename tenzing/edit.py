@@ -1,14 +1,32 @@
 import os
+import re
 import tempfile
 import subprocess
+from typing import NamedTuple
+
 import frontmatter
 import markdown
-from tenzing.models import TodoItemView
-from tenzing.basecamp_api import BasecampAPI
-from tenzing.persist import save_to_db, get_todolist_from_db, get_project_from_db
+from tenzing.outbox import queue_todo_creation, queue_todo_creations
+from tenzing.persist import get_todolist_from_db, get_project_from_db
 from tenzing.config import read_config
 
 
+FRONTMATTER_BLOCK = re.compile(r"^---[ \t]*\n(.*?)^---[ \t]*$\n?", re.M | re.S)
+HEADING = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$")
+
+
+class TodoDraft(NamedTuple):
+    project_id: str
+    todolist_id: str
+    title: str
+    body: str
+
+
+def clean_id(value) -> str:
+    """Drop the "(name)" that templates put after an ID."""
+    return str(value or "").split("(")[0].strip()
+
+
 def get_editor():
     return os.environ.get("VISUAL") or os.environ.get("EDITOR", "vim")
 
@@ -62,12 +80,8 @@ def edit_todo(todolist_id=None):
         with open(temp_file_path, "r") as file:
             post = frontmatter.load(file)
 
-        project_id = (
-            post.get("project_id").split("(")[0].strip()
-        )  # Remove everything in parentheses
-        todolist_id = (
-            post.get("todolist_id").split("(")[0].strip()
-        )  # Remove everything in parentheses
+        project_id = clean_id(post.get("project_id"))
+        todolist_id = clean_id(post.get("todolist_id"))
         title = post.get("title")
         body = markdown.markdown(post.content)
 
@@ -77,15 +91,9 @@ def edit_todo(todolist_id=None):
         config = read_config()
         assignee_id = config.user_id
 
-        # Create todo using Basecamp API
-        api = BasecampAPI()
-        new_todo = api.create_todo(project_id, todolist_id, title, body, assignee_id)
-
-        # Save todo to local database
-        todo_view = TodoItemView.from_api_data(new_todo)
-        save_to_db([todo_view])
-
-        return todo_view
+        # Queue the todo in the local outbox; it is sent to Basecamp by
+        # outbox.flush_outbox, so a network failure can't lose it
+        return queue_todo_creation(project_id, todolist_id, title, body, assignee_id)
 
     finally:
         os.unlink(temp_file_path)
@@ -94,8 +102,135 @@ def edit_todo(todolist_id=None):
 def create_todo_from_editor(todolist_id=None):
     try:
         new_todo = edit_todo(todolist_id)
-        print(f"Todo created successfully: {new_todo.title}")
+        print(f"Todo queued: {new_todo.title} (local ID {new_todo.id})")
         return new_todo
     except Exception as e:
         print(f"Error creating todo: {str(e)}")
         return None
+
+
+def split_documents(text: str) -> list[frontmatter.Post]:
+    """
+    Split a file of one or more `---` frontmatter documents. Text before the
+    first frontmatter block becomes a document without metadata. Bodies must
+    not contain `---` lines (use *** for horizontal rules).
+    """
+    documents = []
+    blocks = list(FRONTMATTER_BLOCK.finditer(text))
+    leading = text[: blocks[0].start()] if blocks else text
+    if leading.strip():
+        documents.append(frontmatter.Post(leading.strip()))
+    for block, next_block in zip(blocks, blocks[1:] + [None]):
+        end = next_block.start() if next_block else len(text)
+        documents.append(frontmatter.loads(text[block.start() : end]))
+    return documents
+
+
+def split_headings(content: str) -> list[tuple[str, str]]:
+    """
+    Split markdown into (heading, body) sections at its top-level headings,
+    ignoring anything inside fenced code blocks.
+    """
+    lines = content.splitlines()
+    in_fence = False
+    headings = []
+    for number, line in enumerate(lines):
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        elif not in_fence and (match := HEADING.match(line)):
+            headings.append((number, len(match.group(1)), match.group(2)))
+    if not headings:
+        return []
+
+    top_level = min(level for _, level, _ in headings)
+    starts = [(number, title) for number, level, title in headings if level == top_level]
+    sections = []
+    for (start, title), next_start in zip(starts, [n for n, _ in starts[1:]] + [None]):
+        body = "\n".join(lines[start + 1 : next_start]).strip()
+        sections.append((title, body))
+    return sections
+
+
+def parse_todo_file(
+    text: str, todolist_id=None
+) -> tuple[list[TodoDraft], list[str]]:
+    """
+    Parse a file describing many todos. Each frontmatter document with a
+    `title` is one todo; in a document without one, every top-level heading
+    is a todo and the text under it is its description. `project_id` and
+    `todolist_id` carry over from earlier documents, start from
+    `todolist_id`, and the project is looked up from the todolist when
+    missing. A document that switches todolist without giving a project
+    doesn't carry the old project over, since the new list may be elsewhere.
+
+    Returns the drafts and a list of problems; the file should only be
+    submitted if there are none.
+    """
+    defaults = {"project_id": "", "todolist_id": clean_id(todolist_id)}
+    todolist_projects = {}
+    drafts, errors = [], []
+
+    def project_for(todolist_id: str) -> str:
+        if todolist_id not in todolist_projects:
+            todolist = get_todolist_from_db(int(todolist_id))
+            try:
+                project_id = todolist.get_project_id() if todolist else ""
+            except ValueError:
+                project_id = ""
+            todolist_projects[todolist_id] = str(project_id or "")
+        return todolist_projects[todolist_id]
+
+    for document in split_documents(text):
+        new_todolist_id = clean_id(document.get("todolist_id"))
+        if new_todolist_id and new_todolist_id != defaults["todolist_id"]:
+            defaults["project_id"] = ""
+        for key in defaults:
+            if clean_id(document.get(key)):
+                defaults[key] = clean_id(document.get(key))
+        if document.get("title"):
+            sections = [(str(document.get("title")), document.content)]
+        else:
+            sections = split_headings(document.content)
+            if not sections and document.content.strip():
+                errors.append(
+                    f"Document {len(drafts) + len(errors) + 1}: no title and no headings"
+                )
+
+        for title, body in sections:
+            number = len(drafts) + len(errors) + 1
+            todolist_id = defaults["todolist_id"]
+            if not todolist_id.isdigit():
+                errors.append(f"Todo {number} ({title}): missing or invalid todolist_id")
+                continue
+            project_id = defaults["project_id"] or project_for(todolist_id)
+            if not project_id.isdigit():
+                errors.append(f"Todo {number} ({title}): missing or invalid project_id")
+                continue
+            drafts.append(
+                TodoDraft(project_id, todolist_id, title.strip(), markdown.markdown(body))
+            )
+
+    if not drafts and not errors:
+        errors.append("No todos found")
+    return drafts, errors
+
+
+def create_todos_from_file(path: str, todolist_id=None) -> list:
+    """
+    Validate every todo in the file at `path`, then queue them all for
+    creation in one transaction. Raises ValueError listing every problem if
+    any todo is invalid; nothing is queued in that case.
+    """
+    with open(path, "r") as file:
+        drafts, errors = parse_todo_file(file.read(), todolist_id)
+    if errors:
+        raise ValueError("\n".join(errors))
+
+    config = read_config()
+    return queue_todo_creations(
+        [
+            (draft.project_id, draft.todolist_id, draft.title, draft.body)
+            for draft in drafts
+        ],
+        config.user_id,
+    )
@@ -0,0 +1,84 @@
+"""
+This module decides where the read commands get their data from.
+
+Every read command follows the same stale-while-revalidate policy, with a
+maximum age per entity set in the [max_age] table of config.toml:
+
+- data synced within its max age is served from the local database;
+- data older than its max age is served from the local database while the
+  same command runs again with --fresh in a detached process;
+- data that has never been synced is fetched from Basecamp before answering.
+
+--cached always answers from the local database and --fresh always fetches.
+
+How old a piece of data is depends on the newest sync that covered it. Each
+read lists the sync_state keys that cover it: a `refresh-db` of every project
+("all") covers everything, a project sync or a refresh of a project in scope
+("project:<id>") covers that project's todo lists and todos, and each read
+command records its own key when it fetches.
+"""
+
+from datetime import datetime, timedelta
+from typing import Iterable, NamedTuple
+
+FRESH = "fresh"
+STALE = "stale"
+MISSING = "missing"
+
+PROJECTS_KEYS = ["all", "projects"]
+USERS_KEYS = ["all", "users"]
+TODOS_FOR_USER_KEY = "todos_for_user"
+
+
+class ReadPlan(NamedTuple):
+    from_cache: bool
+    revalidate: bool
+
+
+def todolists_keys(project_id) -> list[str]:
+    return ["all", f"project:{project_id}", f"todolists:{project_id}"]
+
+
+def todo_items_keys(project_id, todolist_id) -> list[str]:
+    return ["all", f"project:{project_id}", f"todolist:{todolist_id}"]
+
+
+def classify(
+    synced_at: datetime | None, max_age: float, now: datetime | None = None
+) -> str:
+    if synced_at is None:
+        return MISSING
+    if (now or datetime.now()) - synced_at > timedelta(seconds=max_age):
+        return STALE
+    return FRESH
+
+
+def plan_read(
+    synced_at: datetime | None,
+    max_age: float,
+    cached: bool = False,
+    fresh: bool = False,
+    now: datetime | None = None,
+) -> ReadPlan:
+    """
+    Decide whether to answer from the local database and whether to refresh
+    it in the background afterwards.
+    """
+    if fresh:
+        return ReadPlan(from_cache=False, revalidate=False)
+    if cached:
+        return ReadPlan(from_cache=True, revalidate=False)
+    state = classify(synced_at, max_age, now)
+    if state == MISSING:
+        return ReadPlan(from_cache=False, revalidate=False)
+    return ReadPlan(from_cache=True, revalidate=state == STALE)
+
+
+def oldest(timestamps: Iterable[datetime | None]) -> datetime | None:
+    """
+    The oldest of `timestamps`, or None if any of them is None (never synced).
+    """
+    timestamps = list(timestamps)
+    if not timestamps or None in timestamps:
+        return None
+    return min(timestamps)
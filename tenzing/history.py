@@ -0,0 +1,78 @@
+"""
+This module records what changed in todos and todolists.
+
+When save_to_db updates a stored todo or todolist, the fields in
+TRACKED_FIELDS that differ between the stored row and the new copy are
+appended to the change_history table, one row per field. Each row is stamped
+with the local time it was recorded (recorded_at), so "what changed since
+yesterday" is a range scan over the recorded_at index that needs no API
+calls:
+
+    tenzing changes --since yesterday
+
+Rows also keep the record's updated_at from Basecamp (changed_at, in UTC).
+It isn't used for the window: it's in another time zone from --since, and
+local edits such as `bulk-edit` keep the todo's old updated_at.
+
+Rows are never updated or deleted. Todos seen for the first time aren't
+recorded, so the first refresh doesn't fill the table with every todo.
+Changes made while tenzing wasn't syncing are recorded once, as the
+difference between the old and new copies.
+"""
+
+from datetime import date, datetime
+from typing import NamedTuple
+
+TRACKED_FIELDS = {
+    "TodoItem": ("title", "status", "completed", "assignee_ids", "due_on"),
+    "TodoList": ("title", "status", "completed"),
+}
+
+FIELD_TITLES = {
+    "title": "Title",
+    "status": "Status",
+    "completed": "Completed",
+    "assignee_ids": "Assignees",
+    "due_on": "Due",
+}
+
+
+class FieldChange(NamedTuple):
+    field: str
+    old_value: object
+    new_value: object
+
+
+def _comparable(field: str, value):
+    if field == "assignee_ids":
+        return sorted(str(person_id) for person_id in value or [])
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def diff_fields(record_type: str, old: dict, new: dict) -> list[FieldChange]:
+    """
+    The tracked fields that differ between the `old` and `new` column values
+    of a record, as JSON-ready values. Fields missing from `new` were not
+    fetched and are left out.
+    """
+    changes = []
+    for field in TRACKED_FIELDS.get(record_type, ()):
+        if field not in new:
+            continue
+        old_value = _comparable(field, old.get(field))
+        new_value = _comparable(field, new[field])
+        if old_value != new_value:
+            changes.append(FieldChange(field, old_value, new_value))
+    return changes
+
+
+def format_value(value) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, list):
+        return ", ".join(map(str, value)) or "none"
+    return str(value)
@@ -0,0 +1,170 @@
+"""
+Console entry point for tenzing.
+
+Editor and prompt integrations call `get-current-todo --json`,
+`get-todos-for-user --cached --json` and `agenda --summary` many times a
+minute. Those invocations
+are answered here using only the standard library, without importing the
+CLI, SQLAlchemy or basecampy3: by the query server (`tenzing serve`) when one
+is running, otherwise from the snapshot of the user's todos (see
+tenzing.snapshot). Every other invocation, or one neither can answer, falls
+through to tenzing.cli.
+
+Shell completion of project, todo list and todo IDs is answered here too,
+from the completion index (see tenzing.completion).
+"""
+
+import json
+import os
+import shlex
+import sys
+
+from tenzing.agenda import format_agenda
+from tenzing.completion import CompletionEntry, complete_ids, completion_target
+from tenzing.server import query_server
+from tenzing.snapshot import answer_from_snapshot
+
+COMPLETE_VAR = "_TENZING_COMPLETE"
+
+
+def parse_agenda_request(options: list[str]) -> dict | None:
+    if "--summary" not in options and "--json" not in options:
+        return None
+    request = {
+        "query": "agenda",
+        "person_id": None,
+        "summary": False,
+        "json": "--json" in options,
+    }
+    remaining = iter(options)
+    for option in remaining:
+        if option == "--summary":
+            request["summary"] = True
+        elif option == "--user-id":
+            value = next(remaining, "")
+            if not value.isdigit():
+                return None
+            request["person_id"] = int(value)
+        elif option != "--json":
+            return None
+    return request
+
+
+def parse_fast_path_request(args: list[str]) -> dict | None:
+    """
+    Translate command line arguments into a query server request, or return
+    None if the command can't be answered by the server.
+    """
+    if args and args[0] == "agenda":
+        return parse_agenda_request(args[1:])
+    if not args or "--json" not in args:
+        return None
+    command, options = args[0], [arg for arg in args[1:] if arg != "--json"]
+
+    if command == "get-current-todo" and not options:
+        return {"query": "current_todo"}
+
+    if command != "get-todos-for-user" or "--cached" not in options:
+        return None
+    request = {"query": "todos_for_user", "active_only": False, "limit": None, "offset": 0}
+    remaining = iter(options)
+    for option in remaining:
+        if option == "--cached":
+            continue
+        if option == "--active-only":
+            request["active_only"] = True
+        elif option in ("--limit", "--offset"):
+            value = next(remaining, "")
+            if not value.isdigit():
+                return None
+            request[option.lstrip("-")] = int(value)
+        else:
+            return None
+    return request
+
+
+def answer_fast_path(request: dict) -> bool:
+    result = query_server(request)
+    if result is None:
+        result = answer_from_snapshot(request)
+    if result is None:
+        return False
+
+    if request["query"] == "current_todo":
+        if result["todo_id"] is None:
+            output = json.dumps({"error": "No current todo set"})
+        elif result["todo"] is None:
+            output = json.dumps(
+                {"error": f"Todo with ID {result['todo_id']} not found in the database"}
+            )
+        else:
+            output = json.dumps(result["todo"], indent=2, ensure_ascii=False)
+    elif request["query"] == "agenda":
+        output = format_agenda(result, request["json"])
+    else:
+        output = json.dumps(result["todos"], indent=2)
+
+    sys.stdout.write(output + "\n")
+    return True
+
+
+def parse_completion_request(environ) -> tuple[str, list[str], str] | None:
+    """
+    Return (shell, args, incomplete) for a click completion request, using the
+    same environment variables as click's shell scripts, or None if this isn't
+    one.
+    """
+    shell, _, action = environ.get(COMPLETE_VAR, "").partition("_")
+    if action != "complete" or shell not in ("bash", "zsh", "fish"):
+        return None
+    try:
+        words = shlex.split(environ["COMP_WORDS"])
+        if shell == "fish":
+            incomplete = environ["COMP_CWORD"]
+            args = words[1:]
+            if incomplete and args and args[-1] == incomplete:
+                args.pop()
+        else:
+            cword = int(environ["COMP_CWORD"])
+            args = words[1:cword]
+            incomplete = words[cword] if cword < len(words) else ""
+    except (KeyError, ValueError):
+        return None
+    return shell, args, incomplete
+
+
+def format_completion(shell: str, entry: CompletionEntry) -> str:
+    # The formats click's bash, zsh and fish scripts expect
+    if shell == "bash":
+        return f"plain,{entry.id}"
+    if shell == "zsh":
+        return f"plain\n{entry.id}\n{entry.label or '_'}"
+    return f"plain,{entry.id}\t{entry.label}"
+
+
+def answer_completion(environ) -> bool:
+    request = parse_completion_request(environ)
+    if request is None:
+        return False
+    shell, args, incomplete = request
+    target = completion_target(args, incomplete)
+    if target is None:
+        return False
+
+    kind, parent_id = target
+    entries = complete_ids(kind, incomplete, parent_id)
+    sys.stdout.write("".join(format_completion(shell, entry) + "\n" for entry in entries))
+    return True
+
+
+def main():
+    if answer_completion(os.environ):
+        return 0
+
+    request = parse_fast_path_request(sys.argv[1:])
+    if request is not None and answer_fast_path(request):
+        return 0
+
+    from tenzing.cli import main as cli_main
+
+    return cli_main()
@@ -0,0 +1,65 @@
+"""
+This module holds the operational counters for the Tenzing application.
+
+Every counter is incremented through the module-level METRICS object:
+basecamp_api.py counts HTTP traffic in its transport adapter and persist.py
+counts the rows it writes. At the end of a sync the counters are stored as a
+row in the `sync_runs` table (see persist.record_sync_run) so `tenzing stats`
+can show how sync cost changes over time.
+"""
+
+import threading
+
+COUNTER_NAMES = (
+    "http_requests",
+    "bytes_downloaded",
+    "cache_hits",
+    "rows_upserted",
+    "throttled_seconds",
+)
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters = {name: 0 for name in COUNTER_NAMES}
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._counters)
+
+
+METRICS = Metrics()
+
+
+def cache_hit_ratio(http_requests: int, cache_hits: int) -> float | None:
+    """
+    The share of HTTP requests answered with 304 Not Modified, or None if no
+    requests were made.
+    """
+    if not http_requests:
+        return None
+    return cache_hits / http_requests
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    """
+    Return the `pct` percentile (0-100) of `values` using linear
+    interpolation between the closest ranks, or None for an empty list.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
@@ -10,7 +10,12 @@ class BaseCampEntityView(BaseModel):
 
     @classmethod
     def from_api_data(cls, data: object):
-        values = data.__dict__["_values"].copy()
+        # basecampy3 objects keep the API JSON in _values; webhook payloads
+        # carry the same JSON as plain dicts
+        if isinstance(data, dict):
+            values = data.copy()
+        else:
+            values = data.__dict__["_values"].copy()
 
         for field in ["created_at", "updated_at"]:
             if field in values and isinstance(values[field], str):
@@ -163,3 +168,25 @@ class TodoItemView(BaseCampEntityView):
     class Config:
         from_attributes = True
         populate_by_name = True
+
+
+class CommentView(BaseCampEntityView):
+    parent_id: int
+    parent_type: Optional[str] = None
+    status: str
+    content: str
+    text: str = ""
+    creator: dict
+    url: str
+    app_url: str
+
+    @classmethod
+    def from_api_data(cls, data: object):
+        from tenzing.comments import html_to_text
+
+        comment = super().from_api_data(data)
+        return comment.model_copy(update={"text": html_to_text(comment.content)})
+
+    class Config:
+        from_attributes = True
+        populate_by_name = True
@@ -0,0 +1,283 @@
+"""
+This module implements the local outbox for writes to Basecamp.
+
+Creating a todo no longer waits on the network: queue_todo_creation() stores
+the request in the `outbox` table together with a provisional todo whose id
+is negative, and returns straight away. flush_outbox() later sends pending
+entries to Basecamp in parallel and swaps the provisional row for the real
+todo (see persist.reconcile_outbox_entry).
+
+Creating a todo is not idempotent, so an entry is only sent again when
+Basecamp certainly didn't create it (see basecamp_api.TodoNotCreated).
+Once the POST succeeds the entry is marked created with the new todo's id,
+and if reconciling fails it is fetched and reconciled on the next flush
+rather than sent again. Entries that may or may not have been created (a
+timeout, or a flusher that died mid-request) are marked failed for the user
+to check on Basecamp; `tenzing outbox retry` then sends them again and
+`tenzing outbox discard` drops them along with their provisional todos.
+
+Flushing happens in a detached `tenzing flush-outbox` process started by the
+create commands, on every `tenzing sync --watch` cycle, or by hand.
+"""
+
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from tenzing.basecamp_api import BasecampAPI, TodoNotCreated
+from tenzing.models import TodoItemView, TodoListView
+from tenzing.persist import (
+    claim_outbox_entry,
+    enqueue_outbox_entries,
+    enqueue_outbox_entry,
+    expire_outbox_claims,
+    get_outbox_entries,
+    get_todolist_from_db,
+    reconcile_outbox_entries,
+    record_outbox_creation,
+    record_outbox_failure,
+)
+
+MAX_ATTEMPTS = 8
+ATTEMPTS_PER_FLUSH = 3
+STALE_CLAIM_AFTER = timedelta(minutes=10)
+
+
+class FlushResult(NamedTuple):
+    local_id: int
+    remote_id: int | None
+    error: str | None
+
+
+def provisional_todo(
+    local_id: int, payload: dict, todolist: TodoListView | None = None
+) -> TodoItemView:
+    """
+    Build the placeholder todo that stands in for a queued creation until
+    Basecamp assigns it a real id.
+    """
+    now = datetime.now()
+    assignee_id = payload.get("assignee_id")
+    parent = {"id": payload["todolist_id"], "type": "Todolist"}
+    if todolist is not None:
+        parent["title"] = todolist.title
+    return TodoItemView(
+        id=local_id,
+        created_at=now,
+        updated_at=now,
+        parent_id=payload["todolist_id"],
+        parent_type="Todolist",
+        status="pending",
+        visible_to_clients=False,
+        title=payload["title"],
+        inherits_status=True,
+        type="Todo",
+        url="",
+        app_url="",
+        bookmark_url="",
+        subscription_url="",
+        comments_count=0,
+        comments_url="",
+        parent=parent,
+        bucket={"id": payload["project_id"]},
+        creator={},
+        description=payload.get("body") or "",
+        completed=False,
+        content=payload["title"],
+        assignees=[{"id": int(assignee_id)}] if assignee_id else [],
+        assignee_ids=[str(assignee_id)] if assignee_id else [],
+        completion_subscribers=[],
+        completion_url="",
+    )
+
+
+def creation_payload(
+    project_id: int,
+    todolist_id: int,
+    title: str,
+    body: str,
+    assignee_id,
+    todolist: TodoListView | None = None,
+) -> dict:
+    return {
+        "project_id": int(project_id),
+        "todolist_id": int(todolist_id),
+        "title": title,
+        "body": body,
+        "assignee_id": assignee_id,
+        # Lets create_todo POST straight to the todolist without looking it up
+        "todos_url": todolist.todos_url if todolist else None,
+    }
+
+
+def queue_todo_creation(
+    project_id: int, todolist_id: int, title: str, body: str, assignee_id
+) -> TodoItemView:
+    """
+    Queue a todo for creation and return its provisional local copy.
+    """
+    todolist = get_todolist_from_db(int(todolist_id))
+    payload = creation_payload(
+        project_id, todolist_id, title, body, assignee_id, todolist
+    )
+    local_id = enqueue_outbox_entry(
+        "create_todo",
+        payload,
+        lambda local_id: provisional_todo(local_id, payload, todolist),
+    )
+    return provisional_todo(local_id, payload, todolist)
+
+
+def queue_todo_creations(
+    todos: list[tuple[int, int, str, str]], assignee_id
+) -> list[TodoItemView]:
+    """
+    Queue many (project_id, todolist_id, title, body) todos for creation in
+    one transaction and return their provisional local copies.
+    """
+    todolists = {
+        todolist_id: get_todolist_from_db(todolist_id)
+        for todolist_id in {int(todolist_id) for _, todolist_id, _, _ in todos}
+    }
+    payloads = [
+        creation_payload(
+            project_id,
+            todolist_id,
+            title,
+            body,
+            assignee_id,
+            todolists[int(todolist_id)],
+        )
+        for project_id, todolist_id, title, body in todos
+    ]
+
+    def make_provisional(local_id: int, payload: dict) -> TodoItemView:
+        return provisional_todo(local_id, payload, todolists[payload["todolist_id"]])
+
+    local_ids = enqueue_outbox_entries("create_todo", payloads, make_provisional)
+    return [
+        make_provisional(local_id, payload)
+        for local_id, payload in zip(local_ids, payloads)
+    ]
+
+
+def create_with_retries(
+    api: BasecampAPI, payload: dict, attempts: int = ATTEMPTS_PER_FLUSH, backoff: float = 1.0
+) -> dict:
+    """
+    Call BasecampAPI.create_todo, retrying with exponential backoff while
+    Basecamp answers that it didn't create the todo. Any other error, such as
+    TodoCreationUnknown, is raised straight away: retrying could create a
+    duplicate.
+    """
+    for attempt in range(attempts):
+        try:
+            return api.create_todo(
+                payload["project_id"],
+                payload["todolist_id"],
+                payload["title"],
+                payload["body"],
+                payload["assignee_id"],
+                todos_url=payload.get("todos_url"),
+            )
+        except TodoNotCreated:
+            if attempt == attempts - 1:
+                raise
+        time.sleep(backoff * 2**attempt)
+
+
+def fetch_created(api: BasecampAPI, entry):
+    """Fetch the todo Basecamp created for an entry that wasn't reconciled."""
+    return api.get_raw_todo(entry.payload["project_id"], entry.remote_id)
+
+
+def remote_todo_id(new_todo) -> int:
+    return new_todo["id"] if isinstance(new_todo, dict) else new_todo.id
+
+
+def flush_outbox(api: BasecampAPI, max_workers: int = 4) -> list[FlushResult]:
+    """
+    Send every pending outbox entry to Basecamp, `max_workers` at a time, and
+    reconcile the entries created by earlier flushes. Entries are claimed in
+    the database first, so concurrent flushers never send the same entry
+    twice.
+    """
+    expire_outbox_claims(STALE_CLAIM_AFTER)
+    results = []
+    tried = set()
+    while True:
+        created = [
+            entry for entry in get_outbox_entries(["created"]) if entry.id not in tried
+        ]
+        pending = [
+            entry
+            for entry in get_outbox_entries(["pending"])
+            if entry.id not in tried and claim_outbox_entry(entry.id)
+        ]
+        if not created and not pending:
+            return results
+        tried.update(entry.id for entry in created + pending)
+
+        reconciled = []
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(create_with_retries, api, entry.payload): entry
+                for entry in pending
+            }
+            futures.update(
+                {pool.submit(fetch_created, api, entry): entry for entry in created}
+            )
+            # Network calls run in the pool; database writes stay on this thread
+            for future in as_completed(futures):
+                entry = futures[future]
+                try:
+                    new_todo = future.result()
+                except Exception as e:
+                    record_outbox_failure(
+                        entry.id, str(e), MAX_ATTEMPTS, retry=isinstance(e, TodoNotCreated)
+                    )
+                    results.append(FlushResult(entry.local_id, None, str(e)))
+                    continue
+                if entry.remote_id is None:
+                    # Before anything else can fail, so it is never sent again
+                    record_outbox_creation(entry.id, remote_todo_id(new_todo))
+                try:
+                    todo_view = TodoItemView.from_api_data(new_todo)
+                except Exception as e:
+                    record_outbox_failure(entry.id, str(e), MAX_ATTEMPTS)
+                    results.append(
+                        FlushResult(entry.local_id, remote_todo_id(new_todo), str(e))
+                    )
+                    continue
+                reconciled.append((entry, todo_view))
+
+        # Everything created in this round is saved in one transaction
+        try:
+            reconcile_outbox_entries(
+                [(entry.id, todo_view) for entry, todo_view in reconciled]
+            )
+        except Exception as e:
+            for entry, todo_view in reconciled:
+                record_outbox_failure(entry.id, str(e), MAX_ATTEMPTS)
+                results.append(FlushResult(entry.local_id, todo_view.id, str(e)))
+        else:
+            results.extend(
+                FlushResult(entry.local_id, todo_view.id, None)
+                for entry, todo_view in reconciled
+            )
+
+
+def spawn_background_flush() -> None:
+    """
+    Start a detached `tenzing flush-outbox` so the current command can exit.
+    """
+    subprocess.Popen(
+        [sys.executable, "-m", "tenzing.cli", "flush-outbox", "--quiet"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
@@ -0,0 +1,111 @@
+"""
+This module overlaps Basecamp pagination with processing.
+
+basecampy3 requests the next page of a list only after the caller has
+consumed the current one, so a long crawl pays for the network and for
+parsing and converting each page one after the other. install_prefetch()
+replaces an endpoint's paginator with one that follows the Link headers in a
+background thread, keeping up to `depth` pages queued ahead of the caller.
+Pages still arrive in order and errors are raised where the caller would
+have met them.
+
+The depth is `prefetch_depth` in config.toml; 0 turns prefetching off. A
+caller that stops early (e.g. at a sync watermark) may leave up to `depth`
+fetched pages unused.
+"""
+
+import queue
+import re
+import threading
+from typing import Iterator, NamedTuple
+
+from basecampy3.exc import Basecamp3Error
+
+DEFAULT_PREFETCH_DEPTH = 2
+
+LINK_HEADER_URL = re.compile(r"<(https.+)>")
+
+_DONE = object()
+
+
+class _Failure(NamedTuple):
+    error: BaseException
+
+
+def fetch_pages(session, request_args: dict) -> Iterator[list]:
+    """
+    Request `request_args` and then each page its Link headers point to,
+    yielding every page's JSON list.
+    """
+    while request_args:
+        response = session.request(**request_args)
+        if not response.ok:
+            raise Basecamp3Error(response=response)
+        link_header = response.headers.get("Link")
+        if link_header:
+            request_args = {
+                "url": LINK_HEADER_URL.findall(link_header)[0],
+                "method": "GET",
+            }
+        else:
+            request_args = None
+        yield response.json()
+
+
+def prefetch(items: Iterator, depth: int) -> Iterator:
+    """
+    Yield the items of `items` in order while a background thread produces
+    up to `depth` of them ahead of the caller.
+    """
+    if depth <= 0:
+        yield from items
+        return
+
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # Give up once the consumer has gone away
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_Failure(e))
+            return
+        put(_DONE)
+
+    threading.Thread(target=produce, name="tenzing-prefetch", daemon=True).start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+
+
+def install_prefetch(endpoint, depth: int = DEFAULT_PREFETCH_DEPTH) -> None:
+    """
+    Make a basecampy3 endpoint's list methods prefetch `depth` pages.
+    """
+
+    def paginated_generator(request_args: dict):
+        pages = fetch_pages(endpoint._api._session, request_args)
+        for page in prefetch(pages, depth):
+            for item in page:
+                yield endpoint.OBJECT_CLASS(item, endpoint)
+
+    endpoint._paginated_generator = paginated_generator
@@ -1,13 +1,46 @@
-from typing import Type, List
+import functools
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterator, Type, List
 from pydantic import BaseModel
 import sqlalchemy
 from sqlalchemy.orm import DeclarativeBase, Session
-from sqlalchemy import func
+from sqlalchemy import and_, bindparam, func, or_, text
+from sqlalchemy.dialects.sqlite import dialect as sqlite_dialect
 
-from tenzing.db import Project, User, TodoList, TodoItem, get_session
-from tenzing.models import ProjectView, UserView, TodoListView, TodoItemView
+from tenzing.db import (
+    Project,
+    User,
+    TodoList,
+    TodoItem,
+    TodoAssignee,
+    Comment,
+    CommentSync,
+    ChangeHistory,
+    SyncRun,
+    SyncState,
+    OutboxEntry,
+    CurrentTodoHistory,
+    RefreshCheckpoint,
+    get_session,
+    json_field,
+)
+from tenzing.models import (
+    CommentView,
+    ProjectView,
+    UserView,
+    TodoListView,
+    TodoItemView,
+)
 from tenzing.basecamp_api import BasecampAPI
+from tenzing.comments import sync_comments
 from tenzing.config import read_config, Config
+from tenzing.freshness import TODOS_FOR_USER_KEY, oldest
+from tenzing.history import TRACKED_FIELDS, diff_fields
+from tenzing.metrics import METRICS
+from tenzing.scope import get_raw_projects_in_scope, in_scope, scoped_project_ids
+from tenzing.trace import span, traced
 
 
 def pydantic_to_sqlalchemy(pydantic_instance: BaseModel) -> DeclarativeBase:
@@ -23,6 +56,8 @@ def pydantic_to_sqlalchemy(pydantic_instance: BaseModel) -> DeclarativeBase:
             sqlalchemy_model = TodoList
         case "TodoItemView":
             sqlalchemy_model = TodoItem
+        case "CommentView":
+            sqlalchemy_model = Comment
         case _:
             raise ValueError(f"Unsupported Pydantic model: {type(pydantic_instance)}")
 
@@ -42,6 +77,8 @@ def sqlalchemy_to_pydantic(sqlalchemy_instance: DeclarativeBase) -> BaseModel:
             pydantic_model = TodoListView
         case "TodoItem":
             pydantic_model = TodoItemView
+        case "Comment":
+            pydantic_model = CommentView
         case _:
             raise ValueError(
                 f"Unsupported SQLAlchemy model: {type(sqlalchemy_instance)}"
@@ -50,50 +87,781 @@ def sqlalchemy_to_pydantic(sqlalchemy_instance: DeclarativeBase) -> BaseModel:
     return pydantic_model.model_validate(sqlalchemy_instance)
 
 
-def save_to_db(items: List[BaseModel]) -> None:
+def replace_todo_assignees(
+    session: Session, todos: list[TodoItem], removed_ids: list[int] = ()
+) -> None:
+    """
+    Bring the todo_assignees rows of `todos` (and of the deleted todos
+    `removed_ids`) in line with their assignee_ids, in the caller's session.
+    """
+    todos = {todo.id: todo for todo in todos}  # the last copy of a todo wins
+    ids = list(todos) + list(removed_ids)
+    # Stay well below SQLite's limit on bound parameters
+    for start in range(0, len(ids), 500):
+        session.query(TodoAssignee).filter(
+            TodoAssignee.todo_id.in_(ids[start : start + 500])
+        ).delete(synchronize_session=False)
+    session.add_all(
+        TodoAssignee(todo_id=todo.id, person_id=int(person_id))
+        for todo in todos.values()
+        for person_id in set(todo.assignee_ids or [])
+    )
+
+
+def change_history_rows(stored, db_item) -> list[ChangeHistory]:
+    """
+    ChangeHistory rows for the tracked fields `db_item` changes in the
+    stored row `stored` (see tenzing.history).
+    """
+    record_type = type(db_item).__name__
+    fields = TRACKED_FIELDS.get(record_type)
+    if not fields:
+        return []
+    new = {key: value for key, value in db_item.__dict__.items() if key in fields}
+    old = {field: getattr(stored, field) for field in fields}
+    bucket = db_item.__dict__.get("bucket") or stored.bucket or {}
+    return [
+        ChangeHistory(
+            changed_at=db_item.__dict__.get("updated_at") or stored.updated_at,
+            record_type=record_type,
+            record_id=db_item.id,
+            project_id=bucket.get("id"),
+            title=new.get("title", stored.title),
+            field=change.field,
+            old_value=change.old_value,
+            new_value=change.new_value,
+        )
+        for change in diff_fields(record_type, old, new)
+    ]
+
+
+@traced("db.save_to_db", "db")
+def save_to_db(
+    items: List[BaseModel], checkpoint: tuple[str, datetime] | None = None
+) -> None:
     """
     Save a list of Pydantic model instances to the database.
+
+    `checkpoint` is a (container, run started_at) pair recorded as done in
+    the same transaction, so a resumed refresh never skips unsaved data.
+    Errors are raised after rolling back, so a refresh that failed to save
+    a batch stops instead of finishing without it.
     """
+    if not items and checkpoint is None:
+        return
     session = get_session()
     try:
         new_items = 0
         updated_items = 0
-        for item in items:
-            db_item = pydantic_to_sqlalchemy(item)
-            existing_item = (
-                session.query(type(db_item)).filter_by(id=db_item.id).first()
-            )
-            if existing_item:
-                session.merge(db_item)
-                updated_items += 1
-            else:
-                session.add(db_item)
-                new_items += 1
+        model_name = type(items[0]).__name__ if items else "item"
+        with span("db.merge", "db", model=model_name, count=len(items)):
+            # The last copy of an item wins
+            db_items = list(
+                {
+                    (type(db_item), db_item.id): db_item
+                    for db_item in map(pydantic_to_sqlalchemy, items)
+                }.values()
+            )
+            # Load the stored rows in a few IN queries rather than one query
+            # per item. merge() then finds them in the identity map, which
+            # only holds them while they're referenced here.
+            existing = {}
+            for model in {type(db_item) for db_item in db_items}:
+                ids = [db_item.id for db_item in db_items if type(db_item) is model]
+                for start in range(0, len(ids), 500):
+                    existing.update(
+                        ((model, row.id), row)
+                        for row in session.query(model).filter(
+                            model.id.in_(ids[start : start + 500])
+                        )
+                    )
+            # Without autoflush every merge() would flush the items before it
+            with session.no_autoflush:
+                for db_item in db_items:
+                    stored = existing.get((type(db_item), db_item.id))
+                    if stored is not None:
+                        # Diff before merge() overwrites the stored values
+                        session.add_all(change_history_rows(stored, db_item))
+                        session.merge(db_item)
+                        updated_items += 1
+                    else:
+                        session.add(db_item)
+                        new_items += 1
+            if model_name == "TodoItemView":
+                replace_todo_assignees(session, db_items)
+        if checkpoint is not None:
+            container, started_at = checkpoint
+            session.merge(
+                RefreshCheckpoint(
+                    container=container,
+                    started_at=started_at,
+                    completed_at=datetime.now(),
+                )
+            )
+        with span("db.commit", "db", model=model_name):
+            session.commit()
+        METRICS.incr("rows_upserted", new_items + updated_items)
+        if items:
+            print(
+                f"Saved {len(items)} {model_name}s to db ({new_items} new, {updated_items} updated)"
+            )
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def start_refresh_run(resume: bool = False) -> tuple[datetime, set[str]]:
+    """
+    Begin a refresh, or with `resume` continue an unfinished one. Returns the
+    run's start time and the containers it has already saved.
+    """
+    session = get_session()
+    try:
+        run = session.get(RefreshCheckpoint, "run")
+        if resume and run is not None and run.completed_at is None:
+            done = {
+                checkpoint.container
+                for checkpoint in session.query(RefreshCheckpoint).filter(
+                    RefreshCheckpoint.container != "run",
+                    RefreshCheckpoint.started_at == run.started_at,
+                )
+            }
+            return run.started_at, done
+
+        session.query(RefreshCheckpoint).delete()
+        started_at = datetime.now()
+        session.add(RefreshCheckpoint(container="run", started_at=started_at))
         session.commit()
-        print(
-            f"Saved {len(items)} {type(items[0]).__name__}s to db ({new_items} new, {updated_items} updated)"
+        return started_at, set()
+    finally:
+        session.close()
+
+
+def finish_refresh_run(started_at: datetime) -> None:
+    session = get_session()
+    try:
+        session.query(RefreshCheckpoint).filter(
+            RefreshCheckpoint.container != "run"
+        ).delete()
+        session.merge(
+            RefreshCheckpoint(
+                container="run", started_at=started_at, completed_at=datetime.now()
+            )
         )
+        session.commit()
+    finally:
+        session.close()
+
+
+def get_open_todo_urls_for_user(person_id: int) -> dict[int, str]:
+    """
+    The API URLs of the stored todos that are open and assigned to
+    `person_id`, by todo ID. Todos still queued in the outbox have no URL
+    yet and are left out.
+    """
+    session = get_session()
+    try:
+        rows = (
+            session.query(TodoItem.id, TodoItem.url)
+            .join(TodoAssignee, TodoAssignee.todo_id == TodoItem.id)
+            .filter(
+                TodoAssignee.person_id == person_id,
+                TodoItem.completed.is_(False),
+                TodoItem.status != "trashed",
+                TodoItem.id > 0,
+                TodoItem.url != "",
+            )
+        )
+        return dict(rows.all())
+    finally:
+        session.close()
+
+
+def refresh_assignments(
+    api: BasecampAPI, config: Config, started_at: datetime, done: set[str]
+) -> None:
+    """
+    Tier 1: the configured user's open todos. Basecamp's assignments report
+    lists the open ones in a single request; stored todos it no longer lists
+    (completed, reassigned or trashed since) are fetched one by one.
+    """
+    if config.user_id is None or "assignments" in done:
+        return
+    todos = [
+        todo
+        for todo in api.get_assigned_todos(config.user_id)
+        if in_scope(config, todo.bucket["id"], todo.bucket.get("name"))
+    ]
+    listed_ids = {todo.id for todo in todos}
+    for todo_id, url in get_open_todo_urls_for_user(int(config.user_id)).items():
+        if todo_id not in listed_ids:
+            raw_todo = api.get_raw_recording(url, "Todo")
+            if raw_todo is not None:
+                todos.append(TodoItemView.from_api_data(raw_todo))
+    save_to_db(todos, checkpoint=("assignments", started_at))
+    save_sync_state(TODOS_FOR_USER_KEY, datetime.now())
+
+
+def refresh_active_lists(
+    api: BasecampAPI, config: Config, started_at: datetime, done: set[str]
+) -> None:
+    """
+    Tier 2: the projects in scope and their todolists, then their todos, one
+    list at a time and the most recently updated lists first.
+    """
+    raw_projects = get_raw_projects_in_scope(api, config)
+    save_to_db([ProjectView.from_api_data(project) for project in raw_projects])
+    pending = []
+    for project in raw_projects:
+        if f"project:{project.id}" in done:
+            continue
+        raw_todolists = api.get_raw_todolists_for_project(project)
+        todolists = [TodoListView.from_api_data(todolist) for todolist in raw_todolists]
+        save_to_db(todolists)
+        pending.append((project, list(zip(raw_todolists, todolists))))
+
+    by_activity = sorted(
+        (pair for _, pairs in pending for pair in pairs),
+        key=lambda pair: pair[1].updated_at,
+        reverse=True,
+    )
+    for raw_todolist, _ in by_activity:
+        todolist_key = f"todolist:{raw_todolist.id}"
+        if todolist_key in done:
+            continue
+        save_to_db(
+            api.get_todo_items_for_todo_list(raw_todolist),
+            checkpoint=(todolist_key, started_at),
+        )
+    for project, _ in pending:
+        save_to_db([], checkpoint=(f"project:{project.id}", started_at))
+
+
+def refresh_backfill(
+    api: BasecampAPI,
+    config: Config,
+    started_at: datetime,
+    done: set[str],
+    everything: bool = False,
+) -> None:
+    """
+    Tier 3: the people on the projects in scope. With `everything`, all
+    people, all projects and the todolists of the projects out of scope.
+    """
+    if not everything:
+        if "users" not in done:
+            project_ids = scoped_project_ids(config, get_projects_from_db())
+            save_to_db(
+                api.get_users_for_projects(project_ids), checkpoint=("users", started_at)
+            )
+        return
+
+    if "users" not in done:
+        save_to_db(api.get_users(), checkpoint=("users", started_at))
+
+    # Projects are listed again even when saved; the crawl below walks them
+    raw_projects = api.get_raw_projects()
+    if "projects" not in done:
+        projects = [ProjectView.from_api_data(project) for project in raw_projects]
+        save_to_db(projects, checkpoint=("projects", started_at))
+
+    for project in raw_projects:
+        project_key = f"project:{project.id}"
+        if project_key in done or in_scope(config, project.id, project.name):
+            continue
+        raw_todolists = api.get_raw_todolists_for_project(project)
+        todolists = [TodoListView.from_api_data(todolist) for todolist in raw_todolists]
+        save_to_db(todolists, checkpoint=(project_key, started_at))
+
+
+def refresh_comments(
+    api: BasecampAPI, config: Config, started_at: datetime, done: set[str]
+) -> None:
+    """
+    Tier 4: the comments of the todos in scope that changed since their
+    comments were last fetched (see tenzing.comments).
+    """
+    sync_comments(api, scoped_project_ids(config, get_projects_from_db()))
+
+
+def refresh_tiers(workers: int = 1, everything: bool = False) -> list:
+    """
+    The (name, function) tiers of a refresh. Each tier is committed before
+    the next starts, so what the user looks at most is usable first. With
+    more than one worker, a process pool (see tenzing.sharding) takes over
+    the lists and backfill tiers.
+    """
+    tiers = [
+        ("assignments", refresh_assignments),
+        ("lists", refresh_active_lists),
+        ("backfill", functools.partial(refresh_backfill, everything=everything)),
+        ("comments", refresh_comments),
+    ]
+    if workers > 1:
+        from tenzing.sharding import refresh_sharded
+
+        tiers[1:3] = [
+            (
+                "shards",
+                functools.partial(refresh_sharded, workers=workers, everything=everything),
+            )
+        ]
+    return tiers
+
+
+def refreshed_sync_keys(config: Config, projects: list, everything: bool) -> list[str]:
+    """
+    The sync_state keys a completed refresh covers (see tenzing.freshness).
+    Todos are only fetched for the projects in scope, so "all" is recorded
+    only by `everything` when every project is in scope; anything else out of
+    scope is still fetched on demand by the commands that show it.
+    """
+    scoped_ids = scoped_project_ids(config, projects)
+    keys = [f"project:{project_id}" for project_id in scoped_ids]
+    if everything:
+        project_ids = [str(project.id) for project in projects]
+        if set(project_ids) <= set(scoped_ids):
+            return ["all"]
+        keys += ["projects", "users"]
+        keys += [f"todolists:{project_id}" for project_id in project_ids]
+    return keys
+
+
+@traced("sync.fully_refresh_db", "sync")
+def fully_refresh_db(
+    api: BasecampAPI, resume: bool = False, workers: int = 1, everything: bool = False
+) -> None:
+    """
+    Fetch the projects in scope (see tenzing.scope) with their people,
+    todolists, todos and comments, in the priority tiers of refresh_tiers();
+    with `everything`, also every other project, person and todolist. Each
+    container is saved together with a checkpoint, so with `resume` an
+    interrupted refresh carries on where it stopped.
+    """
+    config: Config = read_config()
+    started_at, done = start_refresh_run(resume)
+    if done:
+        print(f"Resuming the refresh started at {started_at:%Y-%m-%d %H:%M:%S}")
+
+    tiers = refresh_tiers(workers, everything)
+    for name, refresh_tier in tiers:
+        with span(f"sync.tier.{name}", "sync"):
+            refresh_tier(api, config, started_at, done)
+
+    synced_at = datetime.now()
+    for key in refreshed_sync_keys(config, get_projects_from_db(), everything):
+        save_sync_state(key, synced_at)
+    finish_refresh_run(started_at)
+
+
+@contextmanager
+def tracked_sync_run(command: str):
+    """
+    Reset the operational counters, run the wrapped sync, and store the
+    counters and duration as a SyncRun row, whether or not the sync succeeded.
+    """
+    METRICS.reset()
+    started_at = datetime.now()
+    start = time.perf_counter()
+    succeeded = False
+    try:
+        yield
+        succeeded = True
+    finally:
+        record_sync_run(
+            command, started_at, time.perf_counter() - start, succeeded, METRICS.snapshot()
+        )
+
+
+def record_sync_run(
+    command: str,
+    started_at: datetime,
+    duration_seconds: float,
+    succeeded: bool,
+    counters: dict[str, float],
+) -> None:
+    session = get_session()
+    try:
+        session.add(
+            SyncRun(
+                command=command,
+                started_at=started_at,
+                duration_seconds=duration_seconds,
+                succeeded=succeeded,
+                http_requests=int(counters.get("http_requests", 0)),
+                bytes_downloaded=int(counters.get("bytes_downloaded", 0)),
+                cache_hits=int(counters.get("cache_hits", 0)),
+                rows_upserted=int(counters.get("rows_upserted", 0)),
+                throttled_seconds=counters.get("throttled_seconds", 0.0),
+            )
+        )
+        session.commit()
     except Exception as e:
         session.rollback()
-        print(f"Error saving to database: {str(e)}")
+        print(f"Error recording sync metrics: {str(e)}")
     finally:
         session.close()
 
 
-def fully_refresh_db(api: BasecampAPI) -> None:
-    config: Config = read_config()
+def get_sync_runs(limit: int = 30, command: str | None = None) -> list[SyncRun]:
+    """
+    Retrieve the most recent SyncRun rows, oldest first.
+    """
+    session = get_session()
+    try:
+        query = session.query(SyncRun)
+        if command is not None:
+            query = query.filter(SyncRun.command == command)
+        runs = query.order_by(SyncRun.started_at.desc()).limit(limit).all()
+        return list(reversed(runs))
+    finally:
+        session.close()
+
+
+def get_sync_state(key: str) -> SyncState | None:
+    session = get_session()
+    try:
+        return session.query(SyncState).filter(SyncState.key == key).first()
+    finally:
+        session.close()
+
+
+def save_sync_state(
+    key: str,
+    synced_at: datetime,
+    watermark: datetime | None = None,
+    interval_seconds: float | None = None,
+) -> None:
+    """
+    Record that `key` (e.g. "all" or "project:123") was synced at `synced_at`.
+    `watermark` and `interval_seconds` are kept from the previous state when
+    not given.
+    """
+    session = get_session()
+    try:
+        state = session.get(SyncState, key) or SyncState(key=key)
+        state.synced_at = synced_at
+        if watermark is not None:
+            state.watermark = watermark
+        if interval_seconds is not None:
+            state.interval_seconds = interval_seconds
+        session.add(state)
+        session.commit()
+    finally:
+        session.close()
+
+
+def get_synced_at(keys: list[str]) -> datetime | None:
+    """
+    The most recent sync time recorded for any of `keys`.
+    """
+    session = get_session()
+    try:
+        return (
+            session.query(func.max(SyncState.synced_at))
+            .filter(SyncState.key.in_(keys))
+            .scalar()
+        )
+    finally:
+        session.close()
+
+
+def get_todos_for_user_synced_at(project_ids: list[str]) -> datetime | None:
+    """
+    When the configured user's todos were last synced: either by fetching
+    them directly, or by syncing every configured project (as of the oldest
+    of those syncs).
+    """
+    direct = get_synced_at(["all", TODOS_FOR_USER_KEY])
+    by_project = oldest(
+        get_synced_at(["all", f"project:{project_id}"]) for project_id in project_ids
+    )
+    return max((t for t in (direct, by_project) if t is not None), default=None)
+
+
+def get_last_synced_at() -> datetime | None:
+    """
+    The most recent time any part of the local database was synced.
+    """
+    session = get_session()
+    try:
+        return session.query(func.max(SyncState.synced_at)).scalar()
+    finally:
+        session.close()
+
+
+def enqueue_outbox_entry(
+    action: str,
+    payload: dict,
+    make_provisional: Callable[[int], BaseModel] | None = None,
+) -> int:
+    """
+    Store a pending write in the outbox and return its provisional local id
+    (the negated outbox id). If `make_provisional` is given, the model it
+    builds for that id is saved in the same transaction, so the pending write
+    shows up in local reads immediately.
+    """
+    session = get_session()
+    try:
+        entry = OutboxEntry(action=action, payload=payload, status="pending", attempts=0)
+        session.add(entry)
+        session.flush()
+        entry.local_id = -entry.id
+        if make_provisional is not None:
+            db_item = pydantic_to_sqlalchemy(make_provisional(entry.local_id))
+            session.add(db_item)
+            if isinstance(db_item, TodoItem):
+                replace_todo_assignees(session, [db_item])
+        session.commit()
+        return entry.local_id
+    finally:
+        session.close()
+
+
+def enqueue_outbox_entries(
+    action: str,
+    payloads: list[dict],
+    make_provisional: Callable[[int, dict], BaseModel] | None = None,
+) -> list[int]:
+    """
+    Like enqueue_outbox_entry, for many writes in one transaction: either all
+    of them are queued or none are. `make_provisional` gets each entry's
+    local id and payload.
+    """
+    session = get_session()
+    try:
+        entries = [
+            OutboxEntry(action=action, payload=payload, status="pending", attempts=0)
+            for payload in payloads
+        ]
+        session.add_all(entries)
+        session.flush()
+        db_items = []
+        for entry in entries:
+            entry.local_id = -entry.id
+            if make_provisional is not None:
+                db_item = pydantic_to_sqlalchemy(
+                    make_provisional(entry.local_id, entry.payload)
+                )
+                session.add(db_item)
+                db_items.append(db_item)
+        replace_todo_assignees(
+            session, [db_item for db_item in db_items if isinstance(db_item, TodoItem)]
+        )
+        session.commit()
+        return [entry.local_id for entry in entries]
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def get_outbox_entries(statuses: list[str] | None = None) -> list[OutboxEntry]:
+    session = get_session()
+    try:
+        query = session.query(OutboxEntry)
+        if statuses is not None:
+            query = query.filter(OutboxEntry.status.in_(statuses))
+        return query.order_by(OutboxEntry.id).all()
+    finally:
+        session.close()
+
+
+def claim_outbox_entry(entry_id: int) -> bool:
+    """
+    Atomically mark a pending entry as in flight. Returns False if another
+    process already claimed it.
+    """
+    now = datetime.now()
+    session = get_session()
+    try:
+        claimed = (
+            session.query(OutboxEntry)
+            .filter(OutboxEntry.id == entry_id, OutboxEntry.status == "pending")
+            .update(
+                {
+                    OutboxEntry.status: "in_flight",
+                    OutboxEntry.updated_at: now,
+                    OutboxEntry.attempts: OutboxEntry.attempts + 1,
+                },
+                synchronize_session=False,
+            )
+        )
+        session.commit()
+        return claimed == 1
+    finally:
+        session.close()
+
+
+def expire_outbox_claims(stale_after: timedelta) -> int:
+    """
+    Mark entries in flight for longer than `stale_after` as failed. The
+    process sending them died, possibly after Basecamp created the todo, so
+    they are not sent again automatically. Returns the number expired.
+    """
+    now = datetime.now()
+    session = get_session()
+    try:
+        expired = (
+            session.query(OutboxEntry)
+            .filter(
+                OutboxEntry.status == "in_flight",
+                OutboxEntry.updated_at < now - stale_after,
+            )
+            .update(
+                {
+                    OutboxEntry.status: "failed",
+                    OutboxEntry.last_error: "Interrupted while being sent; "
+                    "Basecamp may have created the todo",
+                    OutboxEntry.updated_at: now,
+                },
+                synchronize_session=False,
+            )
+        )
+        session.commit()
+        return expired
+    finally:
+        session.close()
+
+
+def record_outbox_creation(entry_id: int, remote_id: int) -> None:
+    """
+    Record that Basecamp created an entry's todo, before it is reconciled,
+    so the entry is never sent again.
+    """
+    session = get_session()
+    try:
+        entry = session.get(OutboxEntry, entry_id)
+        entry.status = "created"
+        entry.remote_id = remote_id
+        entry.updated_at = datetime.now()
+        session.commit()
+    finally:
+        session.close()
+
+
+def record_outbox_failure(
+    entry_id: int, error: str, max_attempts: int, retry: bool = True
+) -> None:
+    """
+    Put a failed entry back in the queue, or mark it failed once it has used
+    up `max_attempts` or when it must not be retried. Entries Basecamp
+    already created stay created, to be reconciled without sending them again.
+    """
+    session = get_session()
+    try:
+        entry = session.get(OutboxEntry, entry_id)
+        if entry.status != "created":
+            retry = retry and entry.attempts < max_attempts
+            entry.status = "pending" if retry else "failed"
+        entry.last_error = error
+        entry.updated_at = datetime.now()
+        session.commit()
+    finally:
+        session.close()
 
-    users = api.get_users()
-    save_to_db(users)
 
-    projects = api.get_projects()
-    save_to_db(projects)
+def retry_outbox_entries(entry_ids: list[int]) -> list[int]:
+    """
+    Queue failed entries to be sent again, with a fresh set of attempts.
+    Returns the ids of the entries that were failed.
+    """
+    now = datetime.now()
+    session = get_session()
+    try:
+        entries = (
+            session.query(OutboxEntry)
+            .filter(OutboxEntry.id.in_(entry_ids), OutboxEntry.status == "failed")
+            .all()
+        )
+        for entry in entries:
+            # One Basecamp already created is fetched rather than sent again
+            entry.status = "pending" if entry.remote_id is None else "created"
+            entry.attempts = 0
+            entry.updated_at = now
+        session.commit()
+        return [entry.id for entry in entries]
+    finally:
+        session.close()
 
-    todo_lists = api.get_todolists()
-    save_to_db(todo_lists)
 
-    todo_items = api.get_todo_items(project_ids=config.project_ids)
-    save_to_db(todo_items)
+def discard_outbox_entries(entry_ids: list[int]) -> list[int]:
+    """
+    Give up on failed entries: delete their provisional rows (and any current
+    todo history pointing at them) and mark the entries discarded, in one
+    transaction. Returns the ids of the entries that were failed.
+    """
+    now = datetime.now()
+    session = get_session()
+    try:
+        entries = (
+            session.query(OutboxEntry)
+            .filter(OutboxEntry.id.in_(entry_ids), OutboxEntry.status == "failed")
+            .all()
+        )
+        local_ids = [entry.local_id for entry in entries]
+        session.query(TodoItem).filter(TodoItem.id.in_(local_ids)).delete(
+            synchronize_session=False
+        )
+        replace_todo_assignees(session, [], removed_ids=local_ids)
+        session.query(CurrentTodoHistory).filter(
+            CurrentTodoHistory.todo_id.in_(local_ids)
+        ).delete(synchronize_session=False)
+        for entry in entries:
+            entry.status = "discarded"
+            entry.updated_at = now
+        session.commit()
+        return [entry.id for entry in entries]
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def reconcile_outbox_entry(entry_id: int, remote_item: BaseModel) -> None:
+    """
+    Replace an entry's provisional row with the item Basecamp created, point
+    current todo history at the real id and mark the entry done, all in one
+    transaction.
+    """
+    reconcile_outbox_entries([(entry_id, remote_item)])
+
+
+def reconcile_outbox_entries(reconciled: list[tuple[int, BaseModel]]) -> None:
+    """
+    reconcile_outbox_entry for many (entry id, created item) pairs, in a
+    single transaction.
+    """
+    if not reconciled:
+        return
+
+    session = get_session()
+    try:
+        for entry_id, remote_item in reconciled:
+            entry = session.get(OutboxEntry, entry_id)
+            db_item = pydantic_to_sqlalchemy(remote_item)
+            session.query(type(db_item)).filter_by(id=entry.local_id).delete()
+            session.merge(db_item)
+            if isinstance(db_item, TodoItem):
+                replace_todo_assignees(session, [db_item], removed_ids=[entry.local_id])
+            session.query(CurrentTodoHistory).filter(
+                CurrentTodoHistory.todo_id == entry.local_id
+            ).update({CurrentTodoHistory.todo_id: db_item.id})
+            entry.status = "done"
+            entry.remote_id = db_item.id
+            entry.last_error = None
+            entry.updated_at = datetime.now()
+        session.commit()
+        METRICS.incr("rows_upserted", len(reconciled))
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
 
 
 def get_todos_for_user_from_db() -> list[TodoItemView]:
@@ -115,6 +883,134 @@ def get_todos_for_user_from_db() -> list[TodoItemView]:
         session.close()
 
 
+def iter_todos_for_user_from_db(
+    active_only: bool = False,
+    limit: int | None = None,
+    offset: int = 0,
+    batch_size: int = 100,
+) -> Iterator[TodoItemView]:
+    """
+    Yield the configured user's todos from the database, sorted by todo list
+    name. Filtering, sorting and paging happen in SQL and rows are fetched in
+    batches of `batch_size`, so the first todo is available without loading
+    the rest.
+    """
+    config = read_config()
+    user_id = config.user_id
+    if user_id is None:
+        raise ValueError("User ID not found in configuration")
+
+    session = get_session()
+    try:
+        query = session.query(TodoItem).filter(
+            TodoItem.assignee_ids.like(f'%"{user_id}"%')
+        )
+        if active_only:
+            query = query.filter(
+                TodoItem.completed.is_(False), TodoItem.status != "trashed"
+            )
+        query = (
+            query.order_by(func.json_extract(TodoItem.parent, "$.title"), TodoItem.id)
+            .offset(offset)
+            .limit(limit)
+        )
+        for db_todo in query.yield_per(batch_size):
+            yield sqlalchemy_to_pydantic(db_todo)
+    finally:
+        session.close()
+
+
+def iter_todo_items_for_todolist_from_db(
+    todolist_id: int,
+    limit: int | None = None,
+    offset: int = 0,
+    batch_size: int = 100,
+) -> Iterator[TodoItemView]:
+    """
+    Yield the todos of one todo list from the database in list order, using
+    the index on todoitems.parent_id.
+    """
+    session = get_session()
+    try:
+        query = (
+            session.query(TodoItem)
+            .filter(TodoItem.parent_id == todolist_id)
+            .order_by(TodoItem.position, TodoItem.id)
+            .offset(offset)
+            .limit(limit)
+        )
+        for db_todo in query.yield_per(batch_size):
+            yield sqlalchemy_to_pydantic(db_todo)
+    finally:
+        session.close()
+
+
+def get_projects_from_db() -> list[ProjectView]:
+    session = get_session()
+    try:
+        db_projects = session.query(Project).order_by(Project.name, Project.id).all()
+        return [sqlalchemy_to_pydantic(db_project) for db_project in db_projects]
+    finally:
+        session.close()
+
+
+def get_users_from_db() -> list[UserView]:
+    session = get_session()
+    try:
+        db_users = session.query(User).order_by(User.name, User.id).all()
+        return [sqlalchemy_to_pydantic(db_user) for db_user in db_users]
+    finally:
+        session.close()
+
+
+def iter_todolists_for_project_from_db(project_id: int) -> Iterator[TodoListView]:
+    """
+    Yield a project's todo lists from the database in Basecamp's order.
+    """
+    session = get_session()
+    try:
+        query = (
+            session.query(TodoList)
+            .filter(json_field(TodoList.bucket, "$.id") == project_id)
+            .order_by(TodoList.position, TodoList.id)
+        )
+        for db_todolist in query.yield_per(100):
+            yield sqlalchemy_to_pydantic(db_todolist)
+    finally:
+        session.close()
+
+
+def get_todo_from_db(todo_id: int) -> TodoItemView | None:
+    """
+    Retrieve a specific TodoItem from the database by its ID.
+
+    Args:
+        todo_id (int): The ID of the TodoItem to retrieve.
+
+    Returns:
+        TodoItemView | None: The TodoItem as a TodoItemView if found, None otherwise.
+    """
+    session = get_session()
+    try:
+        db_todo = session.query(TodoItem).filter(TodoItem.id == todo_id).first()
+        return sqlalchemy_to_pydantic(db_todo) if db_todo else None
+    finally:
+        session.close()
+
+
+def get_todos_from_db(todo_ids: list[int]) -> dict[int, TodoItemView]:
+    """
+    Retrieve many TodoItems by ID in one query, keyed by ID. IDs that aren't
+    in the database are left out.
+    """
+    session = get_session()
+    try:
+        db_todos = session.query(TodoItem).filter(TodoItem.id.in_(todo_ids)).all()
+        return {db_todo.id: sqlalchemy_to_pydantic(db_todo) for db_todo in db_todos}
+    finally:
+        session.close()
+
+
 def get_todolist_from_db(todolist_id: int) -> TodoListView | None:
     """
     Retrieve a specific TodoList from the database by its ID.
@@ -149,3 +1045,225 @@ def get_project_from_db(project_id: int) -> ProjectView | None:
         return sqlalchemy_to_pydantic(db_project) if db_project else None
     finally:
         session.close()
+
+
+def get_completion_rows() -> list[tuple[str, int, int | None, str]]:
+    """
+    Return (kind, id, parent_id, label) rows for shell completion: every
+    project, every active todo list (parented by its project) and every open
+    todo (parented by its todo list). Only the needed columns are selected.
+    """
+    session = get_session()
+    try:
+        projects = session.query(Project.id, Project.name)
+        todolists = session.query(
+            TodoList.id, func.json_extract(TodoList.bucket, "$.id"), TodoList.title
+        ).filter(TodoList.status != "trashed")
+        todos = session.query(TodoItem.id, TodoItem.parent_id, TodoItem.title).filter(
+            TodoItem.completed.is_(False), TodoItem.status != "trashed"
+        )
+        return (
+            [("project", id, None, name) for id, name in projects]
+            + [("todolist", id, parent, title) for id, parent, title in todolists]
+            + [("todo", id, parent, title) for id, parent, title in todos]
+        )
+    finally:
+        session.close()
+
+
+def iter_query_results(statement, batch_size: int = 100) -> Iterator[TodoItemView]:
+    """
+    Yield the todos selected by a tenzing.query statement.
+    """
+    session = get_session()
+    try:
+        result = session.execute(statement.execution_options(yield_per=batch_size))
+        for db_todo in result.scalars():
+            yield sqlalchemy_to_pydantic(db_todo)
+    finally:
+        session.close()
+
+
+def explain_query(statement) -> tuple[str, dict, list[str]]:
+    """
+    Return the SQL of a statement, its parameters and the query plan SQLite
+    chose for it (one line per plan step, indented by depth).
+    """
+    session = get_session()
+    try:
+        # Named parameters so the SQL can be re-bound as text with each
+        # parameter's type, letting the dialect convert the values
+        compiled = statement.compile(
+            dialect=sqlite_dialect(paramstyle="named"),
+            compile_kwargs={"render_postcompile": True},
+        )
+        sql = str(compiled)
+        params = compiled.params
+        explain = text("EXPLAIN QUERY PLAN " + sql).bindparams(
+            *(
+                bindparam(name, value, type_=compiled.binds[name].type)
+                if name in compiled.binds
+                else bindparam(name, value)
+                for name, value in params.items()
+            )
+        )
+        depths = {0: -1}
+        plan = []
+        for node_id, parent_id, _, detail in session.execute(explain):
+            depths[node_id] = depths.get(parent_id, -1) + 1
+            plan.append("  " * depths[node_id] + detail)
+        return sql, params, plan
+    finally:
+        session.close()
+
+
+def agenda_filters(person_id: int) -> list:
+    # likely() tells SQLite that most todos pass the completed and status
+    # checks, so it starts from the person's rows in todo_assignees instead
+    # of walking the status index
+    return [
+        TodoAssignee.person_id == person_id,
+        TodoItem.due_on.is_not(None),
+        func.likely(TodoItem.completed.is_(False)),
+        func.likely(TodoItem.status == "active"),
+    ]
+
+
+def iter_agenda_from_db(person_id: int, batch_size: int = 100) -> Iterator[TodoItemView]:
+    """
+    Yield a person's open todos that have a due date, soonest first, found
+    through todo_assignees and the (due_on, completed, status) index.
+    """
+    session = get_session()
+    try:
+        query = (
+            session.query(TodoItem)
+            .join(TodoAssignee, TodoAssignee.todo_id == TodoItem.id)
+            .filter(*agenda_filters(person_id))
+            .order_by(TodoItem.due_on, TodoItem.id)
+        )
+        for db_todo in query.yield_per(batch_size):
+            yield sqlalchemy_to_pydantic(db_todo)
+    finally:
+        session.close()
+
+
+def count_agenda_from_db(person_id: int) -> list[tuple[date, int]]:
+    """
+    Count a person's open todos per due date, without loading the todos.
+    """
+    session = get_session()
+    try:
+        return [
+            (due_on, count)
+            for due_on, count in session.query(TodoItem.due_on, func.count())
+            .join(TodoAssignee, TodoAssignee.todo_id == TodoItem.id)
+            .filter(*agenda_filters(person_id))
+            .group_by(TodoItem.due_on)
+        ]
+    finally:
+        session.close()
+
+
+def get_todos_needing_comment_sync(
+    project_ids: list[str] | None = None,
+) -> list[TodoItemView]:
+    """
+    The todos whose comments_count or updated_at differ from when their
+    comments were last fetched, and commented todos never fetched.
+    """
+    session = get_session()
+    try:
+        query = (
+            session.query(TodoItem)
+            .outerjoin(CommentSync, CommentSync.todo_id == TodoItem.id)
+            .filter(
+                or_(
+                    and_(CommentSync.todo_id.is_(None), TodoItem.comments_count > 0),
+                    CommentSync.comments_count != TodoItem.comments_count,
+                    CommentSync.updated_at != TodoItem.updated_at,
+                )
+            )
+        )
+        if project_ids is not None:
+            query = query.filter(
+                json_field(TodoItem.bucket, "$.id").in_(
+                    [int(project_id) for project_id in project_ids]
+                )
+            )
+        return [sqlalchemy_to_pydantic(db_todo) for db_todo in query]
+    finally:
+        session.close()
+
+
+def save_comments(todo: TodoItemView, comments: list[CommentView]) -> None:
+    """
+    Replace the stored comments of `todo` and remember the comments_count
+    and updated_at they were fetched at, in one transaction.
+    """
+    session = get_session()
+    try:
+        session.query(Comment).filter(
+            Comment.parent_id == todo.id,
+            Comment.id.not_in([comment.id for comment in comments]),
+        ).delete(synchronize_session=False)
+        for comment in comments:
+            session.merge(pydantic_to_sqlalchemy(comment))
+        session.merge(
+            CommentSync(
+                todo_id=todo.id,
+                comments_count=todo.comments_count,
+                updated_at=todo.updated_at,
+                synced_at=datetime.now(),
+            )
+        )
+        session.commit()
+        METRICS.incr("rows_upserted", len(comments))
+    finally:
+        session.close()
+
+
+def get_comments_from_db(todo_id: int) -> list[CommentView]:
+    session = get_session()
+    try:
+        return [
+            sqlalchemy_to_pydantic(db_comment)
+            for db_comment in session.query(Comment)
+            .filter(Comment.parent_id == todo_id)
+            .order_by(Comment.created_at, Comment.id)
+        ]
+    finally:
+        session.close()
+
+
+def get_comments_synced_at(todo_id: int) -> datetime | None:
+    session = get_session()
+    try:
+        comment_sync = session.get(CommentSync, todo_id)
+        return comment_sync.synced_at if comment_sync else None
+    finally:
+        session.close()
+
+
+def iter_changes_from_db(
+    since: datetime,
+    project_id: int | None = None,
+    record_id: int | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+) -> Iterator[ChangeHistory]:
+    """
+    Yield the field changes recorded at or after `since` (local time),
+    newest first, with a range scan over the recorded_at index.
+    """
+    session = get_session()
+    try:
+        query = session.query(ChangeHistory).filter(ChangeHistory.recorded_at >= since)
+        if project_id is not None:
+            query = query.filter(ChangeHistory.project_id == project_id)
+        if record_id is not None:
+            query = query.filter(ChangeHistory.record_id == record_id)
+        query = query.order_by(ChangeHistory.recorded_at.desc(), ChangeHistory.id.desc())
+        yield from query.offset(offset).limit(limit).yield_per(100)
+    finally:
+        session.close()
@@ -0,0 +1,300 @@
+"""
+This module implements the filter language of `tenzing query`.
+
+A filter is a list of terms that must all match. A term is FIELD, an
+operator and a value, optionally negated with a leading `-`:
+
+    due<=+7d -status:trashed completed:no
+    project:"Website Redesign" assignee:none
+    creator:Jane updated<-30d sort:-updated
+
+Operators are `:` (equals), `~` (contains), `<`, `<=`, `>` and `>=`.
+Comma-separated values match any of them (`status:active,archived`) and
+`none` matches a missing value. Words without an operator match titles.
+Text is matched case-insensitively and literally: `%` and `_` are not
+wildcards.
+
+Fields:
+
+    id, comments              numbers
+    title, status             text
+    completed                 yes / no
+    due, starts               dates
+    created, updated          dates (compared by day)
+    list, project             an ID, or a title / name (with `:` or `~`)
+    assignee, creator         a person ID, `me`, or a name
+    comment                   words in the todo's synced comments
+
+Dates are YYYY-MM-DD, `today`, `tomorrow`, `yesterday`, or relative like
+`-30d`, `+2w`.
+
+The filter compiles to a parameterized SQLAlchemy select over todoitems,
+joined to todolists and projects only when a name is matched; the columns
+it filters on are indexed in tenzing.db. `comment` terms use the
+comments_fts full-text index: each word must appear in one comment, and
+`word*` matches a prefix.
+"""
+
+import re
+import shlex
+from datetime import date, datetime, time, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import (
+    and_,
+    column,
+    exists,
+    false,
+    func,
+    literal_column,
+    not_,
+    or_,
+    select,
+    table,
+)
+from sqlalchemy.sql import Select
+
+from tenzing.comments import fts_query
+from tenzing.db import Comment, Project, TodoAssignee, TodoItem, TodoList, json_field
+
+TERM = re.compile(r"^(-?)([a-z_]+)(<=|>=|:|~|<|>)(.*)$", re.S)
+RELATIVE_DATE = re.compile(r"^([+-]\d+)([dw])$")
+
+NUMBER_FIELDS = {"id": TodoItem.id, "comments": TodoItem.comments_count}
+TEXT_FIELDS = {"title": TodoItem.title, "status": TodoItem.status}
+DATE_FIELDS = {"due": TodoItem.due_on, "starts": TodoItem.starts_on}
+DATETIME_FIELDS = {"created": TodoItem.created_at, "updated": TodoItem.updated_at}
+SORT_FIELDS = {
+    **NUMBER_FIELDS,
+    **TEXT_FIELDS,
+    **DATE_FIELDS,
+    **DATETIME_FIELDS,
+    "list": func.json_extract(TodoItem.parent, "$.title"),
+    "project": func.json_extract(TodoItem.bucket, "$.name"),
+}
+FIELDS = (
+    set(SORT_FIELDS) | {"completed", "assignee", "creator", "list", "project", "comment"}
+)
+
+PROJECT_ID = json_field(TodoItem.bucket, "$.id")
+COMMENTS_FTS = table("comments_fts", column("rowid"))
+
+
+class FilterSyntaxError(ValueError):
+    pass
+
+
+class Term(NamedTuple):
+    field: str
+    op: str
+    values: list[str]
+    negated: bool = False
+
+
+class TodoQuery(NamedTuple):
+    terms: list[Term]
+    sort: list[str]
+
+
+def parse_filter(expression: str) -> TodoQuery:
+    """
+    Parse a filter expression into terms and sort keys. Raises
+    FilterSyntaxError for unknown fields and malformed terms.
+    """
+    try:
+        words = shlex.split(expression)
+    except ValueError as e:
+        raise FilterSyntaxError(str(e))
+
+    terms, sort = [], []
+    for word in words:
+        match = TERM.match(word)
+        if not match:
+            negated = word.startswith("-") and len(word) > 1
+            terms.append(Term("title", "~", [word.lstrip("-")], negated))
+            continue
+
+        negated, field, op, value = match.groups()
+        if field == "sort":
+            sort.extend(key for key in value.split(",") if key)
+            continue
+        if field not in FIELDS:
+            raise FilterSyntaxError(f"Unknown field: {field}")
+        if value == "":
+            raise FilterSyntaxError(f"Missing value for {field}")
+        terms.append(Term(field, op, value.split(","), bool(negated)))
+
+    for key in sort:
+        if key.lstrip("-") not in SORT_FIELDS:
+            raise FilterSyntaxError(f"Can't sort by {key.lstrip('-')}")
+    return TodoQuery(terms, sort)
+
+
+def resolve_date(value: str, today: date) -> date:
+    named = {
+        "today": today,
+        "tomorrow": today + timedelta(days=1),
+        "yesterday": today - timedelta(days=1),
+    }
+    if value in named:
+        return named[value]
+    if match := RELATIVE_DATE.match(value):
+        amount, unit = int(match.group(1)), match.group(2)
+        return today + timedelta(days=amount * (7 if unit == "w" else 1))
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise FilterSyntaxError(f"Invalid date: {value}")
+
+
+def _compare(column, op: str, value):
+    match op:
+        case ":":
+            return column == value
+        case "<":
+            return column < value
+        case "<=":
+            return column <= value
+        case ">":
+            return column > value
+        case ">=":
+            return column >= value
+    raise FilterSyntaxError(f"{op} can't be used here")
+
+
+def _like(column, value: str, contains: bool = True):
+    """
+    A case-insensitive LIKE matching `value` literally: `%` and `_` typed by
+    the user are not wildcards.
+    """
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return column.like(f"%{escaped}%" if contains else escaped, escape="\\")
+
+
+def _compare_day(column, op: str, day: date):
+    start = datetime.combine(day, time.min)
+    end = start + timedelta(days=1)
+    match op:
+        case ":":
+            return and_(column >= start, column < end)
+        case "<":
+            return column < start
+        case "<=":
+            return column < end
+        case ">":
+            return column >= end
+        case ">=":
+            return column >= start
+    raise FilterSyntaxError(f"{op} can't be used with dates")
+
+
+def _person_clause(field: str, value: str, user_id: str | None):
+    if value == "me":
+        if user_id is None:
+            raise FilterSyntaxError("`me` needs user_id in config.toml")
+        value = str(user_id)
+    if field == "assignee":
+        if value == "none":
+            return TodoItem.assignee_ids == []
+        if value.isdigit():
+            return TodoItem.id.in_(
+                select(TodoAssignee.todo_id).where(TodoAssignee.person_id == int(value))
+            )
+        # Only the assignees' names, not the rest of their JSON
+        assignees = func.json_each(TodoItem.assignees).table_valued("value")
+        return exists(
+            select(literal_column("1"))
+            .select_from(assignees)
+            .where(_like(func.json_extract(assignees.c.value, "$.name"), value))
+        )
+    if value.isdigit():
+        return func.json_extract(TodoItem.creator, "$.id") == int(value)
+    return _like(func.json_extract(TodoItem.creator, "$.name"), value)
+
+
+def _value_clause(term: Term, value: str, today: date, user_id: str | None):
+    field, op = term.field, term.op
+    if field in NUMBER_FIELDS:
+        if not value.isdigit():
+            raise FilterSyntaxError(f"{field} needs a number, not {value}")
+        return _compare(NUMBER_FIELDS[field], op, int(value))
+    if field in TEXT_FIELDS:
+        column = TEXT_FIELDS[field]
+        if op == "~":
+            return _like(column, value)
+        if field == "status":
+            # Statuses are stored in lowercase; comparing the bare column
+            # lets SQLite use ix_todoitems_status
+            return _compare(column, op, value.lower())
+        return _compare(func.lower(column), op, value.lower())
+    if field in DATE_FIELDS:
+        if value == "none":
+            return DATE_FIELDS[field].is_(None)
+        return _compare(DATE_FIELDS[field], op, resolve_date(value, today))
+    if field in DATETIME_FIELDS:
+        return _compare_day(DATETIME_FIELDS[field], op, resolve_date(value, today))
+    if field == "completed":
+        if value not in ("yes", "no", "true", "false"):
+            raise FilterSyntaxError(f"completed is yes or no, not {value}")
+        return TodoItem.completed.is_(value in ("yes", "true"))
+    if field in ("assignee", "creator"):
+        return _person_clause(field, value, user_id)
+    if field == "list":
+        if value.isdigit():
+            return TodoItem.parent_id == int(value)
+        return _like(TodoList.title, value, contains=op != ":")
+    if field == "project":
+        if value.isdigit():
+            return PROJECT_ID == int(value)
+        return _like(Project.name, value, contains=op != ":")
+    if field == "comment":
+        if op not in (":", "~"):
+            raise FilterSyntaxError(f"{op} can't be used with comments")
+        matching = select(COMMENTS_FTS.c.rowid).where(
+            literal_column("comments_fts").op("MATCH")(fts_query(value))
+        )
+        return TodoItem.id.in_(
+            select(Comment.parent_id).where(Comment.id.in_(matching))
+        )
+    raise FilterSyntaxError(f"Unknown field: {field}")
+
+
+def compile_query(
+    query: TodoQuery,
+    today: date | None = None,
+    user_id: str | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+) -> Select:
+    """
+    Build the select for `query`. Values become bound parameters, never SQL.
+    """
+    today = today or date.today()
+    statement = select(TodoItem)
+
+    joins = set()
+    for term in query.terms:
+        if term.field in ("list", "project") and not all(
+            value.isdigit() for value in term.values
+        ):
+            joins.add(term.field)
+    if "list" in joins:
+        statement = statement.outerjoin(TodoList, TodoList.id == TodoItem.parent_id)
+    if "project" in joins:
+        statement = statement.outerjoin(Project, Project.id == PROJECT_ID)
+
+    for term in query.terms:
+        clauses = [_value_clause(term, value, today, user_id) for value in term.values]
+        clause = or_(*clauses) if clauses else false()
+        statement = statement.where(not_(clause) if term.negated else clause)
+
+    order_by = []
+    for key in query.sort:
+        column = SORT_FIELDS[key.lstrip("-")]
+        order_by.append(
+            column.desc().nulls_last() if key.startswith("-") else column.asc().nulls_last()
+        )
+    if not order_by:
+        order_by = [TodoItem.due_on.asc().nulls_last()]
+    statement = statement.order_by(*order_by, TodoItem.id)
+    return statement.offset(offset).limit(limit)
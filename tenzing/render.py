@@ -0,0 +1,88 @@
+"""
+This module renders result sets to the terminal as they arrive.
+
+Instead of building one rich Table with every row before printing anything,
+rows are rendered in pages of `page_size`: the first page is printed as soon
+as it is full (or the data runs out), so time-to-first-row does not depend on
+how many rows match.
+"""
+
+import json
+import textwrap
+from contextlib import nullcontext
+from itertools import islice
+from typing import Iterable, Iterator, NamedTuple
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+
+class Column(NamedTuple):
+    header: str
+    style: str
+    width: int | None = None
+
+
+def paginate(
+    items: Iterable, limit: int | None = None, offset: int = 0
+) -> Iterator:
+    """
+    Lazily apply `offset` and `limit` to any iterable.
+    """
+    stop = None if limit is None else offset + limit
+    return islice(items, offset, stop)
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def stream_table(
+    title: str,
+    columns: list[Column],
+    rows: Iterable[tuple],
+    page_size: int = 50,
+    pager: bool = False,
+    console: Console | None = None,
+) -> int:
+    """
+    Print `rows` as a series of tables of at most `page_size` rows each. Only
+    the first table has a title and header. Returns the number of rows printed.
+
+    With `pager=True` the output is sent through the system pager ($PAGER).
+    """
+    console = console or Console()
+    printed = 0
+    with console.pager(styles=True) if pager else nullcontext():
+        for page_number, page in enumerate(chunked(rows, page_size)):
+            table = Table(
+                title=title if page_number == 0 else None,
+                show_header=page_number == 0,
+            )
+            for column in columns:
+                table.add_column(column.header, style=column.style, width=column.width)
+            for row in page:
+                table.add_row(*row)
+            console.print(table)
+            printed += len(page)
+        if printed == 0:
+            console.print(f"[yellow]{title}: no results.[/yellow]")
+    return printed
+
+
+def stream_json(items: Iterable[dict]) -> int:
+    """
+    Write `items` as an indented JSON array, one element at a time. The output
+    is the same as json.dumps(list(items), indent=2). Returns the item count.
+    """
+    count = 0
+    click.echo("[", nl=False)
+    for item in items:
+        click.echo("," if count else "", nl=False)
+        click.echo("\n" + textwrap.indent(json.dumps(item, indent=2), "  "), nl=False)
+        count += 1
+    click.echo("\n]" if count else "]")
+    return count
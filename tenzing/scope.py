@@ -0,0 +1,97 @@
+"""
+This module decides which Basecamp projects tenzing keeps in sync.
+
+The scope is the projects in `project_ids`, plus the projects matched by
+`include` and not matched by `exclude` in the [scope] table of config.toml.
+A pattern is a project ID or a glob matched against project names,
+ignoring case:
+
+    [scope]
+    include = ["Client: *", "4000001"]
+    exclude = ["* (archive)"]
+
+`refresh-db` and `sync` fetch projects, todolists, todos and people only for
+projects in scope. Anything else is fetched on demand by the commands that
+show it (e.g. `get-todolists --project-id ID --fresh`), or by
+`refresh-db --all`. Exclusions never remove a project listed in
+`project_ids`.
+
+Glob patterns need the names of every project, which costs a listing of
+the account's projects in refresh-db; `sync` matches them against the
+projects stored by the last refresh instead.
+"""
+
+import fnmatch
+from typing import Iterable
+
+
+def matches(pattern: str, project_id, name: str | None) -> bool:
+    pattern = str(pattern)
+    if pattern.isdigit():
+        return pattern == str(project_id)
+    return fnmatch.fnmatchcase((name or "").lower(), pattern.lower())
+
+
+def in_scope(config, project_id, name: str | None) -> bool:
+    if str(project_id) in {str(id) for id in config.project_ids}:
+        return True
+    return any(
+        matches(pattern, project_id, name) for pattern in config.scope["include"]
+    ) and not any(
+        matches(pattern, project_id, name) for pattern in config.scope["exclude"]
+    )
+
+
+def explicit_project_ids(config) -> list[str]:
+    """
+    The project IDs named in the config: `project_ids`, then the included
+    IDs that aren't excluded.
+    """
+    ids = [str(id) for id in config.project_ids]
+    for pattern in map(str, config.scope["include"]):
+        if pattern.isdigit() and in_scope(config, pattern, None):
+            ids.append(pattern)
+    return list(dict.fromkeys(ids))
+
+
+def needs_project_names(config) -> bool:
+    return any(not str(pattern).isdigit() for pattern in config.scope["include"])
+
+
+def scoped_project_ids(config, projects: Iterable) -> list[str]:
+    """
+    The IDs of the projects in scope, given `projects` (with `id` and `name`)
+    to match name globs against.
+    """
+    ids = explicit_project_ids(config)
+    if needs_project_names(config):
+        ids.extend(
+            str(project.id)
+            for project in projects
+            if in_scope(config, project.id, project.name)
+        )
+    return list(dict.fromkeys(ids))
+
+
+def get_raw_projects_in_scope(api, config) -> list:
+    """
+    Fetch the projects in scope: by ID, or from the list of every project
+    when name globs have to be matched.
+    """
+    projects = []
+    if needs_project_names(config):
+        projects = [
+            project
+            for project in api.get_raw_projects()
+            if in_scope(config, project.id, project.name)
+        ]
+    listed_ids = {str(project.id) for project in projects}
+    for project_id in explicit_project_ids(config):
+        if project_id in listed_ids:
+            continue
+        project = api.get_raw_project(project_id)
+        if project:
+            projects.append(project)
+        else:
+            print(f"Warning: Project with ID {project_id} not found.")
+    return projects
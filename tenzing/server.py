@@ -0,0 +1,172 @@
+"""
+This module implements an optional resident query server for the cached
+read commands.
+
+`tenzing serve` loads the configured user's todos and the current todo into
+memory and answers queries over a Unix socket next to the database. The
+index is reloaded whenever the database file changes. Commands call
+query_server() first and fall back to reading SQLite directly when it returns
+None (no server running, or the server failed to answer).
+
+The protocol is one JSON request line per connection, answered with one JSON
+response line:
+
+    {"query": "current_todo"}
+    {"query": "todos_for_user", "active_only": true, "limit": 10, "offset": 0}
+    {"query": "agenda", "person_id": 12345678, "summary": true}
+
+The client side only uses the standard library so it stays cheap to import;
+see tenzing.launcher for the entry point that answers without loading the CLI.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import threading
+
+# Kept in sync with tenzing.db.DB_PATH; importing tenzing.db would pull in SQLAlchemy
+SOCKET_PATH = os.path.expanduser("~/.config/tenzing/tenzing.sock")
+
+
+def query_server(
+    request: dict, path: str = SOCKET_PATH, timeout: float = 0.5
+) -> dict | None:
+    """
+    Send `request` to the query server and return its result, or None if the
+    server isn't running or couldn't answer.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(path)
+            client.sendall(json.dumps(request).encode() + b"\n")
+            with client.makefile("rb") as response_file:
+                response = json.loads(response_file.readline())
+    except (OSError, ValueError):
+        return None
+    if not response.get("ok"):
+        return None
+    return response["result"]
+
+
+class QueryIndex:
+    """
+    In-memory copy of the data the cached read commands need, rebuilt when
+    the database file's modification time changes.
+    """
+
+    def __init__(self, db_path: str | None = None) -> None:
+        from tenzing.db import DB_PATH
+
+        self.db_path = db_path or DB_PATH
+        self._lock = threading.Lock()
+        self._version = None
+        self.todos_for_user: list[dict] = []
+        self.todos_by_id: dict[int, dict] = {}
+        self.current_todo_id: int | None = None
+        self.last_synced_at: str | None = None
+
+    def _db_version(self) -> tuple:
+        stats = []
+        for path in (self.db_path, self.db_path + "-wal"):
+            try:
+                stats.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                stats.append(None)
+        return tuple(stats)
+
+    def refresh_if_changed(self) -> None:
+        with self._lock:
+            version = self._db_version()
+            if version == self._version:
+                return
+            self._load()
+            self._version = version
+
+    def _load(self) -> None:
+        from tenzing.snapshot import load_working_set
+
+        working_set = load_working_set()
+        self.todos_for_user = working_set.todos
+        self.todos_by_id = {todo["id"]: todo for todo in working_set.todos}
+        if working_set.current_todo is not None:
+            self.todos_by_id[working_set.current_todo_id] = working_set.current_todo
+        self.current_todo_id = working_set.current_todo_id
+        self.last_synced_at = working_set.last_synced_at
+
+    def answer(self, request: dict) -> dict:
+        self.refresh_if_changed()
+        match request.get("query"):
+            case "current_todo":
+                return {
+                    "todo_id": self.current_todo_id,
+                    "todo": self.todos_by_id.get(self.current_todo_id),
+                    "last_synced_at": self.last_synced_at,
+                }
+            case "todos_for_user":
+                todos = self.todos_for_user
+                if request.get("active_only"):
+                    todos = [
+                        todo
+                        for todo in todos
+                        if not todo["completed"] and todo["status"] != "trashed"
+                    ]
+                offset = request.get("offset") or 0
+                limit = request.get("limit")
+                stop = None if limit is None else offset + limit
+                return {
+                    "todos": todos[offset:stop],
+                    "last_synced_at": self.last_synced_at,
+                }
+            case "agenda":
+                # Answered from SQLite's indexes on each request, not from memory
+                from tenzing.agenda import load_agenda
+
+                person_id = request.get("person_id")
+                if person_id is None:
+                    from tenzing.config import read_config
+
+                    person_id = read_config().user_id
+                if person_id is None:
+                    raise ValueError("User ID not found in configuration")
+                return load_agenda(int(person_id), summary=bool(request.get("summary")))
+            case query:
+                raise ValueError(f"Unsupported query: {query}")
+
+
+class QueryRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+            response = {"ok": True, "result": self.server.index.answer(request)}
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class QueryServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str = SOCKET_PATH, index: QueryIndex | None = None):
+        self.index = index or QueryIndex()
+        super().__init__(path, QueryRequestHandler)
+
+
+def serve(path: str = SOCKET_PATH) -> None:
+    """
+    Run the query server until interrupted. Refuses to start if another
+    server is already answering on `path`; removes a stale socket otherwise.
+    """
+    if os.path.exists(path):
+        if query_server({"query": "current_todo"}, path=path) is not None:
+            raise RuntimeError(f"A query server is already running on {path}")
+        os.unlink(path)
+
+    server = QueryServer(path)
+    server.index.refresh_if_changed()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.unlink(path)
@@ -0,0 +1,170 @@
+"""
+This module implements `tenzing refresh-db --workers N`.
+
+On a large account a refresh spends most of its time parsing JSON and
+validating it into pydantic views, which keeps one core busy however fast the
+network is. With `--workers N` the projects are sharded across a pool of N
+processes, each with its own BasecampAPI session. A worker fetches one
+project's todolists and (for projects in scope) their todos, converts them
+to views, and sends them back one todolist at a time as a Batch on a queue.
+Like the serial refresh it covers the projects in scope (see tenzing.scope),
+or every project with `refresh-db --all`.
+
+The parent process is the only writer: it saves each batch with its resume
+checkpoint as it arrives, so SQLite never sees two writers and the
+checkpoints from persist.fully_refresh_db keep working. Projects in scope
+are queued first.
+
+basecampy3 rate-limits each process on its own, so every worker gets a 1/N
+share of the limit; throughput grows with the number of workers until the
+account-wide rate limit is what's holding it back.
+"""
+
+import multiprocessing
+import queue
+from datetime import datetime
+from typing import NamedTuple
+
+from basecampy3.constants import RATE_LIMIT_PER_SECONDS, RATE_LIMIT_REQUESTS
+from basecampy3.rated_semaphore import RatedSemaphore
+from basecampy3.transport_adapter import Basecamp3TransportAdapter
+
+from tenzing.basecamp_api import BasecampAPI
+from tenzing.config import Config
+from tenzing.metrics import METRICS
+from tenzing.models import ProjectView, TodoListView
+from tenzing.scope import get_raw_projects_in_scope, in_scope
+
+
+class Batch(NamedTuple):
+    items: list
+    checkpoint: str | None
+    # Set on the last batch of a shard, with the worker's HTTP counters
+    counters: dict[str, float] | None = None
+
+
+class Shard(NamedTuple):
+    project: dict
+    tracked: bool
+    done: frozenset[str]
+
+
+_api: BasecampAPI | None = None
+_batches = None
+
+
+def init_worker(batches, workers: int) -> None:
+    """
+    Set up a worker process: its share of the rate limit, an API session and
+    the queue batches go back on.
+    """
+    global _api, _batches
+    Basecamp3TransportAdapter.SEMAPHORE = RatedSemaphore(
+        max(RATE_LIMIT_REQUESTS // workers, 1), RATE_LIMIT_PER_SECONDS
+    )
+    _api = BasecampAPI()
+    _batches = batches
+
+
+def fetch_shard(shard: Shard) -> None:
+    """
+    Fetch and convert one project, putting a Batch on the queue for its
+    todolists and for each todolist's todos, most recently updated first.
+    The last batch carries the `project:<id>` checkpoint.
+    """
+    METRICS.reset()
+    projects = _api.bc3.projects
+    project = projects.OBJECT_CLASS(shard.project, projects)
+    project_key = f"project:{project.id}"
+
+    raw_todolists = _api.get_raw_todolists_for_project(project)
+    todolists = [TodoListView.from_api_data(todolist) for todolist in raw_todolists]
+    if shard.tracked:
+        _batches.put(Batch(todolists, None))
+        by_activity = sorted(
+            zip(raw_todolists, todolists),
+            key=lambda pair: pair[1].updated_at,
+            reverse=True,
+        )
+        for raw_todolist, _ in by_activity:
+            todolist_key = f"todolist:{raw_todolist.id}"
+            if todolist_key in shard.done:
+                continue
+            _batches.put(
+                Batch(_api.get_todo_items_for_todo_list(raw_todolist), todolist_key)
+            )
+        todolists = []
+    _batches.put(Batch(todolists, project_key, METRICS.snapshot()))
+
+
+def refresh_sharded(
+    api: BasecampAPI,
+    config: Config,
+    started_at: datetime,
+    done: set[str],
+    workers: int,
+    everything: bool = False,
+) -> None:
+    """
+    Save the projects in scope (with `everything`, all projects), crawl the
+    ones not yet done across `workers` processes, saving their batches here
+    as they arrive, then save the people on them.
+    """
+    from tenzing.persist import save_to_db
+
+    raw_projects = get_raw_projects_in_scope(api, config)
+    if everything:
+        listed_ids = {str(project.id) for project in raw_projects}
+        raw_projects.extend(
+            project
+            for project in api.get_raw_projects()
+            if str(project.id) not in listed_ids
+        )
+    save_to_db([ProjectView.from_api_data(project) for project in raw_projects])
+
+    shards = sorted(
+        (
+            Shard(
+                project._values,
+                in_scope(config, project.id, project.name),
+                frozenset(done),
+            )
+            for project in raw_projects
+            if f"project:{project.id}" not in done
+        ),
+        key=lambda shard: not shard.tracked,
+    )
+    if shards:
+        crawl_shards(shards, started_at, workers)
+
+    if "users" not in done:
+        if everything:
+            users = api.get_users()
+        else:
+            users = api.get_users_for_projects([str(project.id) for project in raw_projects])
+        save_to_db(users, checkpoint=("users", started_at))
+
+
+def crawl_shards(shards: list[Shard], started_at: datetime, workers: int) -> None:
+    from tenzing.persist import save_to_db
+
+    context = multiprocessing.get_context("spawn")
+    batches = context.Queue()
+    with context.Pool(
+        min(workers, len(shards)), initializer=init_worker, initargs=(batches, workers)
+    ) as pool:
+        result = pool.map_async(fetch_shard, shards, chunksize=1)
+        remaining = len(shards)
+        while remaining:
+            try:
+                batch = batches.get(timeout=0.1)
+            except queue.Empty:
+                if result.ready() and not result.successful():
+                    result.get()
+                continue
+            checkpoint = (batch.checkpoint, started_at) if batch.checkpoint else None
+            save_to_db(batch.items, checkpoint=checkpoint)
+            if batch.counters is not None:
+                remaining -= 1
+                for name, amount in batch.counters.items():
+                    METRICS.incr(name, amount)
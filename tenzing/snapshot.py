@@ -0,0 +1,329 @@
+"""
+This module implements a memory-mapped snapshot of the configured user's
+working set for the cached read commands.
+
+`get-current-todo --json` and `get-todos-for-user --cached --json` are
+answered by tenzing.launcher from a query server when one is running.
+Without one they would fall through to the CLI, which imports SQLAlchemy to
+read a few rows. Instead, the CLI writes a compact binary snapshot next to the
+database after each sync (and whenever it has to answer one of those commands
+from SQLite), and the launcher answers from it with the standard library:
+
+    header   magic, version, counts, current todo ID, database mtime and size
+    records  one fixed-width record per todo: ID, flags, JSON location
+    index    (ID, record number) pairs sorted by ID, searched by bisection
+    strings  each todo's JSON (as the query server returns it), UTF-8
+
+The user's todos come first, in get-todos-for-user order, followed by the
+current todo if it isn't one of them. The file is memory-mapped and records
+are unpacked in place; only the JSON of the todos actually printed is
+decoded.
+
+SQLite remains the source of truth. The snapshot records the database file's
+modification time and size when it was built, and any write to the database
+makes it stale. A stale, missing or unreadable snapshot, or one written by
+another format version, is ignored and the command falls through to the CLI,
+which then writes a new one. Snapshots are replaced atomically, so readers
+never see a partly written file.
+"""
+
+import bisect
+import json
+import mmap
+import os
+import struct
+from typing import NamedTuple
+
+# Kept next to tenzing.db.DB_PATH; importing tenzing.db would pull in SQLAlchemy
+SNAPSHOT_PATH = os.path.expanduser("~/.config/tenzing/snapshot.bin")
+DB_PATH = os.path.expanduser("~/.config/tenzing/tenzing.db")
+
+MAGIC = b"TENZSNAP"
+VERSION = 1
+
+# magic, version, flags, record count, user's todo count, current todo ID,
+# database mtime (ns) and size, last_synced_at location in the string table
+HEADER = struct.Struct("<8sHHIIqqqII")
+# todo ID, flags, JSON location in the string table
+RECORD = struct.Struct("<qB3xII")
+# todo ID, record number
+INDEX_ENTRY = struct.Struct("<qI")
+
+HAS_CURRENT_TODO = 1
+HAS_LAST_SYNCED_AT = 2
+
+COMPLETED = 1
+TRASHED = 2
+
+
+class WorkingSet(NamedTuple):
+    # The user's todos in get-todos-for-user order, as JSON-ready dicts
+    todos: list[dict]
+    current_todo_id: int | None
+    # Set when the current todo isn't one of `todos`
+    current_todo: dict | None
+    last_synced_at: str | None
+
+
+def load_working_set() -> WorkingSet:
+    """
+    Read the working set of the cached read commands from the database.
+    """
+    from tenzing.config import read_config
+    from tenzing.db import get_current_todo
+    from tenzing.persist import (
+        get_todo_from_db,
+        get_todos_for_user_synced_at,
+        iter_todos_for_user_from_db,
+    )
+
+    todos = [todo.model_dump(mode="json") for todo in iter_todos_for_user_from_db()]
+    current_todo_id = get_current_todo()
+    current_todo = None
+    if current_todo_id is not None and all(
+        todo["id"] != current_todo_id for todo in todos
+    ):
+        # The current todo may not be assigned to the configured user
+        view = get_todo_from_db(current_todo_id)
+        current_todo = view.model_dump(mode="json") if view is not None else None
+    last_synced_at = get_todos_for_user_synced_at(read_config().project_ids)
+    return WorkingSet(
+        todos,
+        current_todo_id,
+        current_todo,
+        last_synced_at.isoformat() if last_synced_at else None,
+    )
+
+
+def db_version(db_path: str = DB_PATH) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(db_path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def write_snapshot(
+    working_set: WorkingSet, version: tuple[int, int], path: str = SNAPSHOT_PATH
+) -> int:
+    """
+    Atomically replace the snapshot at `path` with `working_set`, built from
+    the database at `version`. Returns the number of records written.
+    """
+    todos = list(working_set.todos)
+    if working_set.current_todo is not None:
+        todos.append(working_set.current_todo)
+
+    strings = bytearray()
+
+    def add_string(value: str) -> tuple[int, int]:
+        data = value.encode("utf-8")
+        offset = len(strings)
+        strings.extend(data)
+        return offset, len(data)
+
+    flags = 0
+    synced_ref = (0, 0)
+    if working_set.last_synced_at is not None:
+        flags |= HAS_LAST_SYNCED_AT
+        synced_ref = add_string(working_set.last_synced_at)
+    if working_set.current_todo_id is not None:
+        flags |= HAS_CURRENT_TODO
+
+    records = bytearray()
+    for todo in todos:
+        todo_flags = (COMPLETED if todo["completed"] else 0) | (
+            TRASHED if todo["status"] == "trashed" else 0
+        )
+        offset, length = add_string(
+            json.dumps(todo, ensure_ascii=False, separators=(",", ":"))
+        )
+        records += RECORD.pack(todo["id"], todo_flags, offset, length)
+    index = b"".join(
+        INDEX_ENTRY.pack(todo_id, number)
+        for todo_id, number in sorted(
+            (todo["id"], number) for number, todo in enumerate(todos)
+        )
+    )
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        flags,
+        len(todos),
+        len(working_set.todos),
+        working_set.current_todo_id or 0,
+        *version,
+        *synced_ref,
+    )
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header + records + index + strings)
+    os.replace(tmp_path, path)
+    return len(todos)
+
+
+def refresh_snapshot(path: str = SNAPSHOT_PATH, db_path: str = DB_PATH) -> int | None:
+    """
+    Rebuild the snapshot from the database unless it is already current.
+    Returns the number of records written, or None if nothing was written.
+    """
+    from tenzing.config import read_config
+
+    version = db_version(db_path)
+    if version is None or read_config().user_id is None:
+        return None
+    snapshot = open_snapshot(path, db_path)
+    if snapshot is not None:
+        snapshot.close()
+        return None
+
+    working_set = load_working_set()
+    if db_version(db_path) != version:
+        # Written to while it was read; the next reader will try again
+        return None
+    return write_snapshot(working_set, version, path)
+
+
+class Snapshot:
+    """
+    Read access to a memory-mapped snapshot.
+    """
+
+    def __init__(self, buffer: mmap.mmap) -> None:
+        self.buffer = buffer
+        (
+            magic,
+            version,
+            self.flags,
+            self.record_count,
+            self.user_count,
+            current_todo_id,
+            mtime_ns,
+            size,
+            synced_offset,
+            synced_length,
+        ) = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a snapshot of this version")
+        self.db_version = (mtime_ns, size)
+        self.current_todo_id = (
+            current_todo_id if self.flags & HAS_CURRENT_TODO else None
+        )
+        self.index_offset = HEADER.size + self.record_count * RECORD.size
+        self.strings_offset = self.index_offset + self.record_count * INDEX_ENTRY.size
+        if self.strings_offset > len(buffer) or self.user_count > self.record_count:
+            raise ValueError("Truncated snapshot")
+        self.last_synced_at = (
+            self.string(synced_offset, synced_length)
+            if self.flags & HAS_LAST_SYNCED_AT
+            else None
+        )
+
+    def close(self) -> None:
+        self.buffer.close()
+
+    def string(self, offset: int, length: int) -> str:
+        start = self.strings_offset + offset
+        if start + length > len(self.buffer):
+            raise ValueError("Truncated snapshot")
+        return self.buffer[start : start + length].decode("utf-8")
+
+    def record(self, number: int) -> tuple[int, int, int, int]:
+        return RECORD.unpack_from(self.buffer, HEADER.size + number * RECORD.size)
+
+    def todo(self, number: int) -> dict:
+        _, _, offset, length = self.record(number)
+        return json.loads(self.string(offset, length))
+
+    def find(self, todo_id: int) -> int | None:
+        """
+        The record number of `todo_id`, found by bisecting the ID index.
+        """
+
+        def entry_id(position: int) -> int:
+            return INDEX_ENTRY.unpack_from(
+                self.buffer, self.index_offset + position * INDEX_ENTRY.size
+            )[0]
+
+        position = bisect.bisect_left(
+            range(self.record_count), todo_id, key=entry_id
+        )
+        if position == self.record_count or entry_id(position) != todo_id:
+            return None
+        return INDEX_ENTRY.unpack_from(
+            self.buffer, self.index_offset + position * INDEX_ENTRY.size
+        )[1]
+
+    def answer(self, request: dict) -> dict | None:
+        """
+        Answer a query server request the way the server would, or return None
+        for requests the snapshot can't answer.
+        """
+        match request.get("query"):
+            case "current_todo":
+                number = (
+                    self.find(self.current_todo_id)
+                    if self.current_todo_id is not None
+                    else None
+                )
+                return {
+                    "todo_id": self.current_todo_id,
+                    "todo": self.todo(number) if number is not None else None,
+                    "last_synced_at": self.last_synced_at,
+                }
+            case "todos_for_user":
+                numbers = range(self.user_count)
+                if request.get("active_only"):
+                    numbers = [
+                        number
+                        for number in numbers
+                        if not self.record(number)[1] & (COMPLETED | TRASHED)
+                    ]
+                offset = request.get("offset") or 0
+                limit = request.get("limit")
+                stop = None if limit is None else offset + limit
+                return {
+                    "todos": [self.todo(number) for number in numbers[offset:stop]],
+                    "last_synced_at": self.last_synced_at,
+                }
+        return None
+
+
+def open_snapshot(path: str = SNAPSHOT_PATH, db_path: str = DB_PATH) -> Snapshot | None:
+    """
+    Map the snapshot at `path`, or return None if it is missing, unreadable
+    or older than the database at `db_path`.
+    """
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        snapshot = Snapshot(buffer)
+    except (ValueError, struct.error):
+        buffer.close()
+        return None
+    if snapshot.db_version != db_version(db_path):
+        snapshot.close()
+        return None
+    return snapshot
+
+
+def answer_from_snapshot(
+    request: dict, path: str = SNAPSHOT_PATH, db_path: str = DB_PATH
+) -> dict | None:
+    """
+    Answer a query server request from the snapshot, or return None if there
+    is no current snapshot or it can't answer the request.
+    """
+    snapshot = open_snapshot(path, db_path)
+    if snapshot is None:
+        return None
+    try:
+        return snapshot.answer(request)
+    except (ValueError, struct.error):
+        return None
+    finally:
+        snapshot.close()
@@ -0,0 +1,394 @@
+"""
+This module keeps the local database fresh in the background.
+
+`tenzing sync --watch` polls each project in scope (see tenzing.scope) on
+its own schedule.
+A project whose todos changed since the last poll is polled again after
+`sync_min_interval` seconds; each poll that finds no changes doubles the
+interval, up to `sync_max_interval`. Schedules are stored in the sync_state
+table, so a restarted daemon picks up where the previous one left off.
+
+With `sync_strategy = "recordings"`, changes are found instead by reading
+Basecamp's account-wide recordings feed of todo lists and todos, newest
+first, and stopping at the newest `updated_at` saved by the previous sync
+(the watermark). That costs a few requests per cycle however many todo
+lists there are, and the feed is polled on the same adaptive interval.
+
+Both strategies then fetch the comments of the todos whose comments_count
+or updated_at changed (see tenzing.comments).
+
+Each cycle also flushes queued writes from the outbox (see tenzing.outbox)
+and rebuilds the shell completion index (see tenzing.completion).
+
+Only one sync process runs at a time, enforced with a PID lock file next to
+the database. Background commands started by stale reads are deduplicated
+the same way: each holds a lock named after its command until it exits.
+"""
+
+import fcntl
+import os
+import subprocess
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, NamedTuple
+
+from tenzing.basecamp_api import BasecampAPI
+from tenzing.comments import sync_comments
+from tenzing.completion import refresh_completion_index
+from tenzing.snapshot import refresh_snapshot
+from tenzing.config import Config
+from tenzing.db import DB_PATH
+from tenzing.models import TodoItemView, TodoListView
+from tenzing.outbox import flush_outbox
+from tenzing.scope import needs_project_names, scoped_project_ids
+from tenzing.persist import (
+    get_projects_from_db,
+    get_sync_state,
+    save_sync_state,
+    save_to_db,
+    tracked_sync_run,
+)
+
+LOCK_DIR = os.path.dirname(DB_PATH)
+PID_PATH = os.path.join(LOCK_DIR, "sync.pid")
+
+STRATEGIES = ("projects", "recordings")
+# Todo lists first, so todos never arrive before a list they belong to
+FEED_VIEWS = {"Todolist": TodoListView, "Todo": TodoItemView}
+FEED_STATUSES = ("active", "archived", "trashed")
+
+
+class SyncLockError(Exception):
+    pass
+
+
+class ProjectSchedule(NamedTuple):
+    project_id: str
+    due_at: datetime
+    interval_seconds: float
+    watermark: datetime | None
+
+
+@contextmanager
+def pid_lock(path: str = PID_PATH):
+    """
+    Hold an exclusive lock on `path` and write our PID into it. Raises
+    SyncLockError if another process holds the lock.
+
+    The file is emptied on release but never removed: a process that opened
+    it just before an unlink would lock an inode nobody else can see, and
+    two syncs would each hold "the" lock.
+    """
+    lock_file = open(path, "a+")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        raise SyncLockError(
+            f"Another sync is already running (PID {read_daemon_pid(path)})"
+        )
+
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(str(os.getpid()))
+    lock_file.flush()
+    try:
+        yield
+    finally:
+        lock_file.truncate(0)
+        lock_file.flush()
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
+
+def read_daemon_pid(path: str = PID_PATH) -> int | None:
+    """
+    Return the PID of the running sync process, or None if there isn't one.
+    """
+    try:
+        with open(path) as f:
+            pid = int(f.read().strip())
+        os.kill(pid, 0)
+    except (FileNotFoundError, ValueError, ProcessLookupError):
+        return None
+    except PermissionError:
+        pass  # the process exists but belongs to someone else
+    return pid
+
+
+def next_interval(
+    previous: float, changed: bool, min_interval: float, max_interval: float
+) -> float:
+    """
+    Poll active projects at `min_interval`; back off exponentially while a
+    project stays idle.
+    """
+    if changed:
+        return min_interval
+    return min(max(previous, min_interval) * 2, max_interval)
+
+
+def format_age(synced_at: datetime | None, now: datetime | None = None) -> str:
+    """
+    Describe how long ago `synced_at` was, e.g. "3m ago".
+    """
+    if synced_at is None:
+        return "never"
+    seconds = int(((now or datetime.now()) - synced_at).total_seconds())
+    if seconds < 60:
+        return f"{max(seconds, 0)}s ago"
+    if seconds < 3600:
+        return f"{seconds // 60}m ago"
+    if seconds < 86400:
+        return f"{seconds // 3600}h ago"
+    return f"{seconds // 86400}d ago"
+
+
+def describe_staleness(last_synced_at: datetime | None) -> str:
+    return f"Data last synced {format_age(last_synced_at)}"
+
+
+def synced_project_ids(config: Config) -> list[str]:
+    """
+    The projects in scope, matching name globs against the stored projects.
+    """
+    projects = get_projects_from_db() if needs_project_names(config) else []
+    return scoped_project_ids(config, projects)
+
+
+def load_schedules(config: Config, now: datetime) -> list[ProjectSchedule]:
+    schedules = []
+    for project_id in synced_project_ids(config):
+        state = get_sync_state(f"project:{project_id}")
+        if state is None or state.synced_at is None:
+            schedules.append(
+                ProjectSchedule(project_id, now, config.sync_min_interval, None)
+            )
+            continue
+        interval = state.interval_seconds or config.sync_min_interval
+        schedules.append(
+            ProjectSchedule(
+                project_id,
+                state.synced_at + timedelta(seconds=interval),
+                interval,
+                state.watermark,
+            )
+        )
+    return schedules
+
+
+def sync_project(api: BasecampAPI, project_id: str) -> datetime | None:
+    """
+    Fetch the todolists and todos of one project and save them. Returns the
+    newest todo `updated_at` seen, or None if the project has no todos.
+    """
+    project = api.get_raw_project(project_id)
+    raw_todolists = api.get_raw_todolists_for_project(project)
+    todolists = [TodoListView.from_api_data(todolist) for todolist in raw_todolists]
+    if todolists:
+        save_to_db(todolists)
+
+    todo_items = [
+        todo_item
+        for todolist in raw_todolists
+        for todo_item in api.get_todo_items_for_todo_list(todolist)
+    ]
+    if todo_items:
+        save_to_db(todo_items)
+    sync_comments(api, [project_id])
+
+    return max((todo.updated_at for todo in todo_items), default=None)
+
+
+def take_until_watermark(views: Iterable, watermark: datetime | None) -> Iterator:
+    """
+    Yield views from a newest-first feed until one is older than `watermark`.
+    Items updated at exactly the watermark are yielded again, so changes made
+    within the same second as the previous sync aren't missed.
+    """
+    for view in views:
+        if watermark is not None and view.updated_at < watermark:
+            return
+        yield view
+
+
+def feed_key(type: str) -> str:
+    return f"recordings:{type}"
+
+
+def sync_feed(api: BasecampAPI, project_ids: list[str]) -> int:
+    """
+    Save the todo lists and todos changed since the previous feed sync and
+    advance the watermarks. Returns the number of changed items.
+    """
+    changed_count = 0
+    for type, view_class in FEED_VIEWS.items():
+        state = get_sync_state(feed_key(type))
+        watermark = state.watermark if state else None
+        changed = []
+        for status in FEED_STATUSES:
+            raw_recordings = api.iter_raw_recordings(type, project_ids, status)
+            changed.extend(
+                take_until_watermark(
+                    (view_class.from_api_data(raw) for raw in raw_recordings),
+                    watermark,
+                )
+            )
+        if changed:
+            save_to_db(changed)
+        newest = max((view.updated_at for view in changed), default=watermark)
+        save_sync_state(feed_key(type), datetime.now(), watermark=newest)
+        # Only count items that are new since the watermark, not the re-read ones
+        changed_count += sum(
+            1 for view in changed if watermark is None or view.updated_at > watermark
+        )
+
+    sync_comments(api, project_ids)
+
+    # The feed covers every configured project's lists and todos
+    synced_at = datetime.now()
+    for project_id in project_ids:
+        save_sync_state(f"project:{project_id}", synced_at)
+    return changed_count
+
+
+def spawn_background_command(*args: str, lock_name: str | None = None) -> bool:
+    """
+    Start a detached `tenzing <args>` so the current command can exit.
+
+    With `lock_name`, nothing is started while a command started with the
+    same name is still running. The lock is taken here and handed to the
+    child as an inherited file descriptor, so it is held from before the
+    child starts until it exits, however it exits. Returns whether a command
+    was started.
+    """
+    lock_file = None
+    if lock_name is not None:
+        lock_file = open(os.path.join(LOCK_DIR, f"{lock_name}.lock"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+
+    try:
+        subprocess.Popen(
+            [sys.executable, "-m", "tenzing.cli", *args],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+            pass_fds=[lock_file.fileno()] if lock_file is not None else (),
+        )
+    finally:
+        # The child's copy of the descriptor keeps the lock
+        if lock_file is not None:
+            lock_file.close()
+    return True
+
+
+def run_sync_cycle(
+    api: BasecampAPI, schedules: list[ProjectSchedule], config: Config
+) -> list[ProjectSchedule]:
+    """
+    Sync every project that is due and return the updated schedules.
+    """
+    now = datetime.now()
+    updated = []
+    for schedule in schedules:
+        if schedule.due_at > now:
+            updated.append(schedule)
+            continue
+
+        try:
+            newest = sync_project(api, schedule.project_id)
+        except Exception as e:
+            print(f"Error syncing project {schedule.project_id}: {str(e)}")
+            updated.append(
+                schedule._replace(
+                    due_at=now + timedelta(seconds=config.sync_min_interval)
+                )
+            )
+            continue
+
+        changed = newest is not None and (
+            schedule.watermark is None or newest > schedule.watermark
+        )
+        interval = next_interval(
+            schedule.interval_seconds,
+            changed,
+            config.sync_min_interval,
+            config.sync_max_interval,
+        )
+        watermark = newest if changed else schedule.watermark
+        synced_at = datetime.now()
+        save_sync_state(
+            f"project:{schedule.project_id}",
+            synced_at,
+            watermark=watermark,
+            interval_seconds=interval,
+        )
+        updated.append(
+            ProjectSchedule(
+                schedule.project_id,
+                synced_at + timedelta(seconds=interval),
+                interval,
+                watermark,
+            )
+        )
+    if any(schedule.due_at <= now for schedule in schedules):
+        refresh_completion_index()
+        refresh_snapshot()
+    return updated
+
+
+def watch(
+    api: BasecampAPI, config: Config, stop_event: threading.Event | None = None
+) -> None:
+    """
+    Run sync cycles until `stop_event` is set, sleeping until the next
+    project is due.
+    """
+    stop_event = stop_event or threading.Event()
+    if config.sync_strategy == "recordings":
+        watch_feed(api, config, stop_event)
+        return
+    schedules = load_schedules(config, datetime.now())
+    while not stop_event.is_set():
+        flush_outbox(api)
+        if any(schedule.due_at <= datetime.now() for schedule in schedules):
+            with tracked_sync_run("sync"):
+                schedules = run_sync_cycle(api, schedules, config)
+        if not schedules:
+            return
+        next_due = min(schedule.due_at for schedule in schedules)
+        stop_event.wait(max((next_due - datetime.now()).total_seconds(), 1))
+
+
+def watch_feed(api: BasecampAPI, config: Config, stop_event: threading.Event) -> None:
+    """
+    Poll the recordings feed until `stop_event` is set, backing off while
+    nothing changes.
+    """
+    state = get_sync_state(feed_key("Todo"))
+    interval = (state.interval_seconds if state else None) or config.sync_min_interval
+    while not stop_event.is_set():
+        flush_outbox(api)
+        try:
+            with tracked_sync_run("sync"):
+                changed = sync_feed(api, synced_project_ids(config))
+        except Exception as e:
+            print(f"Error syncing the recordings feed: {str(e)}")
+            changed = 0
+            interval = config.sync_min_interval
+        else:
+            interval = next_interval(
+                interval, changed > 0, config.sync_min_interval, config.sync_max_interval
+            )
+            save_sync_state(feed_key("Todo"), datetime.now(), interval_seconds=interval)
+            if changed:
+                refresh_completion_index()
+                refresh_snapshot()
+        stop_event.wait(interval)
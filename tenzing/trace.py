@@ -0,0 +1,194 @@
+"""
+This module provides lightweight tracing for the Tenzing application.
+
+Spans are recorded by a module-level Tracer and can be exported in the Chrome
+trace event format, which can be opened in chrome://tracing or
+https://ui.perfetto.dev.
+
+Tracing is disabled by default, so spans cost almost nothing unless the
+`--profile` option is passed to the CLI.
+
+Example:
+
+    with span("api.get_projects"):
+        projects = api.get_projects()
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import NamedTuple
+from urllib.parse import urlparse
+
+
+class SpanRecord(NamedTuple):
+    name: str
+    category: str
+    start: float
+    duration: float
+    thread_id: int
+    args: dict
+
+
+class SpanSummary(NamedTuple):
+    name: str
+    category: str
+    count: int
+    total: float
+    max: float
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.spans: list[SpanRecord] = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def enable(self) -> None:
+        self.enabled = True
+        self.spans = []
+        self._origin = time.perf_counter()
+
+    def record(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        duration: float,
+        args: dict | None = None,
+    ) -> None:
+        """
+        Record a finished span. `start` is a time.perf_counter() value and
+        `duration` is in seconds.
+        """
+        if not self.enabled:
+            return
+        span_record = SpanRecord(
+            name=name,
+            category=category,
+            start=start - self._origin,
+            duration=duration,
+            thread_id=threading.get_ident(),
+            args=args or {},
+        )
+        with self._lock:
+            self.spans.append(span_record)
+
+    @contextmanager
+    def span(self, name: str, category: str = "tenzing", **args):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, category, start, time.perf_counter() - start, args)
+
+    def to_chrome_trace(self) -> dict:
+        """
+        Convert the recorded spans to a Chrome trace event document.
+        """
+        pid = os.getpid()
+        events = [
+            {
+                "name": span_record.name,
+                "cat": span_record.category,
+                "ph": "X",
+                "ts": round(span_record.start * 1_000_000, 3),
+                "dur": round(span_record.duration * 1_000_000, 3),
+                "pid": pid,
+                "tid": span_record.thread_id,
+                "args": span_record.args,
+            }
+            for span_record in self.spans
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def summarize(self, top: int = 10) -> list[SpanSummary]:
+        """
+        Aggregate spans by name and return the `top` biggest time sinks.
+        """
+        totals: dict[str, SpanSummary] = {}
+        for span_record in self.spans:
+            current = totals.get(span_record.name)
+            if current is None:
+                totals[span_record.name] = SpanSummary(
+                    name=span_record.name,
+                    category=span_record.category,
+                    count=1,
+                    total=span_record.duration,
+                    max=span_record.duration,
+                )
+            else:
+                totals[span_record.name] = current._replace(
+                    count=current.count + 1,
+                    total=current.total + span_record.duration,
+                    max=max(current.max, span_record.duration),
+                )
+        return sorted(totals.values(), key=lambda summary: summary.total, reverse=True)[
+            :top
+        ]
+
+
+TRACER = Tracer()
+
+
+def span(name: str, category: str = "tenzing", **args):
+    """Open a span on the global tracer."""
+    return TRACER.span(name, category, **args)
+
+
+def traced(name: str, category: str = "tenzing"):
+    """Decorator that wraps every call of the function in a span."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with TRACER.span(name, category):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def http_span_name(method: str, url: str) -> str:
+    """
+    Build a span name for an HTTP request, replacing numeric path segments
+    with `:id` so requests to the same endpoint are grouped together.
+
+    >>> http_span_name("GET", "https://3.basecampapi.com/999/buckets/1/todos/2.json")
+    'GET /:id/buckets/:id/todos/:id.json'
+    """
+    segments = []
+    for segment in urlparse(url).path.split("/"):
+        stem, dot, extension = segment.partition(".")
+        segments.append(f":id{dot}{extension}" if stem.isdigit() else segment)
+    return f"{method} {'/'.join(segments)}"
+
+
+def record_http_response(response, *args, **kwargs):
+    """
+    A requests response hook that records one span per HTTP request (which
+    includes every page fetched during pagination).
+    """
+    if not TRACER.enabled:
+        return response
+    duration = response.elapsed.total_seconds()
+    TRACER.record(
+        http_span_name(response.request.method, response.url),
+        "http",
+        time.perf_counter() - duration,
+        duration,
+        {"url": response.url, "status": response.status_code},
+    )
+    return response
@@ -0,0 +1,182 @@
+"""
+This module implements a local receiver for Basecamp webhooks.
+
+`tenzing webhook-receiver` listens for the JSON payloads Basecamp POSTs when
+a recording changes:
+
+    {"kind": "todo_completed", "recording": {"id": 1001, "type": "Todo", ...}, ...}
+
+and upserts just the affected todo or todolist, so the local database follows
+Basecamp within seconds of a change instead of waiting for the next refresh.
+Payloads for other recording types (messages, documents, ...) are
+acknowledged and ignored.
+
+The recording in a payload goes through the same from_api_data converters as
+API responses. When it lacks fields the views need, the recording is fetched
+from its `url` (one GET); if that's impossible, the payload is merged into
+the row already stored. Basecamp delivers an event again when the receiver
+fails, so events can arrive out of order; one whose recording is older than
+the stored row is acknowledged and not applied. Recorded payloads can be
+replayed with e.g.
+
+    curl -X POST --data @todo_completed.json http://127.0.0.1:8787/
+"""
+
+import json
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Callable, NamedTuple
+
+from pydantic import BaseModel, ValidationError
+
+from tenzing.models import TodoItemView, TodoListView
+
+RECORDING_VIEWS = {"Todo": TodoItemView, "Todolist": TodoListView}
+
+# What an event implies about fields a partial recording may leave out
+IMPLIED_CHANGES = {
+    "todo_completed": {"completed": True},
+    "todo_uncompleted": {"completed": False},
+}
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8787
+
+
+class WebhookResult(NamedTuple):
+    kind: str
+    recording_id: int | None
+    applied: bool
+    detail: str
+
+
+def view_for_event(
+    payload: dict,
+    existing: BaseModel | None,
+    fetch: Callable[[str, str], object | None] | None = None,
+) -> BaseModel | None:
+    """
+    Work out the new state of the todo or todolist a webhook payload is about.
+
+    `existing` is the stored copy, if any, and `fetch(url, type)` fetches the
+    recording from Basecamp. Returns None for recordings tenzing doesn't store,
+    or when there isn't enough information to build the view. A failed fetch
+    is only raised when there is no stored copy to fall back on.
+    """
+    recording = payload.get("recording") or {}
+    view_class = RECORDING_VIEWS.get(recording.get("type"))
+    if view_class is None:
+        return None
+
+    try:
+        return view_class.from_api_data(recording)
+    except ValidationError:
+        pass
+
+    fetch_error = None
+    if fetch is not None and recording.get("url"):
+        try:
+            raw_recording = fetch(recording["url"], recording["type"])
+        except Exception as e:
+            raw_recording, fetch_error = None, e
+        if raw_recording is not None:
+            return view_class.from_api_data(raw_recording)
+
+    if existing is None:
+        if fetch_error is not None:
+            raise fetch_error
+        return None
+    implied = IMPLIED_CHANGES.get(payload.get("kind"), {})
+    try:
+        return view_class.from_api_data(
+            {**existing.model_dump(), **recording, **implied}
+        )
+    except ValidationError:
+        return None
+
+
+def apply_webhook_event(payload: dict, fetch=None) -> WebhookResult:
+    """
+    Upsert the todo or todolist a webhook payload is about, unless the stored
+    row is newer than the payload.
+    """
+    from tenzing.persist import get_todo_from_db, get_todolist_from_db, save_to_db
+
+    kind = payload.get("kind", "")
+    recording = payload.get("recording") or {}
+    recording_id = recording.get("id")
+    recording_type = recording.get("type")
+    if recording_type not in RECORDING_VIEWS:
+        return WebhookResult(kind, recording_id, False, f"Ignored {recording_type} event")
+
+    if recording_type == "Todo":
+        existing = get_todo_from_db(recording_id)
+    else:
+        existing = get_todolist_from_db(recording_id)
+    view = view_for_event(payload, existing, fetch)
+    if view is None:
+        return WebhookResult(kind, recording_id, False, "Not enough data to apply")
+    if existing is not None and view.updated_at < existing.updated_at:
+        return WebhookResult(kind, recording_id, False, "Stale event")
+
+    save_to_db([view])
+    return WebhookResult(kind, recording_id, True, f"Saved {recording_type} {view.id}")
+
+
+class WebhookRequestHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != self.server.path.rstrip("/"):
+            self._respond(404, {"error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length))
+            if not isinstance(payload, dict):
+                raise ValueError("Expected a JSON object")
+        except ValueError as e:
+            self._respond(400, {"error": str(e)})
+            return
+
+        try:
+            result = self.server.apply(payload)
+        except Exception as e:
+            # A non-2xx answer makes Basecamp deliver the event again later
+            self._respond(500, {"error": str(e)})
+            recording = payload.get("recording") or {}
+            self.server.on_result(
+                WebhookResult(
+                    payload.get("kind", ""), recording.get("id"), False, f"Failed: {e}"
+                )
+            )
+            return
+        self._respond(200, result._asdict())
+        self.server.on_result(result)
+
+    def _respond(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class WebhookServer(HTTPServer):
+    """
+    Handles one delivery at a time, so database writes never overlap.
+    """
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        path: str = "/",
+        apply: Callable[[dict], WebhookResult] = apply_webhook_event,
+        on_result: Callable[[WebhookResult], None] = lambda result: None,
+    ) -> None:
+        self.path = path
+        self.apply = apply
+        self.on_result = on_result
+        super().__init__((host, port), WebhookRequestHandler)
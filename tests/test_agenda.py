@@ -0,0 +1,63 @@
+from datetime import date
+
+from tenzing.agenda import bucket_for, count_by_bucket, end_of_week, format_summary
+
+# A Wednesday
+TODAY = date(2024, 5, 1)
+
+
+class TestBucketFor:
+    def test_it_buckets_by_due_date(self):
+        # Act
+        actual = [
+            bucket_for(due_on, TODAY)
+            for due_on in (
+                date(2024, 4, 30),
+                date(2024, 5, 1),
+                date(2024, 5, 5),
+                date(2024, 5, 6),
+            )
+        ]
+
+        # Assert
+        expected = ["overdue", "today", "this_week", "later"]
+        assert expected == actual
+
+    def test_this_week_ends_on_sunday(self):
+        # Act
+        actual = (end_of_week(TODAY), end_of_week(date(2024, 5, 5)))
+
+        # Assert
+        expected = (date(2024, 5, 5), date(2024, 5, 5))
+        assert expected == actual
+
+
+class TestCountByBucket:
+    def test_it_adds_up_counts_per_due_date(self):
+        # Act
+        actual = count_by_bucket(
+            [(date(2024, 4, 1), 2), (date(2024, 4, 29), 1), (date(2024, 5, 3), 4)],
+            TODAY,
+        )
+
+        # Assert
+        expected = {"overdue": 3, "today": 0, "this_week": 4, "later": 0}
+        assert expected == actual
+
+
+class TestFormatSummary:
+    def test_it_skips_empty_buckets(self):
+        # Act
+        actual = format_summary({"overdue": 3, "today": 0, "this_week": 4, "later": 0})
+
+        # Assert
+        expected = "3 overdue · 4 this week"
+        assert expected == actual
+
+    def test_it_says_when_nothing_is_due(self):
+        # Act
+        actual = format_summary(dict.fromkeys(["overdue", "today", "this_week", "later"], 0))
+
+        # Assert
+        expected = "Nothing due"
+        assert expected == actual
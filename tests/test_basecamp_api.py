@@ -1,6 +1,18 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
+import requests
 from unittest.mock import Mock, patch, MagicMock
-from tenzing.basecamp_api import BasecampAPI
+from tenzing.basecamp_api import (
+    BasecampAPI,
+    InstrumentedTransportAdapter,
+    TodoCreationUnknown,
+    TodoNotCreated,
+    creation_error,
+)
+from basecampy3.exc import Basecamp3Error
 from tenzing.models import ProjectView, UserView, TodoListView, TodoItemView
 from datetime import datetime, timezone, date
 
@@ -255,3 +267,119 @@ class TestBasecampAPI:
         # Assert
         assert expected_todo_items == actual
         mock_bc3.todos.list.assert_called_once_with(todolist=mock_todolist)
+
+
+class TestGetRawTodolist:
+    def test_it_fetches_the_todolist_by_id(self):
+        # Arrange
+        mock_bc3 = MagicMock()
+        with patch("tenzing.basecamp_api.Basecamp3", return_value=mock_bc3):
+            api = BasecampAPI()
+
+        # Act
+        actual = api.get_raw_todolist("1", "50")
+
+        # Assert
+        expected = mock_bc3.todolists.get.return_value
+        assert expected == actual
+        mock_bc3.todolists.get.assert_called_once_with(50, 1)
+
+    def test_it_returns_none_when_basecamp_returns_404(self):
+        # Arrange
+        mock_bc3 = MagicMock()
+        mock_bc3.todolists.get.side_effect = Basecamp3Error(
+            response=Mock(status_code=404)
+        )
+        with patch("tenzing.basecamp_api.Basecamp3", return_value=mock_bc3):
+            api = BasecampAPI()
+
+        # Act
+        actual = api.get_raw_todolist("1", "50")
+
+        # Assert
+        expected = None
+        assert expected == actual
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections alive
+
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(1)
+        body = b"[]"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestInstrumentedTransportAdapter:
+    def serve(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+    def test_it_reuses_connections(self):
+        # Arrange
+        server, url = self.serve()
+        adapter = InstrumentedTransportAdapter(pool_size=2)
+        session = requests.Session()
+        session.mount("http://", adapter)
+
+        # Act
+        try:
+            for _ in range(5):
+                session.get(url)
+        finally:
+            server.shutdown()
+        stats = adapter.connection_stats()
+        actual = (stats.requests, stats.connections, stats.reused)
+
+        # Assert
+        expected = (5, 1, 4)
+        assert expected == actual
+
+    def test_it_times_out_hung_requests(self):
+        # Arrange
+        server, url = self.serve()
+        session = requests.Session()
+        session.mount("http://", InstrumentedTransportAdapter(timeout=(1, 0.1)))
+
+        # Act / Assert
+        try:
+            with pytest.raises(requests.exceptions.Timeout):
+                session.get(url + "/slow")
+        finally:
+            server.shutdown()
+
+
+class TestCreationError:
+    def test_it_treats_rejections_as_not_created(self):
+        # Arrange
+        error = Basecamp3Error(response=Mock(status_code=422))
+
+        # Act
+        actual = type(creation_error(error))
+
+        # Assert
+        expected = TodoNotCreated
+        assert expected == actual
+
+    def test_it_treats_timeouts_and_server_errors_as_unknown(self):
+        # Arrange
+        errors = [
+            requests.ReadTimeout("Read timed out"),
+            Basecamp3Error(response=Mock(status_code=502)),
+        ]
+
+        # Act
+        actual = [type(creation_error(error)) for error in errors]
+
+        # Assert
+        expected = [TodoCreationUnknown, TodoCreationUnknown]
+        assert expected == actual
@@ -0,0 +1,94 @@
+from datetime import date
+from unittest.mock import Mock
+
+import pytest
+import requests
+from basecampy3.exc import Basecamp3Error
+
+from tenzing.bulk import BulkOperation, parse_operation, parse_operations, with_retries
+
+
+class TestParseOperation:
+    def test_it_parses_text_lines(self):
+        # Act
+        actual = parse_operation("reassign 1002 7,8", 1)
+
+        # Assert
+        expected = BulkOperation(1, 1002, "reassign", {"assignee_ids": ["7", "8"]})
+        assert expected == actual
+
+    def test_it_parses_json_lines(self):
+        # Act
+        actual = parse_operation(
+            '{"id": 1003, "action": "reschedule", "due_on": "2024-06-01"}', 2
+        )
+
+        # Assert
+        expected = BulkOperation(2, 1003, "reschedule", {"due_on": date(2024, 6, 1)})
+        assert expected == actual
+
+    def test_it_uses_the_default_action_for_bare_ids(self):
+        # Act
+        actual = parse_operation("1001", 3, default_action="complete")
+
+        # Assert
+        expected = BulkOperation(3, 1001, "complete", {})
+        assert expected == actual
+
+    def test_it_rejects_unknown_update_fields(self):
+        # Act / Assert
+        with pytest.raises(ValueError):
+            parse_operation('{"id": 1, "action": "update", "colour": "red"}', 1)
+
+
+class TestParseOperations:
+    def test_it_reports_invalid_lines_and_skips_comments(self):
+        # Act
+        operations, errors = parse_operations(["# triage", "", "complete 1", "fly 2"])
+        actual = ([op.line_number for op in operations], [e.line_number for e in errors])
+
+        # Assert
+        expected = ([3], [4])
+        assert expected == actual
+
+
+class TestWithRetries:
+    def test_it_retries_server_errors(self):
+        # Arrange
+        call = Mock(side_effect=[Basecamp3Error(response=Mock(status_code=503)), "ok"])
+
+        # Act
+        actual = with_retries(call, attempts=3, backoff=0)
+
+        # Assert
+        expected = "ok"
+        assert expected == actual
+
+    def test_it_does_not_retry_client_errors(self):
+        # Arrange
+        call = Mock(side_effect=Basecamp3Error(response=Mock(status_code=404)))
+
+        # Act / Assert
+        with pytest.raises(Basecamp3Error):
+            with_retries(call, attempts=3, backoff=0)
+        assert 1 == call.call_count
+
+    def test_it_retries_network_failures(self):
+        # Arrange
+        call = Mock(side_effect=[requests.ConnectionError(), "ok"])
+
+        # Act
+        actual = with_retries(call, attempts=3, backoff=0)
+
+        # Assert
+        expected = "ok"
+        assert expected == actual
+
+    def test_it_does_not_retry_other_errors(self):
+        # Arrange
+        call = Mock(side_effect=AttributeError("'NoneType' object has no attribute 'id'"))
+
+        # Act / Assert
+        with pytest.raises(AttributeError):
+            with_retries(call, attempts=3, backoff=0)
+        assert 1 == call.call_count
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from basecampy3.exc import Basecamp3Error
+
+from tenzing.comments import fts_query, html_to_text, sync_comments
+
+
+class TestHtmlToText:
+    def test_it_keeps_one_line_per_block(self):
+        # Act
+        actual = html_to_text(
+            "<div>Invoice <strong>draft</strong>\n attached<br>see &amp; review</div>"
+            "<ul><li>one</li><li>two</li></ul>"
+        )
+
+        # Assert
+        expected = "Invoice draft attached\nsee & review\none\ntwo"
+        assert expected == actual
+
+
+class TestFtsQuery:
+    def test_it_quotes_words_and_keeps_prefixes(self):
+        # Act
+        actual = fts_query('inv* "draft" foo(bar')
+
+        # Assert
+        expected = '"inv"* """draft""" "foo(bar"'
+        assert expected == actual
+
+
+class TestSyncComments:
+    @patch("tenzing.models.CommentView")
+    @patch("tenzing.persist.save_comments")
+    @patch("tenzing.persist.get_todos_needing_comment_sync")
+    def test_it_only_fetches_todos_that_still_have_comments(
+        self, get_todos_needing_comment_sync, save_comments, CommentView
+    ):
+        # Arrange
+        commented = SimpleNamespace(id=1, comments_count=2, comments_url="/1/comments.json")
+        uncommented = SimpleNamespace(id=2, comments_count=0, comments_url="/2/comments.json")
+        get_todos_needing_comment_sync.return_value = [commented, uncommented]
+        CommentView.from_api_data.side_effect = lambda raw: raw
+        api = Mock()
+        api.iter_raw_comments.return_value = ["first", "second"]
+
+        # Act
+        actual = sync_comments(api, ["1"])
+
+        # Assert
+        assert 2 == actual
+        get_todos_needing_comment_sync.assert_called_once_with(["1"])
+        api.iter_raw_comments.assert_called_once_with("/1/comments.json")
+        expected = [((commented, ["first", "second"]),), ((uncommented, []),)]
+        assert expected == [(call.args,) for call in save_comments.call_args_list]
+
+    @patch("tenzing.models.CommentView")
+    @patch("tenzing.persist.save_comments")
+    @patch("tenzing.persist.get_todos_needing_comment_sync")
+    def test_it_carries_on_past_todos_whose_comments_fail(
+        self, get_todos_needing_comment_sync, save_comments, CommentView
+    ):
+        # Arrange
+        deleted = SimpleNamespace(id=1, comments_count=2, comments_url="/1/comments.json")
+        failing = SimpleNamespace(id=2, comments_count=1, comments_url="/2/comments.json")
+        working = SimpleNamespace(id=3, comments_count=1, comments_url="/3/comments.json")
+        get_todos_needing_comment_sync.return_value = [deleted, failing, working]
+        CommentView.from_api_data.side_effect = lambda raw: raw
+        errors = {
+            "/1/comments.json": Basecamp3Error(response=Mock(status_code=404)),
+            "/2/comments.json": Basecamp3Error(response=Mock(status_code=500)),
+        }
+
+        def iter_raw_comments(url):
+            if url in errors:
+                raise errors[url]
+            return ["only"]
+
+        api = Mock()
+        api.iter_raw_comments.side_effect = iter_raw_comments
+
+        # Act
+        actual = sync_comments(api)
+
+        # Assert
+        assert 2 == actual
+        expected = [((deleted, []),), ((working, ["only"]),)]
+        assert expected == [(call.args,) for call in save_comments.call_args_list]
@@ -0,0 +1,98 @@
+import os
+import tempfile
+
+from tenzing.completion import (
+    CompletionEntry,
+    complete_ids,
+    completion_target,
+    fuzzy_match,
+    write_completion_index,
+)
+
+
+class TestCompletionTarget:
+    def test_it_completes_positional_ids_in_order(self):
+        # Act
+        actual = completion_target(["list-todo-items", "1"], "")
+
+        # Assert
+        expected = ("todolist", "1")
+        assert expected == actual
+
+    def test_it_completes_id_options_after_global_options(self):
+        # Act
+        actual = completion_target(
+            ["--profile", "out.json", "create-todo", "--todolist-id"], "5"
+        )
+
+        # Assert
+        expected = ("todolist", None)
+        assert expected == actual
+
+    def test_it_returns_none_for_other_arguments(self):
+        # Act
+        actual = completion_target(["set-current-todo", "1001"], "")
+
+        # Assert
+        expected = None
+        assert expected == actual
+
+
+class TestFuzzyMatch:
+    def test_it_matches_characters_in_order(self):
+        # Act
+        actual = (fuzzy_match("wrdc", "Write docs"), fuzzy_match("dcw", "Write docs"))
+
+        # Assert
+        expected = (True, False)
+        assert expected == actual
+
+
+class TestCompleteIds:
+    def test_it_ranks_id_prefixes_before_title_matches(self):
+        # Arrange
+        path = os.path.join(tempfile.mkdtemp(), "completion.tsv")
+        write_completion_index(
+            [
+                CompletionEntry("todo", 1001, 50, "Release 12"),
+                CompletionEntry("todo", 1202, 51, "Write\tdocs"),
+                CompletionEntry("todo", 1003, 50, "Unrelated"),
+                CompletionEntry("todolist", 12, 1, "Backlog"),
+            ],
+            path,
+        )
+
+        # Act
+        actual = [
+            (entry.id, entry.label) for entry in complete_ids("todo", "12", path=path)
+        ]
+
+        # Assert
+        expected = [("1202", "Write docs"), ("1001", "Release 12")]
+        assert expected == actual
+
+    def test_it_filters_by_parent(self):
+        # Arrange
+        path = os.path.join(tempfile.mkdtemp(), "completion.tsv")
+        write_completion_index(
+            [
+                CompletionEntry("todolist", 50, 1, "Backlog"),
+                CompletionEntry("todolist", 60, 2, "Backlog"),
+            ],
+            path,
+        )
+
+        # Act
+        actual = [entry.id for entry in complete_ids("todolist", "", "2", path)]
+
+        # Assert
+        expected = ["60"]
+        assert expected == actual
+
+    def test_it_returns_nothing_without_an_index(self):
+        # Act
+        actual = complete_ids("project", "", path="/nonexistent/completion.tsv")
+
+        # Assert
+        expected = []
+        assert expected == actual
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from tenzing.edit import TodoDraft, clean_id, parse_todo_file, split_headings
+
+
+class TestCleanId:
+    def test_it_drops_the_name_in_parentheses(self):
+        # Act
+        actual = (clean_id("50 (Backlog)"), clean_id(50), clean_id(None))
+
+        # Assert
+        expected = ("50", "50", "")
+        assert expected == actual
+
+
+class TestSplitHeadings:
+    def test_it_splits_at_top_level_headings_outside_code(self):
+        # Arrange
+        content = "## One\nfirst\n### Detail\n```\n## not a heading\n```\n## Two\n"
+
+        # Act
+        actual = split_headings(content)
+
+        # Assert
+        expected = [
+            ("One", "first\n### Detail\n```\n## not a heading\n```"),
+            ("Two", ""),
+        ]
+        assert expected == actual
+
+
+class TestParseTodoFile:
+    @patch("tenzing.edit.get_todolist_from_db")
+    def test_it_reads_frontmatter_documents_and_headings(self, get_todolist_from_db):
+        # Arrange
+        text = (
+            "---\nproject_id: 1\ntodolist_id: 50 (Backlog)\n---\n"
+            "# Write docs\nSoon.\n# Fix bug\n"
+            "---\ntodolist_id: 51\ntitle: Ship it\n---\nToday.\n"
+        )
+        get_todolist_from_db.return_value = SimpleNamespace(get_project_id=lambda: 2)
+
+        # Act
+        actual, errors = parse_todo_file(text)
+
+        # Assert
+        expected = [
+            TodoDraft("1", "50", "Write docs", "<p>Soon.</p>"),
+            TodoDraft("1", "50", "Fix bug", ""),
+            TodoDraft("2", "51", "Ship it", "<p>Today.</p>"),
+        ]
+        assert expected == actual
+        assert [] == errors
+        get_todolist_from_db.assert_called_once_with(51)
+
+    def test_it_reports_todos_without_a_todolist(self):
+        # Act
+        drafts, actual = parse_todo_file("---\nproject_id: 1\ntitle: Orphan\n---\n")
+
+        # Assert
+        expected = ["Todo 1 (Orphan): missing or invalid todolist_id"]
+        assert expected == actual
@@ -0,0 +1,64 @@
+from datetime import datetime
+
+from tenzing.freshness import ReadPlan, classify, oldest, plan_read
+
+NOW = datetime(2024, 5, 1, 12, 0, 0)
+
+
+class TestClassify:
+    def test_it_classifies_by_age(self):
+        # Act
+        actual = (
+            classify(datetime(2024, 5, 1, 11, 59), 300, NOW),
+            classify(datetime(2024, 5, 1, 11, 0), 300, NOW),
+            classify(None, 300, NOW),
+        )
+
+        # Assert
+        expected = ("fresh", "stale", "missing")
+        assert expected == actual
+
+
+class TestPlanRead:
+    def test_it_serves_stale_data_from_cache_and_revalidates(self):
+        # Act
+        actual = plan_read(datetime(2024, 5, 1, 11, 0), 300, now=NOW)
+
+        # Assert
+        expected = ReadPlan(from_cache=True, revalidate=True)
+        assert expected == actual
+
+    def test_it_fetches_missing_data(self):
+        # Act
+        actual = plan_read(None, 300, now=NOW)
+
+        # Assert
+        expected = ReadPlan(from_cache=False, revalidate=False)
+        assert expected == actual
+
+    def test_it_honours_cached_and_fresh(self):
+        # Act
+        actual = (
+            plan_read(None, 300, cached=True, now=NOW),
+            plan_read(datetime(2024, 5, 1, 11, 59), 300, fresh=True, now=NOW),
+        )
+
+        # Assert
+        expected = (
+            ReadPlan(from_cache=True, revalidate=False),
+            ReadPlan(from_cache=False, revalidate=False),
+        )
+        assert expected == actual
+
+
+class TestOldest:
+    def test_it_returns_none_if_anything_was_never_synced(self):
+        # Act
+        actual = (
+            oldest([datetime(2024, 5, 1), datetime(2024, 4, 1)]),
+            oldest([datetime(2024, 5, 1), None]),
+        )
+
+        # Assert
+        expected = (datetime(2024, 4, 1), None)
+        assert expected == actual
@@ -0,0 +1,73 @@
+from datetime import date, datetime
+
+from tenzing.db import TodoItem
+from tenzing.history import FieldChange, diff_fields
+from tenzing.persist import change_history_rows
+
+
+class TestDiffFields:
+    def test_it_returns_changed_tracked_fields_as_json_values(self):
+        # Arrange
+        old = {"title": "Draft", "completed": False, "due_on": None, "assignee_ids": [2, 1]}
+        new = {
+            "title": "Draft",
+            "completed": True,
+            "due_on": date(2024, 5, 1),
+            "assignee_ids": ["1", "2"],
+            "description": "ignored",
+        }
+
+        # Act
+        actual = diff_fields("TodoItem", old, new)
+
+        # Assert
+        expected = [
+            FieldChange("completed", False, True),
+            FieldChange("due_on", None, "2024-05-01"),
+        ]
+        assert expected == actual
+
+    def test_it_skips_fields_that_were_not_fetched(self):
+        # Act
+        actual = diff_fields("TodoItem", {"status": "active"}, {"title": None})
+
+        # Assert
+        expected = []
+        assert expected == actual
+
+
+class TestChangeHistoryRows:
+    def test_it_records_each_change_at_the_todos_updated_at(self):
+        # Arrange
+        stored = TodoItem(
+            id=7,
+            title="Invoice",
+            status="active",
+            completed=False,
+            assignee_ids=[1],
+            bucket={"id": 100},
+        )
+        updated_at = datetime(2024, 5, 2, 9, 30)
+        new = TodoItem(
+            id=7,
+            title="Invoice ACME",
+            status="active",
+            completed=False,
+            assignee_ids=[1, 2],
+            bucket={"id": 100},
+            updated_at=updated_at,
+        )
+
+        # Act
+        rows = change_history_rows(stored, new)
+
+        # Assert
+        expected = [
+            ("title", "Invoice", "Invoice ACME"),
+            ("assignee_ids", ["1"], ["1", "2"]),
+        ]
+        actual = [(row.field, row.old_value, row.new_value) for row in rows]
+        assert expected == actual
+        assert all(row.changed_at == updated_at for row in rows)
+        assert all(row.project_id == 100 for row in rows)
+        assert all(row.title == "Invoice ACME" for row in rows)
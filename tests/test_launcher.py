@@ -0,0 +1,93 @@
+from tenzing.launcher import parse_completion_request, parse_fast_path_request
+
+
+class TestParseFastPathRequest:
+    def test_it_returns_current_todo_query(self):
+        # Act
+        actual = parse_fast_path_request(["get-current-todo", "--json"])
+
+        # Assert
+        expected = {"query": "current_todo"}
+        assert expected == actual
+
+    def test_it_returns_todos_for_user_query_with_paging(self):
+        # Act
+        actual = parse_fast_path_request(
+            ["get-todos-for-user", "--cached", "--json", "--active-only", "--limit", "5"]
+        )
+
+        # Assert
+        expected = {
+            "query": "todos_for_user",
+            "active_only": True,
+            "limit": 5,
+            "offset": 0,
+        }
+        assert expected == actual
+
+    def test_it_returns_agenda_query_for_summary(self):
+        # Act
+        actual = parse_fast_path_request(["agenda", "--summary", "--user-id", "42"])
+
+        # Assert
+        expected = {"query": "agenda", "person_id": 42, "summary": True, "json": False}
+        assert expected == actual
+
+    def test_it_leaves_the_agenda_table_to_the_cli(self):
+        # Act
+        actual = parse_fast_path_request(["agenda", "--user-id", "42"])
+
+        # Assert
+        expected = None
+        assert expected == actual
+
+    def test_it_returns_none_without_cached(self):
+        # Act
+        actual = parse_fast_path_request(["get-todos-for-user", "--json"])
+
+        # Assert
+        expected = None
+        assert expected == actual
+
+    def test_it_returns_none_for_table_output(self):
+        # Act
+        actual = parse_fast_path_request(["get-current-todo"])
+
+        # Assert
+        expected = None
+        assert expected == actual
+
+    def test_it_returns_none_for_unknown_options(self):
+        # Act
+        actual = parse_fast_path_request(
+            ["get-todos-for-user", "--cached", "--json", "--pager"]
+        )
+
+        # Assert
+        expected = None
+        assert expected == actual
+
+
+class TestParseCompletionRequest:
+    def test_it_reads_click_bash_environment(self):
+        # Arrange
+        environ = {
+            "_TENZING_COMPLETE": "bash_complete",
+            "COMP_WORDS": "tenzing list-todo-items 1 ",
+            "COMP_CWORD": "3",
+        }
+
+        # Act
+        actual = parse_completion_request(environ)
+
+        # Assert
+        expected = ("bash", ["list-todo-items", "1"], "")
+        assert expected == actual
+
+    def test_it_ignores_source_requests(self):
+        # Act
+        actual = parse_completion_request({"_TENZING_COMPLETE": "bash_source"})
+
+        # Assert
+        expected = None
+        assert expected == actual
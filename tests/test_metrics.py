@@ -0,0 +1,73 @@
+from tenzing.metrics import Metrics, cache_hit_ratio, percentile
+
+
+class TestMetrics:
+    def test_incr_adds_to_counter(self):
+        # Arrange
+        metrics = Metrics()
+
+        # Act
+        metrics.incr("http_requests")
+        metrics.incr("http_requests", 2)
+        actual = metrics.snapshot()["http_requests"]
+
+        # Assert
+        expected = 3
+        assert expected == actual
+
+    def test_reset_zeroes_counters(self):
+        # Arrange
+        metrics = Metrics()
+        metrics.incr("rows_upserted", 10)
+
+        # Act
+        metrics.reset()
+        actual = metrics.snapshot()["rows_upserted"]
+
+        # Assert
+        expected = 0
+        assert expected == actual
+
+
+class TestCacheHitRatio:
+    def test_it_returns_share_of_cached_requests(self):
+        # Act
+        actual = cache_hit_ratio(http_requests=4, cache_hits=1)
+
+        # Assert
+        expected = 0.25
+        assert expected == actual
+
+    def test_it_returns_none_without_requests(self):
+        # Act
+        actual = cache_hit_ratio(http_requests=0, cache_hits=0)
+
+        # Assert
+        expected = None
+        assert expected == actual
+
+
+class TestPercentile:
+    def test_it_interpolates_between_ranks(self):
+        # Act
+        actual = percentile([1, 2, 3, 4], 50)
+
+        # Assert
+        expected = 2.5
+        assert expected == actual
+
+    def test_it_returns_max_for_100(self):
+        # Act
+        actual = percentile([3, 1, 2], 100)
+
+        # Assert
+        expected = 3
+        assert expected == actual
+
+    def test_it_returns_none_for_empty_list(self):
+        # Act
+        actual = percentile([], 90)
+
+        # Assert
+        expected = None
+        assert expected == actual
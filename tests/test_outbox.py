@@ -0,0 +1,172 @@
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from tenzing.basecamp_api import TodoCreationUnknown, TodoNotCreated
+from tenzing.outbox import create_with_retries, flush_outbox, provisional_todo
+
+
+class TestProvisionalTodo:
+    def test_it_uses_the_local_id_and_payload(self):
+        # Arrange
+        payload = {
+            "project_id": 1,
+            "todolist_id": 50,
+            "title": "Write docs",
+            "body": "<p>soon</p>",
+            "assignee_id": "7",
+        }
+
+        # Act
+        todo = provisional_todo(-3, payload)
+        actual = (todo.id, todo.parent_id, todo.title, todo.assignee_ids)
+
+        # Assert
+        expected = (-3, 50, "Write docs", ["7"])
+        assert expected == actual
+
+
+class TestCreateWithRetries:
+    payload = {
+        "project_id": 1,
+        "todolist_id": 50,
+        "title": "Write docs",
+        "body": "",
+        "assignee_id": "7",
+    }
+
+    def test_it_retries_until_the_todo_is_created(self):
+        # Arrange
+        api = Mock()
+        api.create_todo.side_effect = [TodoNotCreated("429"), {"id": 99}]
+
+        # Act
+        actual = create_with_retries(api, self.payload, attempts=3, backoff=0)
+
+        # Assert
+        expected = {"id": 99}
+        assert expected == actual
+
+    def test_it_raises_after_the_last_attempt(self):
+        # Arrange
+        api = Mock()
+        api.create_todo.side_effect = TodoNotCreated("503")
+
+        # Act / Assert
+        with pytest.raises(TodoNotCreated):
+            create_with_retries(api, self.payload, attempts=2, backoff=0)
+        assert 2 == api.create_todo.call_count
+
+    def test_it_does_not_retry_when_the_todo_may_have_been_created(self):
+        # Arrange
+        api = Mock()
+        api.create_todo.side_effect = TodoCreationUnknown("Read timed out")
+
+        # Act / Assert
+        with pytest.raises(TodoCreationUnknown):
+            create_with_retries(api, self.payload, attempts=3, backoff=0)
+        assert 1 == api.create_todo.call_count
+
+    def test_it_passes_the_cached_todos_url(self):
+        # Arrange
+        api = Mock()
+        api.create_todo.return_value = {"id": 99}
+        payload = dict(self.payload, todos_url="https://example.com/todos.json")
+
+        # Act
+        create_with_retries(api, payload, attempts=1, backoff=0)
+        actual = api.create_todo.call_args.kwargs["todos_url"]
+
+        # Assert
+        expected = "https://example.com/todos.json"
+        assert expected == actual
+
+
+class TestFlushOutbox:
+    payload = TestCreateWithRetries.payload
+
+    def entries(self, created=(), pending=()):
+        return lambda statuses: {"created": list(created), "pending": list(pending)}[
+            statuses[0]
+        ]
+
+    @patch("tenzing.outbox.TodoItemView")
+    @patch("tenzing.outbox.record_outbox_failure")
+    @patch("tenzing.outbox.record_outbox_creation")
+    @patch("tenzing.outbox.reconcile_outbox_entries")
+    @patch("tenzing.outbox.claim_outbox_entry", Mock(return_value=True))
+    @patch("tenzing.outbox.get_outbox_entries")
+    @patch("tenzing.outbox.expire_outbox_claims", Mock())
+    def test_it_records_the_creation_before_reconciling(
+        self,
+        get_outbox_entries,
+        reconcile_outbox_entries,
+        record_outbox_creation,
+        record_outbox_failure,
+        TodoItemView,
+    ):
+        # Arrange
+        entry = SimpleNamespace(id=1, local_id=-1, payload=self.payload, remote_id=None)
+        get_outbox_entries.side_effect = self.entries(pending=[entry])
+        api = Mock()
+        api.create_todo.return_value = {"id": 99}
+        TodoItemView.from_api_data.return_value = SimpleNamespace(id=99)
+        reconcile_outbox_entries.side_effect = RuntimeError("database is locked")
+
+        # Act
+        flush_outbox(api)
+        actual = (
+            record_outbox_creation.call_args.args,
+            record_outbox_failure.call_args.args[0],
+        )
+
+        # Assert
+        expected = ((1, 99), 1)
+        assert expected == actual
+
+    @patch("tenzing.outbox.TodoItemView")
+    @patch("tenzing.outbox.record_outbox_creation")
+    @patch("tenzing.outbox.reconcile_outbox_entries")
+    @patch("tenzing.outbox.get_outbox_entries")
+    @patch("tenzing.outbox.expire_outbox_claims", Mock())
+    def test_it_fetches_created_entries_instead_of_sending_them_again(
+        self, get_outbox_entries, reconcile_outbox_entries, record_outbox_creation, _
+    ):
+        # Arrange
+        entry = SimpleNamespace(id=1, local_id=-1, payload=self.payload, remote_id=99)
+        get_outbox_entries.side_effect = self.entries(created=[entry])
+        api = Mock()
+
+        # Act
+        flush_outbox(api)
+        actual = api.get_raw_todo.call_args.args
+
+        # Assert
+        expected = (1, 99)
+        assert expected == actual
+        assert not api.create_todo.called
+        assert not record_outbox_creation.called
+        assert reconcile_outbox_entries.called
+
+    @patch("tenzing.outbox.record_outbox_failure")
+    @patch("tenzing.outbox.claim_outbox_entry", Mock(return_value=True))
+    @patch("tenzing.outbox.get_outbox_entries")
+    @patch("tenzing.outbox.expire_outbox_claims", Mock())
+    def test_it_fails_entries_that_may_have_been_created(
+        self, get_outbox_entries, record_outbox_failure
+    ):
+        # Arrange
+        entry = SimpleNamespace(id=1, local_id=-1, payload=self.payload, remote_id=None)
+        get_outbox_entries.side_effect = self.entries(pending=[entry])
+        api = Mock()
+        api.create_todo.side_effect = TodoCreationUnknown("Read timed out")
+
+        # Act
+        flush_outbox(api)
+        actual = record_outbox_failure.call_args.kwargs["retry"]
+
+        # Assert
+        expected = False
+        assert expected == actual
+        assert 1 == api.create_todo.call_count
@@ -0,0 +1,116 @@
+import threading
+from unittest.mock import Mock
+
+import pytest
+from basecampy3.exc import Basecamp3Error
+
+from tenzing.pagination import fetch_pages, install_prefetch, prefetch
+
+
+def page_response(items, next_url=None, ok=True):
+    response = Mock(ok=ok)
+    response.headers = {"Link": f'<{next_url}>; rel="next"'} if next_url else {}
+    response.json.return_value = items
+    return response
+
+
+class TestFetchPages:
+    def test_it_follows_link_headers(self):
+        # Arrange
+        session = Mock()
+        session.request.side_effect = [
+            page_response([1, 2], "https://example.com/todos.json?page=2"),
+            page_response([3]),
+        ]
+
+        # Act
+        actual = (
+            list(fetch_pages(session, {"method": "GET", "url": "https://example.com/todos.json"})),
+            session.request.call_args.kwargs["url"],
+        )
+
+        # Assert
+        expected = ([[1, 2], [3]], "https://example.com/todos.json?page=2")
+        assert expected == actual
+
+    def test_it_raises_basecamp3_error_for_failed_pages(self):
+        # Arrange
+        session = Mock()
+        session.request.return_value = page_response([], ok=False)
+
+        # Act / Assert
+        with pytest.raises(Basecamp3Error):
+            list(fetch_pages(session, {"method": "GET", "url": "https://example.com"}))
+
+
+class TestPrefetch:
+    def test_it_keeps_the_order(self):
+        # Act
+        actual = list(prefetch(iter(range(20)), depth=3))
+
+        # Assert
+        expected = list(range(20))
+        assert expected == actual
+
+    def test_it_fetches_the_next_page_while_the_current_one_is_processed(self):
+        # Arrange
+        second_page_fetched = threading.Event()
+
+        def pages():
+            yield "page 1"
+            second_page_fetched.set()
+            yield "page 2"
+
+        # Act
+        iterator = prefetch(pages(), depth=1)
+        next(iterator)
+        actual = second_page_fetched.wait(timeout=2)
+        iterator.close()
+
+        # Assert
+        expected = True
+        assert expected == actual
+
+    def test_it_raises_producer_errors_in_order(self):
+        # Arrange
+        def pages():
+            yield 1
+            raise RuntimeError("page 2 failed")
+
+        iterator = prefetch(pages(), depth=2)
+
+        # Act
+        first = next(iterator)
+
+        # Assert
+        expected = 1
+        assert expected == first
+        with pytest.raises(RuntimeError):
+            next(iterator)
+
+    def test_it_passes_through_with_depth_zero(self):
+        # Arrange
+        items = iter([1, 2])
+
+        # Act
+        actual = list(prefetch(items, depth=0))
+
+        # Assert
+        expected = [1, 2]
+        assert expected == actual
+
+
+class TestInstallPrefetch:
+    def test_it_wraps_items_in_the_endpoint_object_class(self):
+        # Arrange
+        endpoint = Mock()
+        endpoint.OBJECT_CLASS = lambda item, endpoint: ("object", item)
+        endpoint._api._session.request.return_value = page_response([{"id": 1}])
+
+        # Act
+        install_prefetch(endpoint, depth=2)
+        actual = list(endpoint._paginated_generator({"method": "GET", "url": "https://x"}))
+
+        # Assert
+        expected = [("object", {"id": 1})]
+        assert expected == actual
@@ -0,0 +1,400 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from tenzing import db
+from tenzing.db import TodoList, get_current_todo, insert_current_todo, json_field
+
+from tenzing.config import Config
+from tenzing.freshness import TODOS_FOR_USER_KEY
+from tenzing.outbox import MAX_ATTEMPTS, provisional_todo, queue_todo_creation
+from tenzing.persist import (
+    claim_outbox_entry,
+    discard_outbox_entries,
+    explain_query,
+    fully_refresh_db,
+    get_outbox_entries,
+    get_todo_from_db,
+    iter_changes_from_db,
+    iter_query_results,
+    record_outbox_failure,
+    refresh_assignments,
+    refreshed_sync_keys,
+    retry_outbox_entries,
+    save_to_db,
+)
+from tenzing.query import compile_query, parse_filter
+
+STARTED_AT = datetime(2024, 5, 1, 9, 0)
+
+
+@contextmanager
+def temporary_db():
+    """Point tenzing.db at an empty database file for the duration."""
+    path = os.path.join(tempfile.mkdtemp(), "tenzing.db")
+    engine = create_engine(f"sqlite:///{path}")
+    with (
+        patch.object(db, "engine", engine),
+        patch.object(db, "Session", sessionmaker(bind=engine)),
+        patch.object(db, "_indexes_checked", False),
+    ):
+        yield
+    engine.dispose()
+
+
+class TestFullyRefreshDb:
+    def make_api(self):
+        api = Mock()
+        api.get_raw_projects.return_value = [SimpleNamespace(id=1), SimpleNamespace(id=2)]
+        api.get_raw_project.side_effect = lambda id: SimpleNamespace(id=int(id))
+        # Higher IDs were updated more recently
+        api.get_raw_todolists_for_project.side_effect = lambda project: [
+            SimpleNamespace(id=project.id * 100 + n, updated_at=datetime(2024, 4, n + 1))
+            for n in range(2)
+        ]
+        api.get_todo_items_for_todo_list.return_value = []
+        api.get_assigned_todos.return_value = []
+        return api
+
+    def todolist_view(self, TodoListView):
+        TodoListView.from_api_data.side_effect = lambda raw: SimpleNamespace(
+            id=raw.id, updated_at=raw.updated_at
+        )
+
+    @patch("tenzing.persist.get_open_todo_urls_for_user", Mock(return_value={}))
+    @patch("tenzing.persist.TodoListView")
+    @patch("tenzing.persist.ProjectView")
+    @patch("tenzing.persist.finish_refresh_run")
+    @patch("tenzing.persist.save_sync_state")
+    @patch("tenzing.persist.save_to_db")
+    @patch("tenzing.persist.start_refresh_run")
+    @patch("tenzing.persist.read_config")
+    def test_it_skips_containers_a_resumed_run_already_saved(
+        self, read_config, start_refresh_run, save_to_db, _, __, ___, TodoListView
+    ):
+        # Arrange
+        read_config.return_value = Config(project_ids=["1", "2"], user_id="7")
+        start_refresh_run.return_value = (
+            STARTED_AT,
+            {"assignments", "users", "projects", "project:1", "todolist:200"},
+        )
+        api = self.make_api()
+        self.todolist_view(TodoListView)
+
+        # Act
+        fully_refresh_db(api, resume=True)
+        actual = (
+            api.get_users.called,
+            [call.args[0].id for call in api.get_raw_todolists_for_project.call_args_list],
+            [call.args[0].id for call in api.get_todo_items_for_todo_list.call_args_list],
+            [
+                call.kwargs["checkpoint"][0]
+                for call in save_to_db.call_args_list
+                if call.kwargs.get("checkpoint")
+            ],
+        )
+
+        # Assert
+        expected = (False, [2], [201], ["todolist:201", "project:2"])
+        assert not api.get_assigned_todos.called
+        assert expected == actual
+
+    @patch("tenzing.persist.get_open_todo_urls_for_user", Mock(return_value={}))
+    @patch("tenzing.persist.TodoListView")
+    @patch("tenzing.persist.ProjectView")
+    @patch("tenzing.persist.finish_refresh_run")
+    @patch("tenzing.persist.save_sync_state")
+    @patch("tenzing.persist.save_to_db")
+    @patch("tenzing.persist.start_refresh_run")
+    @patch("tenzing.persist.read_config")
+    def test_it_only_fetches_todos_of_configured_projects(
+        self,
+        read_config,
+        start_refresh_run,
+        save_to_db,
+        save_sync_state,
+        finish_refresh_run,
+        _,
+        TodoListView,
+    ):
+        # Arrange
+        read_config.return_value = Config(project_ids=["2"], user_id="7")
+        start_refresh_run.return_value = (STARTED_AT, set())
+        api = self.make_api()
+        self.todolist_view(TodoListView)
+
+        # Act
+        fully_refresh_db(api)
+        actual = (
+            [call.args[0].id for call in api.get_todo_items_for_todo_list.call_args_list],
+            finish_refresh_run.call_args.args,
+        )
+
+        # Assert
+        expected = ([201, 200], (STARTED_AT,))
+        assert expected == actual
+
+    @patch("tenzing.persist.TodoItemView")
+    @patch("tenzing.persist.get_open_todo_urls_for_user")
+    @patch("tenzing.persist.TodoListView")
+    @patch("tenzing.persist.ProjectView")
+    @patch("tenzing.persist.finish_refresh_run")
+    @patch("tenzing.persist.save_sync_state")
+    @patch("tenzing.persist.save_to_db")
+    @patch("tenzing.persist.start_refresh_run")
+    @patch("tenzing.persist.read_config")
+    def test_it_commits_the_users_assignments_first(
+        self,
+        read_config,
+        start_refresh_run,
+        save_to_db,
+        save_sync_state,
+        finish_refresh_run,
+        _,
+        TodoListView,
+        get_open_todo_urls_for_user,
+        TodoItemView,
+    ):
+        # Arrange
+        read_config.return_value = Config(project_ids=["2"], user_id="7")
+        start_refresh_run.return_value = (STARTED_AT, set())
+        api = self.make_api()
+        self.todolist_view(TodoListView)
+        assigned = SimpleNamespace(id=11, bucket={"id": 2})
+        untracked = SimpleNamespace(id=12, bucket={"id": 3})
+        api.get_assigned_todos.return_value = [assigned, untracked]
+        get_open_todo_urls_for_user.return_value = {11: "/11.json", 13: "/13.json"}
+        TodoItemView.from_api_data.side_effect = lambda raw: raw
+
+        # Act
+        fully_refresh_db(api)
+        first_save = save_to_db.call_args_list[0]
+        actual = (
+            first_save.args[0],
+            first_save.kwargs["checkpoint"],
+            [call.args for call in api.get_raw_recording.call_args_list],
+            save_sync_state.call_args_list[0].args[0],
+        )
+
+        # Assert
+        expected = (
+            [assigned, api.get_raw_recording.return_value],
+            ("assignments", STARTED_AT),
+            [("/13.json", "Todo")],
+            TODOS_FOR_USER_KEY,
+        )
+        assert expected == actual
+
+
+class TestRefreshedSyncKeys:
+    def test_it_only_covers_the_projects_in_scope(self):
+        # Arrange
+        config = Config(project_ids=["2"], user_id="7")
+        projects = [SimpleNamespace(id=1, name="Other"), SimpleNamespace(id=2, name="Ours")]
+
+        # Act
+        actual = refreshed_sync_keys(config, projects, everything=False)
+
+        # Assert
+        expected = ["project:2"]
+        assert expected == actual
+
+    def test_it_covers_the_todolists_of_every_project_with_everything(self):
+        # Arrange
+        config = Config(project_ids=["2"], user_id="7")
+        projects = [SimpleNamespace(id=1, name="Other"), SimpleNamespace(id=2, name="Ours")]
+
+        # Act
+        actual = refreshed_sync_keys(config, projects, everything=True)
+
+        # Assert
+        expected = ["project:2", "projects", "users", "todolists:1", "todolists:2"]
+        assert expected == actual
+
+    def test_it_covers_all_when_every_project_is_in_scope(self):
+        # Arrange
+        config = Config(project_ids=["1", "2"], user_id="7")
+        projects = [SimpleNamespace(id=1, name="Other"), SimpleNamespace(id=2, name="Ours")]
+
+        # Act
+        actual = refreshed_sync_keys(config, projects, everything=True)
+
+        # Assert
+        expected = ["all"]
+        assert expected == actual
+
+
+class TestRefreshAssignments:
+    def test_it_does_not_fetch_todos_still_queued_in_the_outbox(self):
+        # Arrange
+        api = Mock()
+        api.get_assigned_todos.return_value = []
+        config = Config(project_ids=["2"], user_id="7")
+
+        with temporary_db():
+            queue_todo_creation(2, 200, "Queued", "", "7")
+
+            # Act
+            refresh_assignments(api, config, STARTED_AT, set())
+
+        # Assert
+        assert not api.get_raw_recording.called
+
+
+class TestExplainQuery:
+    def plan(self, statement) -> str:
+        with temporary_db():
+            _, _, plan = explain_query(statement)
+        return "\n".join(plan)
+
+    def test_it_finds_todos_by_project_through_the_expression_index(self):
+        # Act
+        actual = self.plan(compile_query(parse_filter("project:1"), today=STARTED_AT.date()))
+
+        # Assert
+        assert "USING INDEX ix_todoitems_project_id" in actual
+
+    def test_it_finds_todolists_by_project_through_the_expression_index(self):
+        # Act
+        actual = self.plan(select(TodoList).where(json_field(TodoList.bucket, "$.id") == 1))
+
+        # Assert
+        assert "USING INDEX ix_todolists_project_id" in actual
+
+    def test_it_finds_todos_by_status_through_the_status_index(self):
+        # Act
+        actual = self.plan(compile_query(parse_filter("status:Active"), today=STARTED_AT.date()))
+
+        # Assert
+        assert "USING INDEX ix_todoitems_status" in actual
+
+
+class TestIterQueryResults:
+    def ids(self, expression: str) -> list[int]:
+        payload = {"project_id": 1, "todolist_id": 50, "body": "", "assignee_id": None}
+        todos = [
+            provisional_todo(1, {**payload, "title": "50% done"}).model_copy(
+                update={"assignees": [{"id": 7, "name": "Jane"}]}
+            ),
+            provisional_todo(2, {**payload, "title": "500 tasks"}).model_copy(
+                update={"assignees": [{"id": 8, "name": "Bob"}]}
+            ),
+        ]
+        with temporary_db():
+            save_to_db(todos)
+            statement = compile_query(parse_filter(expression), today=STARTED_AT.date())
+            return [todo.id for todo in iter_query_results(statement)]
+
+    def test_it_matches_percent_and_underscore_literally(self):
+        # Act
+        actual = (self.ids("title~50%"), self.ids("title~5_0"))
+
+        # Assert
+        expected = ([1], [])
+        assert expected == actual
+
+    def test_it_matches_assignees_by_name_only(self):
+        # Act
+        actual = (self.ids("assignee:jane"), self.ids("assignee:name"))
+
+        # Assert
+        expected = ([1], [])
+        assert expected == actual
+
+
+class TestSaveToDb:
+    @patch("tenzing.persist.get_session")
+    def test_it_raises_when_a_checkpointed_batch_cannot_be_saved(self, get_session):
+        # Arrange
+        session = get_session.return_value
+        session.commit.side_effect = RuntimeError("database is locked")
+
+        # Act / Assert
+        with pytest.raises(RuntimeError):
+            save_to_db([], checkpoint=("todolist:200", STARTED_AT))
+        assert session.rollback.called
+
+
+class TestIterChangesFromDb:
+    def test_it_finds_changes_by_when_they_were_recorded(self):
+        # Arrange
+        payload = {"project_id": 1, "todolist_id": 50, "title": "Invoice", "body": ""}
+        todo = provisional_todo(5, payload).model_copy(
+            update={"status": "active", "updated_at": datetime(2024, 5, 1, 9, 0)}
+        )
+
+        with temporary_db():
+            save_to_db([todo])
+            # Like bulk-edit, which keeps the todo's old updated_at
+            save_to_db([todo.model_copy(update={"completed": True})])
+
+            # Act
+            changes = list(iter_changes_from_db(datetime.now() - timedelta(minutes=1)))
+            actual = [(change.record_id, change.field, change.new_value) for change in changes]
+
+        # Assert
+        expected = [(5, "completed", True)]
+        assert expected == actual
+
+
+class TestDiscardOutboxEntries:
+    def test_it_deletes_the_provisional_todo_of_a_failed_entry(self):
+        # Arrange
+        with temporary_db():
+            todo = queue_todo_creation(2, 200, "Queued", "", "7")
+            entry_id = -todo.id
+            insert_current_todo(todo.id)
+            record_outbox_failure(entry_id, "Timed out", MAX_ATTEMPTS, retry=False)
+
+            # Act
+            discarded = discard_outbox_entries([entry_id])
+            actual = (
+                discarded,
+                get_todo_from_db(todo.id),
+                get_current_todo(),
+                [entry.status for entry in get_outbox_entries()],
+            )
+
+        # Assert
+        expected = ([entry_id], None, None, ["discarded"])
+        assert expected == actual
+
+    def test_it_leaves_entries_that_have_not_failed_alone(self):
+        # Arrange
+        with temporary_db():
+            todo = queue_todo_creation(2, 200, "Queued", "", "7")
+
+            # Act
+            discarded = discard_outbox_entries([-todo.id])
+            actual = (discarded, get_todo_from_db(todo.id).title)
+
+        # Assert
+        expected = ([], "Queued")
+        assert expected == actual
+
+
+class TestRetryOutboxEntries:
+    def test_it_queues_a_failed_entry_with_fresh_attempts(self):
+        # Arrange
+        with temporary_db():
+            todo = queue_todo_creation(2, 200, "Queued", "", "7")
+            entry_id = -todo.id
+            claim_outbox_entry(entry_id)
+            record_outbox_failure(entry_id, "Timed out", MAX_ATTEMPTS, retry=False)
+
+            # Act
+            retried = retry_outbox_entries([entry_id])
+            entry = get_outbox_entries()[0]
+            actual = (retried, entry.status, entry.attempts)
+
+        # Assert
+        expected = ([entry_id], "pending", 0)
+        assert expected == actual
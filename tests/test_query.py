@@ -0,0 +1,135 @@
+from datetime import date
+
+import pytest
+
+from tenzing.query import (
+    FilterSyntaxError,
+    Term,
+    TodoQuery,
+    compile_query,
+    parse_filter,
+    resolve_date,
+)
+
+TODAY = date(2024, 5, 1)
+
+
+def compiled_params(statement) -> dict:
+    return statement.compile().params
+
+
+class TestParseFilter:
+    def test_it_parses_terms_negation_and_sort(self):
+        # Act
+        actual = parse_filter('due<=+7d -status:trashed project:"Website Redesign" sort:-updated')
+
+        # Assert
+        expected = TodoQuery(
+            terms=[
+                Term("due", "<=", ["+7d"]),
+                Term("status", ":", ["trashed"], True),
+                Term("project", ":", ["Website Redesign"]),
+            ],
+            sort=["-updated"],
+        )
+        assert expected == actual
+
+    def test_it_matches_bare_words_against_titles(self):
+        # Act
+        actual = parse_filter("invoice -draft status:active,archived")
+
+        # Assert
+        expected = [
+            Term("title", "~", ["invoice"]),
+            Term("title", "~", ["draft"], True),
+            Term("status", ":", ["active", "archived"]),
+        ]
+        assert expected == actual.terms
+
+    def test_it_rejects_unknown_fields_and_sort_keys(self):
+        # Act / Assert
+        with pytest.raises(FilterSyntaxError):
+            parse_filter("colour:red")
+        with pytest.raises(FilterSyntaxError):
+            parse_filter("sort:colour")
+        with pytest.raises(FilterSyntaxError):
+            parse_filter('title:"unterminated')
+
+
+class TestResolveDate:
+    def test_it_resolves_named_relative_and_absolute_dates(self):
+        # Act
+        actual = [
+            resolve_date(value, TODAY)
+            for value in ("today", "tomorrow", "-30d", "+2w", "2024-06-01")
+        ]
+
+        # Assert
+        expected = [
+            date(2024, 5, 1),
+            date(2024, 5, 2),
+            date(2024, 4, 1),
+            date(2024, 5, 15),
+            date(2024, 6, 1),
+        ]
+        assert expected == actual
+
+    def test_it_rejects_invalid_dates(self):
+        # Act / Assert
+        with pytest.raises(FilterSyntaxError):
+            resolve_date("next tuesday", TODAY)
+
+
+class TestCompileQuery:
+    def test_it_binds_values_as_parameters(self):
+        # Act
+        statement = compile_query(
+            parse_filter("due<=+7d title:\"x' OR 1=1 --\""), today=TODAY
+        )
+
+        # Assert
+        sql = str(statement)
+        assert "OR 1=1" not in sql
+        assert date(2024, 5, 8) in compiled_params(statement).values()
+        assert "x' or 1=1 --" in compiled_params(statement).values()
+
+    def test_it_only_joins_when_matching_names(self):
+        # Act
+        by_id = str(compile_query(parse_filter("project:1 list:2"), today=TODAY))
+        by_name = str(compile_query(parse_filter("project:Website"), today=TODAY))
+
+        # Assert
+        assert "JOIN" not in by_id
+        assert "JOIN projects" in by_name
+        assert "todolists" not in by_name
+
+    def test_it_sorts_by_due_date_by_default(self):
+        # Act
+        default = str(compile_query(parse_filter(""), today=TODAY))
+        sorted_ = str(compile_query(parse_filter("sort:-updated"), today=TODAY))
+
+        # Assert
+        assert "ORDER BY todoitems.due_on ASC NULLS LAST, todoitems.id" in default
+        assert "ORDER BY todoitems.updated_at DESC NULLS LAST, todoitems.id" in sorted_
+
+    def test_it_needs_user_id_for_me(self):
+        # Act / Assert
+        with pytest.raises(FilterSyntaxError):
+            compile_query(parse_filter("assignee:me"), today=TODAY)
+
+    def test_it_rejects_values_that_dont_fit_the_field(self):
+        # Act / Assert
+        with pytest.raises(FilterSyntaxError):
+            compile_query(parse_filter("id~12"), today=TODAY)
+        with pytest.raises(FilterSyntaxError):
+            compile_query(parse_filter("comments:many"), today=TODAY)
+
+    def test_it_matches_comments_through_the_full_text_index(self):
+        # Act
+        statement = compile_query(parse_filter('comment:"inv* (draft)"'), today=TODAY)
+
+        # Assert
+        assert "comments_fts MATCH" in str(statement)
+        assert '"inv"* "(draft)"' in compiled_params(statement).values()
+        with pytest.raises(FilterSyntaxError):
+            compile_query(parse_filter("comment<draft"), today=TODAY)
@@ -0,0 +1,54 @@
+import json
+
+from tenzing.render import chunked, paginate, stream_json
+
+
+class TestPaginate:
+    def test_it_applies_offset_and_limit(self):
+        # Act
+        actual = list(paginate(range(10), limit=3, offset=2))
+
+        # Assert
+        expected = [2, 3, 4]
+        assert expected == actual
+
+    def test_it_returns_everything_after_offset_without_limit(self):
+        # Act
+        actual = list(paginate(range(5), offset=3))
+
+        # Assert
+        expected = [3, 4]
+        assert expected == actual
+
+
+class TestChunked:
+    def test_it_yields_lists_of_at_most_size_items(self):
+        # Act
+        actual = list(chunked(range(5), 2))
+
+        # Assert
+        expected = [[0, 1], [2, 3], [4]]
+        assert expected == actual
+
+
+class TestStreamJson:
+    def test_it_writes_the_same_output_as_json_dumps(self, capsys):
+        # Arrange
+        items = [{"id": 1, "tags": ["a"]}, {"id": 2, "tags": []}]
+
+        # Act
+        stream_json(iter(items))
+        actual = capsys.readouterr().out
+
+        # Assert
+        expected = json.dumps(items, indent=2) + "\n"
+        assert expected == actual
+
+    def test_it_writes_an_empty_array_for_no_items(self, capsys):
+        # Act
+        stream_json(iter([]))
+        actual = capsys.readouterr().out
+
+        # Assert
+        expected = json.dumps([], indent=2) + "\n"
+        assert expected == actual
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from tenzing.config import Config
+from tenzing.scope import (
+    explicit_project_ids,
+    get_raw_projects_in_scope,
+    in_scope,
+    scoped_project_ids,
+)
+
+
+def make_config(include=(), exclude=(), project_ids=("1",)):
+    return Config(
+        project_ids=list(project_ids),
+        user_id="7",
+        scope={"include": list(include), "exclude": list(exclude)},
+    )
+
+
+PROJECTS = [
+    SimpleNamespace(id=1, name="Alpha"),
+    SimpleNamespace(id=2, name="Client: Acme"),
+    SimpleNamespace(id=3, name="Client: Old (archive)"),
+    SimpleNamespace(id=4, name="Internal"),
+]
+
+
+class TestInScope:
+    def test_it_matches_ids_and_name_globs_ignoring_case(self):
+        # Arrange
+        config = make_config(include=["client: *", "4"], exclude=["* (ARCHIVE)"])
+
+        # Act
+        actual = [in_scope(config, project.id, project.name) for project in PROJECTS]
+
+        # Assert
+        expected = [True, True, False, True]
+        assert expected == actual
+
+    def test_it_never_excludes_configured_projects(self):
+        # Arrange
+        config = make_config(exclude=["*"])
+
+        # Act / Assert
+        assert in_scope(config, 1, "Alpha")
+        assert not in_scope(config, 2, "Client: Acme")
+
+
+class TestScopedProjectIds:
+    def test_it_lists_configured_then_included_projects(self):
+        # Arrange
+        config = make_config(include=["4", "Client: *", "1"], exclude=["*archive*"])
+
+        # Act
+        actual = (explicit_project_ids(config), scoped_project_ids(config, PROJECTS))
+
+        # Assert
+        expected = (["1", "4"], ["1", "4", "2"])
+        assert expected == actual
+
+
+class TestGetRawProjectsInScope:
+    def test_it_fetches_by_id_without_globs(self):
+        # Arrange
+        api = Mock()
+        api.get_raw_project.side_effect = lambda id: SimpleNamespace(id=int(id))
+        config = make_config(include=["4"])
+
+        # Act
+        actual = [project.id for project in get_raw_projects_in_scope(api, config)]
+
+        # Assert
+        assert [1, 4] == actual
+        assert not api.get_raw_projects.called
+
+    def test_it_lists_projects_to_match_globs(self):
+        # Arrange
+        api = Mock()
+        api.get_raw_projects.return_value = PROJECTS[1:]
+        api.get_raw_project.return_value = PROJECTS[0]
+        config = make_config(include=["Client: *"], exclude=["*(archive)"])
+
+        # Act
+        actual = [project.id for project in get_raw_projects_in_scope(api, config)]
+
+        # Assert
+        assert [2, 1] == actual
@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+from tenzing.server import QueryIndex, query_server
+
+
+class TestQueryServer:
+    def test_it_returns_none_when_no_server_is_running(self):
+        # Arrange
+        path = os.path.join(tempfile.mkdtemp(), "tenzing.sock")
+
+        # Act
+        actual = query_server({"query": "current_todo"}, path=path)
+
+        # Assert
+        expected = None
+        assert expected == actual
+
+
+class TestQueryIndex:
+    def test_answer_filters_and_pages_todos_for_user(self):
+        # Arrange
+        index = QueryIndex(db_path=os.path.join(tempfile.mkdtemp(), "tenzing.db"))
+        index._version = index._db_version()
+        index.todos_for_user = [
+            {"id": 1, "completed": False, "status": "active"},
+            {"id": 2, "completed": True, "status": "active"},
+            {"id": 3, "completed": False, "status": "trashed"},
+            {"id": 4, "completed": False, "status": "active"},
+        ]
+
+        # Act
+        result = index.answer(
+            {"query": "todos_for_user", "active_only": True, "limit": 1, "offset": 1}
+        )
+        actual = [todo["id"] for todo in result["todos"]]
+
+        # Assert
+        expected = [4]
+        assert expected == actual
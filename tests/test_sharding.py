@@ -0,0 +1,85 @@
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from tenzing import sharding
+from tenzing.config import Config
+from tenzing.sharding import Shard, fetch_shard, refresh_sharded
+
+STARTED_AT = datetime(2024, 5, 1, 9, 0)
+
+
+class Values(SimpleNamespace):
+    def __init__(self, values, endpoint):
+        super().__init__(**values)
+
+
+class TestFetchShard:
+    def make_api(self):
+        api = Mock()
+        api.bc3.projects.OBJECT_CLASS = Values
+        # Higher IDs were updated more recently
+        api.get_raw_todolists_for_project.return_value = [
+            SimpleNamespace(id=100 + n, updated_at=datetime(2024, 4, n + 1))
+            for n in range(3)
+        ]
+        api.get_todo_items_for_todo_list.side_effect = lambda todolist: [todolist.id]
+        return api
+
+    @patch("tenzing.sharding.TodoListView")
+    def test_it_sends_a_tracked_projects_todos_most_recent_list_first(self, TodoListView):
+        # Arrange
+        TodoListView.from_api_data.side_effect = lambda raw: raw
+        batches = Mock()
+        with patch.object(sharding, "_api", self.make_api()), patch.object(
+            sharding, "_batches", batches
+        ):
+            # Act
+            fetch_shard(Shard({"id": 1}, True, frozenset({"todolist:101"})))
+
+        # Assert
+        sent = [call.args[0] for call in batches.put.call_args_list]
+        actual = [(batch.items, batch.checkpoint) for batch in sent[1:]]
+        expected = [([102], "todolist:102"), ([100], "todolist:100"), ([], "project:1")]
+        assert expected == actual
+        assert sent[0].checkpoint is None
+        assert sent[-1].counters is not None
+
+    @patch("tenzing.sharding.TodoListView")
+    def test_it_sends_only_the_todolists_of_other_projects(self, TodoListView):
+        # Arrange
+        TodoListView.from_api_data.side_effect = lambda raw: raw.id
+        api = self.make_api()
+        batches = Mock()
+        with patch.object(sharding, "_api", api), patch.object(sharding, "_batches", batches):
+            # Act
+            fetch_shard(Shard({"id": 2}, False, frozenset()))
+
+        # Assert
+        [call] = batches.put.call_args_list
+        expected = ([100, 101, 102], "project:2")
+        assert expected == (call.args[0].items, call.args[0].checkpoint)
+        assert not api.get_todo_items_for_todo_list.called
+
+
+class TestRefreshSharded:
+    @patch("tenzing.sharding.crawl_shards")
+    @patch("tenzing.sharding.ProjectView")
+    @patch("tenzing.persist.save_to_db")
+    def test_it_doesnt_start_workers_when_every_project_is_done(
+        self, save_to_db, ProjectView, crawl_shards
+    ):
+        # Arrange
+        api = Mock()
+        api.get_raw_project.return_value = SimpleNamespace(id=1, name="Alpha", _values={})
+        config = Config(project_ids=["1"], user_id="7")
+
+        # Act
+        refresh_sharded(api, config, STARTED_AT, {"project:1"}, workers=4)
+
+        # Assert
+        actual = [call.kwargs.get("checkpoint") for call in save_to_db.call_args_list]
+        assert [None, ("users", STARTED_AT)] == actual
+        api.get_users_for_projects.assert_called_once_with(["1"])
+        assert not api.get_raw_projects.called
+        assert not crawl_shards.called
@@ -0,0 +1,98 @@
+import os
+import tempfile
+
+from tenzing.snapshot import (
+    WorkingSet,
+    answer_from_snapshot,
+    db_version,
+    open_snapshot,
+    write_snapshot,
+)
+
+
+def make_snapshot(working_set: WorkingSet) -> tuple[str, str]:
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "snapshot.bin")
+    db_path = os.path.join(directory, "tenzing.db")
+    with open(db_path, "w") as f:
+        f.write("db")
+    write_snapshot(working_set, db_version(db_path), path)
+    return path, db_path
+
+
+TODOS = [
+    {"id": 30, "title": "Write docs ✍", "completed": False, "status": "active"},
+    {"id": 10, "title": "Ship it", "completed": True, "status": "active"},
+    {"id": 20, "title": "Old", "completed": False, "status": "trashed"},
+    {"id": 40, "title": "Review", "completed": False, "status": "active"},
+]
+
+
+class TestAnswerFromSnapshot:
+    def test_it_filters_and_pages_todos_for_user_in_order(self):
+        # Arrange
+        path, db_path = make_snapshot(WorkingSet(TODOS, None, None, "2024-05-01T09:00:00"))
+
+        # Act
+        result = answer_from_snapshot(
+            {"query": "todos_for_user", "active_only": True, "limit": 5, "offset": 0},
+            path,
+            db_path,
+        )
+
+        # Assert
+        expected = {"todos": [TODOS[0], TODOS[3]], "last_synced_at": "2024-05-01T09:00:00"}
+        assert expected == result
+
+    def test_it_finds_a_current_todo_outside_the_users_todos(self):
+        # Arrange
+        current_todo = {"id": 25, "title": "Other", "completed": False, "status": "active"}
+        path, db_path = make_snapshot(WorkingSet(TODOS, 25, current_todo, None))
+
+        # Act
+        actual = answer_from_snapshot({"query": "current_todo"}, path, db_path)
+
+        # Assert
+        expected = {"todo_id": 25, "todo": current_todo, "last_synced_at": None}
+        assert expected == actual
+
+    def test_it_leaves_todos_for_user_alone_when_adding_the_current_todo(self):
+        # Arrange
+        current_todo = {"id": 25, "title": "Other", "completed": False, "status": "active"}
+        path, db_path = make_snapshot(WorkingSet(TODOS, 25, current_todo, None))
+
+        # Act
+        result = answer_from_snapshot({"query": "todos_for_user"}, path, db_path)
+        actual = [todo["id"] for todo in result["todos"]]
+
+        # Assert
+        expected = [30, 10, 20, 40]
+        assert expected == actual
+
+    def test_it_ignores_a_snapshot_older_than_the_database(self):
+        # Arrange
+        path, db_path = make_snapshot(WorkingSet(TODOS, 30, None, None))
+        with open(db_path, "a") as f:
+            f.write("written since")
+
+        # Act
+        actual = answer_from_snapshot({"query": "current_todo"}, path, db_path)
+
+        # Assert
+        expected = None
+        assert expected == actual
+
+    def test_it_ignores_a_truncated_snapshot(self):
+        # Arrange
+        path, db_path = make_snapshot(WorkingSet(TODOS, 30, None, None))
+        version = db_version(db_path)
+        with open(path, "r+b") as f:
+            f.truncate(60)
+        os.utime(db_path, ns=(version[0], version[0]))
+
+        # Act
+        actual = open_snapshot(path, db_path)
+
+        # Assert
+        expected = None
+        assert expected == actual
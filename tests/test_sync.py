@@ -0,0 +1,173 @@
+import os
+import tempfile
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from tenzing.sync import (
+    SyncLockError,
+    format_age,
+    next_interval,
+    pid_lock,
+    read_daemon_pid,
+    sync_feed,
+    take_until_watermark,
+)
+
+
+class TestNextInterval:
+    def test_it_resets_to_min_interval_when_changed(self):
+        # Act
+        actual = next_interval(480, changed=True, min_interval=60, max_interval=1800)
+
+        # Assert
+        expected = 60
+        assert expected == actual
+
+    def test_it_doubles_when_unchanged(self):
+        # Act
+        actual = next_interval(120, changed=False, min_interval=60, max_interval=1800)
+
+        # Assert
+        expected = 240
+        assert expected == actual
+
+    def test_it_caps_at_max_interval(self):
+        # Act
+        actual = next_interval(1500, changed=False, min_interval=60, max_interval=1800)
+
+        # Assert
+        expected = 1800
+        assert expected == actual
+
+
+class TestFormatAge:
+    def test_it_returns_never_for_none(self):
+        # Act
+        actual = format_age(None)
+
+        # Assert
+        expected = "never"
+        assert expected == actual
+
+    def test_it_returns_minutes(self):
+        # Act
+        actual = format_age(
+            datetime(2024, 1, 1, 12, 0), now=datetime(2024, 1, 1, 12, 5, 30)
+        )
+
+        # Assert
+        expected = "5m ago"
+        assert expected == actual
+
+
+class TestPidLock:
+    def test_it_writes_our_pid_while_held(self):
+        # Arrange
+        path = os.path.join(tempfile.mkdtemp(), "sync.pid")
+
+        # Act
+        with pid_lock(path):
+            actual = read_daemon_pid(path)
+
+        # Assert
+        expected = os.getpid()
+        assert expected == actual
+
+    def test_it_raises_sync_lock_error_when_already_held(self):
+        # Arrange
+        path = os.path.join(tempfile.mkdtemp(), "sync.pid")
+
+        # Act / Assert
+        with pid_lock(path):
+            with pytest.raises(SyncLockError):
+                with pid_lock(path):
+                    pass
+
+    def test_it_clears_the_pid_but_keeps_the_lock_file_on_release(self):
+        # Arrange
+        path = os.path.join(tempfile.mkdtemp(), "sync.pid")
+
+        # Act
+        with pid_lock(path):
+            pass
+        actual = (os.path.exists(path), read_daemon_pid(path))
+
+        # Assert
+        expected = (True, None)
+        assert expected == actual
+
+    def test_it_can_be_taken_again_after_release(self):
+        # Arrange
+        path = os.path.join(tempfile.mkdtemp(), "sync.pid")
+        with pid_lock(path):
+            pass
+
+        # Act
+        with pid_lock(path):
+            actual = read_daemon_pid(path)
+
+        # Assert
+        expected = os.getpid()
+        assert expected == actual
+
+
+class TestTakeUntilWatermark:
+    def test_it_stops_at_the_first_older_item(self):
+        # Arrange
+        views = [
+            SimpleNamespace(id=3, updated_at=datetime(2024, 5, 3)),
+            SimpleNamespace(id=2, updated_at=datetime(2024, 5, 2)),
+            SimpleNamespace(id=1, updated_at=datetime(2024, 5, 1)),
+        ]
+
+        # Act
+        actual = [view.id for view in take_until_watermark(views, datetime(2024, 5, 2))]
+
+        # Assert
+        expected = [3, 2]
+        assert expected == actual
+
+    def test_it_takes_everything_without_a_watermark(self):
+        # Arrange
+        views = [SimpleNamespace(id=1, updated_at=datetime(2024, 5, 1))]
+
+        # Act
+        actual = [view.id for view in take_until_watermark(views, None)]
+
+        # Assert
+        expected = [1]
+        assert expected == actual
+
+
+class TestSyncFeed:
+    @patch("tenzing.sync.sync_comments", Mock())
+    @patch("tenzing.sync.save_to_db")
+    @patch("tenzing.sync.save_sync_state")
+    @patch("tenzing.sync.get_sync_state")
+    def test_it_stops_reading_the_feed_at_the_watermark(
+        self, get_sync_state, save_sync_state, save_to_db
+    ):
+        # Arrange
+        get_sync_state.return_value = SimpleNamespace(watermark=datetime(2024, 5, 2))
+        read = []
+
+        def feed(type, project_ids, status):
+            for day in (3, 2, 1):
+                read.append((type, status, day))
+                yield {"day": day}
+
+        api = Mock()
+        api.iter_raw_recordings.side_effect = feed
+        view = lambda raw: SimpleNamespace(updated_at=datetime(2024, 5, raw["day"]))
+
+        # Act
+        with patch("tenzing.sync.FEED_VIEWS", {"Todo": Mock(from_api_data=view)}):
+            changed = sync_feed(api, ["1"])
+        actual = (changed, len(read), save_sync_state.call_args_list[0].kwargs)
+
+        # Assert
+        expected = (3, 9, {"watermark": datetime(2024, 5, 3)})
+        assert expected == actual
@@ -3,10 +3,20 @@
 
 """Tests for `tenzing` package."""
 
+import json
+import os
+import re
+import tempfile
+from contextlib import nullcontext
+from types import SimpleNamespace
+from unittest.mock import patch
+
 import pytest
 from click.testing import CliRunner
 
 from tenzing import cli, tenzing
+from tenzing.config import Config
+from tenzing.outbox import provisional_todo
 
 
 @pytest.fixture
@@ -33,4 +43,98 @@ def test_command_line_interface():
     assert "Commands:" in result.output
     help_result = runner.invoke(cli.main, ["--help"])
     assert help_result.exit_code == 0
-    assert "--help  Show this message and exit." in help_result.output
+    assert re.search(r"--help\s+Show this message and exit\.", help_result.output)
+
+
+class TestGetTodosForUser:
+    def todo(self, todo_id, list_title):
+        payload = {"project_id": 1, "todolist_id": 50, "title": "t", "body": ""}
+        return provisional_todo(todo_id, payload, SimpleNamespace(title=list_title))
+
+    @patch("tenzing.cli.save_sync_state")
+    @patch("tenzing.cli.save_to_db")
+    @patch("tenzing.cli.tracked_sync_run", lambda command: nullcontext())
+    @patch("tenzing.cli.get_todos_for_user_synced_at", lambda project_ids: None)
+    @patch("tenzing.cli.read_config")
+    @patch("tenzing.cli.BasecampAPI")
+    def test_it_sorts_fresh_todos_like_cached_ones(self, BasecampAPI, read_config, _, __):
+        # Arrange
+        read_config.return_value = Config(project_ids=["1"], user_id="7")
+        BasecampAPI.return_value.iter_todos_for_user.return_value = [
+            self.todo(1, "Later"),
+            self.todo(3, "Design"),
+            self.todo(2, "Design"),
+        ]
+
+        # Act
+        result = CliRunner().invoke(cli.main, ["get-todos-for-user", "--fresh", "--json"])
+        actual = [todo["id"] for todo in json.loads(result.output)]
+
+        # Assert
+        expected = [2, 3, 1]
+        assert expected == actual
+
+
+class TestListTodolists:
+    @patch("tenzing.cli.save_sync_state")
+    @patch("tenzing.cli.save_to_db")
+    @patch("tenzing.cli.read_config")
+    @patch("tenzing.cli.BasecampAPI")
+    def test_it_reports_missing_and_failing_projects_and_lists_the_rest(
+        self, BasecampAPI, read_config, _, save_sync_state
+    ):
+        # Arrange
+        read_config.return_value = Config(project_ids=["1", "2", "3"], user_id="7")
+        api = BasecampAPI.return_value
+        projects = {"1": None, "3": SimpleNamespace(id=3)}
+
+        def get_raw_project(pid):
+            if pid == "2":
+                raise RuntimeError("Server error")
+            return projects[pid]
+
+        api.get_raw_project.side_effect = get_raw_project
+        api.iter_todolists_for_project.return_value = []
+
+        # Act
+        result = CliRunner(mix_stderr=False).invoke(
+            cli.main, ["list-todolists", "--fresh", "--json"]
+        )
+
+        # Assert
+        assert 0 == result.exit_code
+        assert "Project with ID '1' not found" in result.stderr
+        assert "project ID 2" in result.stderr
+        expected = ["todolists:3"]
+        actual = [call.args[0] for call in save_sync_state.call_args_list]
+        assert expected == actual
+
+
+class TestRevalidateInBackground:
+    def test_it_starts_one_process_for_repeated_stale_reads(self):
+        # Arrange
+        children = []
+
+        def popen(args, pass_fds, **kwargs):
+            # The child keeps its inherited copy of the lock open
+            children.append((args, [os.dup(fd) for fd in pass_fds]))
+
+        # Act
+        with (
+            patch("tenzing.sync.LOCK_DIR", tempfile.mkdtemp()),
+            patch("tenzing.sync.subprocess.Popen", side_effect=popen),
+        ):
+            cli.revalidate_in_background("get-todos-for-user")
+            cli.revalidate_in_background("get-todos-for-user")
+            cli.revalidate_in_background("list-todolists", "--project-id", "1")
+        actual = [args[3:] for args, _ in children]
+
+        # Assert
+        expected = [
+            ["get-todos-for-user", "--fresh"],
+            ["list-todolists", "--project-id", "1", "--fresh"],
+        ]
+        assert expected == actual
+        for _, fds in children:
+            for fd in fds:
+                os.close(fd)
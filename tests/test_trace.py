@@ -0,0 +1,75 @@
+from tenzing.trace import Tracer, SpanSummary, http_span_name
+
+
+class TestTracer:
+    def test_span_records_nothing_when_disabled(self):
+        # Arrange
+        tracer = Tracer()
+
+        # Act
+        with tracer.span("api.get_projects"):
+            pass
+        actual = tracer.spans
+
+        # Assert
+        expected = []
+        assert expected == actual
+
+    def test_span_records_name_and_args_when_enabled(self):
+        # Arrange
+        tracer = Tracer()
+        tracer.enable()
+
+        # Act
+        with tracer.span("db.commit", "db", model="TodoItemView"):
+            pass
+        actual = [(s.name, s.category, s.args) for s in tracer.spans]
+
+        # Assert
+        expected = [("db.commit", "db", {"model": "TodoItemView"})]
+        assert expected == actual
+
+    def test_to_chrome_trace_returns_complete_events(self):
+        # Arrange
+        tracer = Tracer()
+        tracer.enable()
+        tracer.record("api.get_users", "tenzing", tracer._origin + 1.0, 0.5)
+
+        # Act
+        event = tracer.to_chrome_trace()["traceEvents"][0]
+        actual = (event["name"], event["ph"], event["ts"], event["dur"])
+
+        # Assert
+        expected = ("api.get_users", "X", 1_000_000.0, 500_000.0)
+        assert expected == actual
+
+    def test_summarize_returns_spans_grouped_by_name_sorted_by_total(self):
+        # Arrange
+        tracer = Tracer()
+        tracer.enable()
+        tracer.record("a", "tenzing", tracer._origin, 1.0)
+        tracer.record("b", "tenzing", tracer._origin, 3.0)
+        tracer.record("a", "tenzing", tracer._origin, 2.0)
+
+        # Act
+        actual = tracer.summarize()
+
+        # Assert
+        expected = [
+            SpanSummary(name="a", category="tenzing", count=2, total=3.0, max=2.0),
+            SpanSummary(name="b", category="tenzing", count=1, total=3.0, max=3.0),
+        ]
+        assert expected == actual
+
+
+class TestHttpSpanName:
+    def test_it_replaces_numeric_path_segments(self):
+        # Arrange
+        url = "https://3.basecampapi.com/999/buckets/1/todos/2.json?page=2"
+
+        # Act
+        actual = http_span_name("GET", url)
+
+        # Assert
+        expected = "GET /:id/buckets/:id/todos/:id.json"
+        assert expected == actual
@@ -0,0 +1,163 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+from tenzing.models import TodoItemView
+from tenzing.webhooks import (
+    WebhookResult,
+    WebhookServer,
+    apply_webhook_event,
+    view_for_event,
+)
+
+# A todo as Basecamp sends it, trimmed to the fields tenzing stores
+RECORDED_TODO = {
+    "id": 1001,
+    "status": "active",
+    "visible_to_clients": False,
+    "created_at": "2024-05-01T09:00:00.000Z",
+    "updated_at": "2024-05-02T10:30:00.000Z",
+    "title": "Write docs",
+    "inherits_status": True,
+    "type": "Todo",
+    "url": "https://3.basecampapi.com/1/buckets/1/todos/1001.json",
+    "app_url": "https://3.basecamp.com/1/buckets/1/todos/1001",
+    "bookmark_url": "https://3.basecampapi.com/1/my/bookmarks/x.json",
+    "subscription_url": "https://3.basecampapi.com/1/buckets/1/recordings/1001/subscription.json",
+    "comments_count": 0,
+    "comments_url": "https://3.basecampapi.com/1/buckets/1/recordings/1001/comments.json",
+    "position": 1,
+    "parent": {"id": 50, "title": "Launch", "type": "Todolist"},
+    "bucket": {"id": 1, "name": "Website", "type": "Project"},
+    "creator": {"id": 7, "name": "Jane"},
+    "description": "",
+    "completed": False,
+    "content": "Write docs",
+    "starts_on": None,
+    "due_on": "2024-05-10",
+    "assignees": [{"id": 7, "name": "Jane"}],
+    "completion_subscribers": [],
+    "completion_url": "https://3.basecampapi.com/1/buckets/1/todos/1001/completion.json",
+}
+
+
+class TestViewForEvent:
+    def test_it_converts_a_complete_recording(self):
+        # Act
+        view = view_for_event({"kind": "todo_created", "recording": RECORDED_TODO}, None)
+        actual = (view.id, view.parent_id, view.assignee_ids, str(view.due_on))
+
+        # Assert
+        expected = (1001, 50, ["7"], "2024-05-10")
+        assert expected == actual
+
+    def test_it_fetches_a_partial_recording(self):
+        # Arrange
+        partial = {"id": 1001, "type": "Todo", "url": RECORDED_TODO["url"]}
+        fetched = dict(RECORDED_TODO, completed=True)
+        calls = []
+
+        def fetch(url, type):
+            calls.append((url, type))
+            return fetched
+
+        # Act
+        view = view_for_event({"kind": "todo_completed", "recording": partial}, None, fetch)
+        actual = (view.completed, calls)
+
+        # Assert
+        expected = (True, [(RECORDED_TODO["url"], "Todo")])
+        assert expected == actual
+
+    def test_it_merges_a_partial_recording_into_the_stored_copy(self):
+        # Arrange
+        existing = TodoItemView.from_api_data(RECORDED_TODO)
+        partial = {"id": 1001, "type": "Todo", "title": "Write more docs"}
+
+        # Act
+        view = view_for_event({"kind": "todo_completed", "recording": partial}, existing)
+        actual = (view.title, view.completed, view.parent_id)
+
+        # Assert
+        expected = ("Write more docs", True, 50)
+        assert expected == actual
+
+    def test_it_ignores_other_recordings(self):
+        # Act
+        actual = view_for_event(
+            {"kind": "message_created", "recording": {"id": 5, "type": "Message"}}, None
+        )
+
+        # Assert
+        expected = None
+        assert expected == actual
+
+
+class TestApplyWebhookEvent:
+    def test_it_skips_an_event_older_than_the_stored_todo(self):
+        # Arrange
+        stored = {}
+        completed = dict(RECORDED_TODO, completed=True)
+        uncompleted = dict(RECORDED_TODO, updated_at="2024-05-02T09:45:00.000Z")
+
+        def save_to_db(views):
+            stored.update((view.id, view) for view in views)
+
+        # Act
+        with (
+            patch("tenzing.persist.get_todo_from_db", stored.get),
+            patch("tenzing.persist.save_to_db", save_to_db),
+        ):
+            apply_webhook_event({"kind": "todo_completed", "recording": completed})
+            result = apply_webhook_event(
+                {"kind": "todo_uncompleted", "recording": uncompleted}
+            )
+        actual = (result.applied, result.detail, stored[1001].completed)
+
+        # Assert
+        expected = (False, "Stale event", True)
+        assert expected == actual
+
+
+class TestWebhookServer:
+    def post(self, server, path, body: bytes):
+        port = server.server_address[1]
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{port}{path}", data=body, method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_it_applies_posted_payloads(self):
+        # Arrange
+        received = []
+
+        def apply(payload):
+            received.append(payload)
+            return WebhookResult(payload["kind"], 1001, True, "Saved Todo 1001")
+
+        server = WebhookServer("127.0.0.1", 0, "/hooks/secret", apply=apply)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        payload = {"kind": "todo_created", "recording": RECORDED_TODO}
+
+        # Act
+        try:
+            actual = (
+                self.post(server, "/hooks/secret", json.dumps(payload).encode())[0],
+                self.post(server, "/elsewhere", b"{}")[0],
+                self.post(server, "/hooks/secret", b"not json")[0],
+                received,
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        # Assert
+        expected = (200, 404, 400, [payload])
+        assert expected == actual